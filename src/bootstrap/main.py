@@ -11,7 +11,7 @@ from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from bootstrap import settings, uow
 from data_generator import const, generator
 from social_network.domain import models, services
-from social_network.domain.services import auth
+from social_network.domain.services import auth, passwords
 from social_network.infrastructure.database import repository
 
 # Global variables for the async event loop and thread
@@ -39,7 +39,7 @@ class Bootstrap:
                 create_async_engine(
                     url=self._settings.db.connection_url,
                     echo=self._settings.log_level == "DEBUG",
-                    pool_size=self._settings.db.pool_size,
+                    **self._settings.db.engine_options,
                 ),
                 expire_on_commit=False,
             ),
@@ -87,11 +87,15 @@ class Bootstrap:
         ]
 
     def _make_user(self, user: models.NewUserDomain) -> models.NewUserDomain:
+        # Fernet дешевле хэширования: такие пароли пересчитываются при первом входе
         return models.NewUserDomain(
-            **user.model_dump(exclude={"password"}),
+            **user.model_dump(exclude={"password", "credentials_digest"}),
             password=auth.encrypt_password(
                 password=user.password, secret=self._settings.auth.secret
             ),
+            credentials_digest=passwords.credentials_digest(
+                user=user, password=user.password, secret=self._settings.auth.secret
+            ),
         )
 
     async def _make_user_entities(
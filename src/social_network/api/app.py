@@ -15,15 +15,20 @@ from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_asyn
 from starlette import requests, responses, status
 
 from social_network import settings
+from social_network.api import dependencies
 from social_network.api import requests as api_requests
 from social_network.api.models import common
 from social_network.api.routes import chat as chat_routes
 from social_network.api.routes import friend as friend_routes
 from social_network.api.routes import login as login_routes
+from social_network.api.routes import metrics as metrics_routes
 from social_network.api.routes import post as post_routes
 from social_network.api.routes import user as user_routes
 from social_network.domain import exceptions as domain_exceptions
+from social_network.domain import services
+from social_network.infrastructure import executor, metrics, ws
 from social_network.infrastructure.database import exceptions as db_exceptions
+from social_network.infrastructure.database import retry
 
 logger = logging.getLogger(__name__)
 
@@ -69,9 +74,12 @@ async def _validation_exception_handler(
 class ApplicationState(typing.TypedDict):
     settings: settings.SocialNetworkSettings
     redis: aioredis.Redis
-    rmq: typing.Optional[aio_pika.abc.AbstractChannel]
+    async_feed_services: services.AsyncFeedServicePool
     master_factory: async_sessionmaker[AsyncSession]
     slave_factory: typing.Optional[async_sessionmaker[AsyncSession]]
+    feed_warm_ups: services.SingleFlight[bool]
+    ws_manager: ws.WSConnectionManager
+    container: dependencies.Container
 
 
 @contextlib.asynccontextmanager
@@ -81,6 +89,9 @@ async def lifespan(
     social_network_settings = settings.SocialNetworkSettings()
     app.debug = social_network_settings.level == "DEBUG"
 
+    retry.configure(
+        retry.RetryPolicy.create(**social_network_settings.db.retry_options)
+    )
     redis = aioredis.from_url(social_network_settings.redis.connection_url)
 
     rmq_connection = rmq_channel = None
@@ -95,29 +106,80 @@ async def lifespan(
     except aio_pika.exceptions.AMQPError as e:
         logger.warning(f"Failed to connect to RMQ: {e}")
 
+    async_feed_services = await services.AsyncFeedServicePool.create(
+        rmq_connection, size=social_network_settings.rmq.channel_pool_size
+    )
+
+    ws_settings = social_network_settings.ws
+    ws_manager: ws.WSConnectionManager
+    if rmq_connection and ws_settings.delivery_mode == "shared":
+        ws_channel = await rmq_connection.channel()
+        await ws_channel.set_qos(prefetch_count=ws_settings.prefetch_count)
+        ws_manager = ws.SharedWSConnectionManager(
+            async_service=await services.AsyncFeedService.create(ws_channel),
+            buffer_size=ws_settings.buffer_size,
+            batch_size=ws_settings.batch_size,
+            send_timeout=ws_settings.send_timeout,
+            idle_timeout=ws_settings.idle_timeout,
+        )
+        await ws_manager.start()
+    else:
+        ws_manager = ws.WSConnectionManager(
+            async_service=await services.AsyncFeedService.create(rmq_channel),
+            buffer_size=ws_settings.buffer_size,
+            batch_size=ws_settings.batch_size,
+            send_timeout=ws_settings.send_timeout,
+            idle_timeout=ws_settings.idle_timeout,
+        )
+
     master = create_async_engine(
         url=social_network_settings.db.connection_url,
         echo=social_network_settings.level == "DEBUG",
-        pool_size=social_network_settings.db.pool_size,
+        **social_network_settings.db.engine_options,
     )
     slave = None
     if social_network_settings.db.ro_connection_url:
         slave = create_async_engine(
             url=social_network_settings.db.ro_connection_url,
             echo=social_network_settings.level == "DEBUG",
-            pool_size=social_network_settings.db.pool_size,
+            **social_network_settings.db.engine_options,
         )
 
+    master_factory = async_sessionmaker(master, expire_on_commit=False)
+    slave_factory = (
+        None if slave is None else async_sessionmaker(slave, expire_on_commit=False)
+    )
+    feed_warm_ups: services.SingleFlight[bool] = services.SingleFlight()
+    crypto_executor = executor.Executor(
+        kind=social_network_settings.auth.crypto_executor,
+        max_workers=social_network_settings.auth.crypto_workers,
+    )
+    loop_lag_monitor = asyncio.create_task(
+        metrics.monitor_loop_lag(social_network_settings.server.loop_lag_interval)
+    )
+
     yield ApplicationState(
         settings=social_network_settings,
         redis=redis,
-        rmq=rmq_channel,
-        master_factory=async_sessionmaker(master, expire_on_commit=False),
-        slave_factory=None
-        if social_network_settings.db.ro_connection_url is None
-        else async_sessionmaker(slave, expire_on_commit=False),
+        async_feed_services=async_feed_services,
+        master_factory=master_factory,
+        slave_factory=slave_factory,
+        feed_warm_ups=feed_warm_ups,
+        ws_manager=ws_manager,
+        container=dependencies.Container(
+            social_network_settings=social_network_settings,
+            master_factory=master_factory,
+            slave_factory=slave_factory,
+            redis=redis,
+            async_feed_services=async_feed_services,
+            feed_warm_ups=feed_warm_ups,
+            crypto_executor=crypto_executor,
+        ),
     )
 
+    loop_lag_monitor.cancel()
+    await ws_manager.close()
+    crypto_executor.shutdown()
     coros = [redis.close(), master.dispose()]
     if slave:
         coros.append(slave.dispose())
@@ -137,6 +199,7 @@ def customize_openapi(app: fastapi.FastAPI) -> None:
 
 
 def build_application() -> fastapi.FastAPI:
+    server_settings = settings.SocialNetworkSettings().server
     app = fastapi.FastAPI(
         title="Social Network",
         description="OTUS Highload Architect (1.2.0)",
@@ -150,7 +213,14 @@ def build_application() -> fastapi.FastAPI:
     app.include_router(friend_routes.router)
     app.include_router(post_routes.router)
     app.include_router(chat_routes.router)
+    app.include_router(metrics_routes.router)
     app.add_middleware(api_requests.RequestIdMiddleware)
+    app.add_middleware(
+        api_requests.RequestDeadlineMiddleware,
+        default_timeout=server_settings.request_timeout_default,
+        min_timeout=server_settings.request_timeout_min,
+        max_timeout=server_settings.request_timeout_max,
+    )
 
     customize_openapi(app)
 
@@ -4,8 +4,8 @@ from social_network.api.dependencies.auth import (
     verify_access_token,
     verify_ws_access_token,
 )
+from social_network.api.dependencies.container import Container, build_feed_service
 from social_network.api.dependencies.services import (
-    AsyncWsFeedService,
     AuthService,
     ChatService,
     FeedService,
@@ -14,7 +14,6 @@ from social_network.api.dependencies.services import (
     UserService,
     WsAuthService,
     get_async_feed_service,
-    get_async_ws_feed_service,
     get_auth_service,
     get_chat_service,
     get_feed_service,
@@ -26,9 +25,9 @@ from social_network.api.dependencies.services import (
 from social_network.api.dependencies.ws import WsManager, get_feed_ws_manager
 
 __all__ = [
-    "AsyncWsFeedService",
     "AuthService",
     "ChatService",
+    "Container",
     "FeedService",
     "FriendService",
     "FriendService",
@@ -38,8 +37,8 @@ __all__ = [
     "WsAuthService",
     "WsManager",
     "WsRequestUser",
+    "build_feed_service",
     "get_async_feed_service",
-    "get_async_ws_feed_service",
     "get_auth_service",
     "get_chat_service",
     "get_feed_service",
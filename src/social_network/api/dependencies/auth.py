@@ -12,17 +12,19 @@ oauth2_scheme = security.OAuth2PasswordBearer(tokenUrl="login")
 async def verify_access_token(
     auth_service: services.AuthService,
     token: typing.Annotated[str, fastapi.Depends(oauth2_scheme)],
-) -> user.UserDomain:
+) -> user.PrincipalDomain:
     return await auth_service.authorize(token)
 
 
 async def verify_ws_access_token(
     auth_service: services.WsAuthService, token: str = fastapi.Query(...)
-) -> user.UserDomain:
+) -> user.PrincipalDomain:
     return await auth_service.authorize(token)
 
 
-RequestUser = typing.Annotated[user.UserDomain, fastapi.Depends(verify_access_token)]
+RequestUser = typing.Annotated[
+    user.PrincipalDomain, fastapi.Depends(verify_access_token)
+]
 WsRequestUser = typing.Annotated[
-    user.UserDomain, fastapi.Depends(verify_ws_access_token)
+    user.PrincipalDomain, fastapi.Depends(verify_ws_access_token)
 ]
@@ -0,0 +1,176 @@
+import itertools
+import typing
+
+from redis import asyncio as aioredis
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from social_network import settings
+from social_network.domain import services
+from social_network.infrastructure import cache, executor
+from social_network.infrastructure.database import repository, uow
+
+
+def build_feed_service(
+    social_network_settings: settings.SocialNetworkSettings,
+    master_factory: async_sessionmaker[AsyncSession],
+    slave_factory: typing.Optional[async_sessionmaker[AsyncSession]],
+    redis: aioredis.Redis,
+    async_feed_service: services.AsyncFeedService,
+    warm_ups: typing.Optional[services.SingleFlight[bool]] = None,
+) -> services.FeedService:
+    """Сервис ленты собирается одинаково в приложении и в воркере рассылки"""
+    return services.FeedService(
+        unit_of_work=uow.FeedUnitOfWork(
+            database_name=social_network_settings.db.name,
+            master_factory=master_factory,
+            slave_factory=slave_factory,
+            post_repository=repository.PostRepository(
+                feed_query_variant=social_network_settings.db.feed_query_variant
+            ),
+            friend_repository=repository.FriendRepository(),
+            timeline_repository=repository.TimelineRepository(),
+        ),
+        redis=redis,
+        async_feed_service=async_feed_service,
+        cache_capacity=social_network_settings.redis.feed_capacity,
+        ttl=social_network_settings.redis.ttl,
+        max_staleness=social_network_settings.redis.max_staleness,
+        lock_timeout=social_network_settings.redis.lock_timeout,
+        celebrity_friends_threshold=social_network_settings.celebrity_friends_threshold,
+        fanout_batch_size=social_network_settings.redis.fanout_batch_size,
+        post_ttl=social_network_settings.redis.post_ttl,
+        warm_ups=warm_ups,
+        timeline_is_enabled=social_network_settings.timeline_is_enabled,
+        fanout_worker_is_enabled=social_network_settings.fanout_worker_is_enabled,
+    )
+
+
+class Container:
+    """
+    Граф сервисов приложения, собранный один раз при старте (lifespan).
+    Сервисы, unit of work и репозитории не хранят состояние запроса:
+    сессия БД открывается только при старте транзакции и живет в контексте задачи.
+    Сервисов ленты столько же, сколько каналов RMQ в пуле: запросы получают их по кругу
+    """
+
+    def __init__(
+        self,
+        social_network_settings: settings.SocialNetworkSettings,
+        master_factory: async_sessionmaker[AsyncSession],
+        slave_factory: typing.Optional[async_sessionmaker[AsyncSession]],
+        redis: aioredis.Redis,
+        async_feed_services: services.AsyncFeedServicePool,
+        feed_warm_ups: services.SingleFlight[bool],
+        crypto_executor: executor.Executor,
+    ) -> None:
+        self._settings = social_network_settings
+        self._master_factory = master_factory
+        self._slave_factory = slave_factory
+        self._redis = redis
+        self._feed_warm_ups = feed_warm_ups
+        self._crypto_executor = crypto_executor
+
+        self.auth_service = self.build_auth_service()
+        self.user_service = self.build_user_service()
+        self.friend_service = self.build_friend_service()
+        self.post_service = self.build_post_service()
+        self.chat_service = self.build_chat_service()
+        self._feed_services = itertools.cycle(
+            [
+                self.build_feed_service(async_feed_services.get())
+                for _ in range(social_network_settings.rmq.channel_pool_size)
+            ]
+        )
+
+    @property
+    def feed_service(self) -> services.FeedService:
+        return next(self._feed_services)
+
+    def build_principal_cache(self) -> typing.Optional[cache.PrincipalCache]:
+        auth_settings = self._settings.auth
+        if not auth_settings.principal_cache_ttl:
+            return None
+        return cache.PrincipalCache(
+            capacity=auth_settings.principal_cache_size,
+            ttl=auth_settings.principal_cache_ttl,
+            redis=self._redis
+            if auth_settings.principal_cache_redis_is_enabled
+            else None,
+        )
+
+    def build_auth_service(self) -> services.AuthService:
+        return services.AuthService(
+            unit_of_work=uow.UserUnitOfWork(
+                database_name=self._settings.db.name,
+                master_factory=self._master_factory,
+                slave_factory=self._slave_factory,
+                user_repository=repository.UserRepository(),
+            ),
+            secret=self._settings.auth.secret,
+            algorithm=self._settings.auth.algorithm,
+            token_ttl_seconds=self._settings.auth.token_ttl_seconds,
+            principal_cache=self.build_principal_cache(),
+            password_hasher=services.HASHERS[self._settings.auth.password_hasher](),
+            crypto_executor=self._crypto_executor,
+        )
+
+    def build_user_service(self) -> services.UserService:
+        return services.UserService(
+            unit_of_work=uow.UserUnitOfWork(
+                database_name=self._settings.db.name,
+                master_factory=self._master_factory,
+                slave_factory=self._slave_factory,
+                user_repository=repository.UserRepository(),
+            ),
+        )
+
+    def build_friend_service(self) -> services.FriendService:
+        return services.FriendService(
+            unit_of_work=uow.FriendUnitOfWork(
+                database_name=self._settings.db.name,
+                master_factory=self._master_factory,
+                slave_factory=self._slave_factory,
+                friend_repository=repository.FriendRepository(),
+            ),
+        )
+
+    def build_post_service(self) -> services.PostService:
+        return services.PostService(
+            unit_of_work=uow.PostUnitOfWork(
+                database_name=self._settings.db.name,
+                master_factory=self._master_factory,
+                slave_factory=self._slave_factory,
+                post_repository=repository.PostRepository(
+                    feed_query_variant=self._settings.db.feed_query_variant
+                ),
+            ),
+        )
+
+    def build_feed_service(
+        self, async_feed_service: services.AsyncFeedService
+    ) -> services.FeedService:
+        return build_feed_service(
+            social_network_settings=self._settings,
+            master_factory=self._master_factory,
+            slave_factory=self._slave_factory,
+            redis=self._redis,
+            async_feed_service=async_feed_service,
+            warm_ups=self._feed_warm_ups,
+        )
+
+    def build_chat_service(self) -> services.AbstractChatService:
+        unit_of_work = uow.ChatUnitOfWork(
+            database_name=self._settings.db.name,
+            master_factory=self._master_factory,
+            slave_factory=self._slave_factory,
+            chat_repository=repository.ChatRepository(),
+            chat_participant_repository=repository.ChatParticipantRepository(),
+            chat_message_repository=repository.ChatMessageRepository(),
+            user_repository=repository.UserRepository(),
+        )
+        if self._settings.redis_udf_is_enabled:
+            return services.RedisUDFChatService(
+                unit_of_work=unit_of_work,
+                redis_client=self._redis,
+            )
+        return services.ChatService(unit_of_work=unit_of_work)
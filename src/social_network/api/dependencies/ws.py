@@ -2,14 +2,11 @@ import typing
 
 import fastapi
 
-from social_network.api.dependencies import services
 from social_network.infrastructure import ws
 
 
-async def get_feed_ws_manager(
-    async_feed_service: services.AsyncWsFeedService,
-) -> ws.WSConnectionManager:
-    return ws.WSConnectionManager(async_service=async_feed_service)
+async def get_feed_ws_manager(websocket: fastapi.WebSocket) -> ws.WSConnectionManager:
+    return websocket.state.ws_manager
 
 
 WsManager = typing.Annotated[
@@ -1,10 +1,18 @@
 import contextvars
+import math
 import typing
 import uuid
 
 from starlette import requests, responses
 from starlette.middleware import base
 
+from social_network.infrastructure.database import retry
+
+REQUEST_TIMEOUT_HEADER = "X-Request-Timeout"
+DEFAULT_REQUEST_TIMEOUT_SECONDS = 30.0
+MIN_REQUEST_TIMEOUT_SECONDS = 0.1
+MAX_REQUEST_TIMEOUT_SECONDS = 60.0
+
 request_id: contextvars.ContextVar[str | None] = contextvars.ContextVar(
     "request_id", default=None
 )
@@ -40,3 +48,49 @@ class RequestIdMiddleware(base.BaseHTTPMiddleware):
         response.headers["X-Request-ID"] = get_request_id()
 
         return response
+
+
+class RequestDeadlineMiddleware(base.BaseHTTPMiddleware):
+    """
+    Дедлайн запроса: клиент или балансировщик передает в X-Request-Timeout,
+    сколько секунд он готов ждать ответ. После дедлайна повторы транзакций
+    не выполняются – ответ все равно никто не получит
+    """
+
+    def __init__(
+        self,
+        app: typing.Any,
+        default_timeout: float = DEFAULT_REQUEST_TIMEOUT_SECONDS,
+        min_timeout: float = MIN_REQUEST_TIMEOUT_SECONDS,
+        max_timeout: float = MAX_REQUEST_TIMEOUT_SECONDS,
+    ) -> None:
+        super().__init__(app)
+        self._default_timeout = default_timeout
+        self._min_timeout = min_timeout
+        self._max_timeout = max_timeout
+
+    def _timeout_of(self, header: typing.Optional[str]) -> float:
+        # nan, inf и мусор в заголовке игнорируются, остальное прижимается
+        # к допустимому диапазону: отрицательный таймаут не должен отключать
+        # повторы, а огромный – растягивать их до бесконечности
+        if header is None:
+            return self._default_timeout
+        try:
+            timeout = float(header)
+        except ValueError:
+            return self._default_timeout
+        if not math.isfinite(timeout):
+            return self._default_timeout
+        return min(max(timeout, self._min_timeout), self._max_timeout)
+
+    async def dispatch(
+        self,
+        request: requests.Request,
+        call_next: typing.Callable[
+            [requests.Request], typing.Awaitable[responses.Response]
+        ],
+    ) -> responses.Response:
+        retry.set_deadline(
+            self._timeout_of(request.headers.get(REQUEST_TIMEOUT_HEADER))
+        )
+        return await call_next(request)
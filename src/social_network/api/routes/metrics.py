@@ -0,0 +1,14 @@
+import fastapi
+from starlette import responses
+
+from social_network.infrastructure import metrics
+
+router = fastapi.APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics() -> responses.PlainTextResponse:
+    return responses.PlainTextResponse(
+        metrics.REGISTRY.render(),
+        media_type="text/plain; version=0.0.4",
+    )
@@ -1,18 +1,23 @@
+import asyncio
 import logging
 import typing
 import uuid
 
 import fastapi
+from fastapi import exceptions as fastapi_exceptions
 from fastapi import status
 from redis import asyncio as aioredis
 from starlette import websockets
 
 from social_network.api import dependencies, responses, schema_mappers
 from social_network.api import models as dto
+from social_network.domain import models as domain
 
 router = fastapi.APIRouter(prefix="/post")
 logger = logging.getLogger(__name__)
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
 
 @router.post(
     "/create",
@@ -37,7 +42,14 @@ async def make_post(
             new_post_dto=new_post, author_id=request_user.id
         )
     )
-    await feed_service.add_post(user_id=request_user.id, post=post)
+    await feed_service.notify(
+        domain.FeedEventDomain(
+            type=domain.FeedEventType.created,
+            user_id=request_user.id,
+            post_id=post.id,
+            post=post,
+        )
+    )
     return schema_mappers.PostMapper.map_domain_to_dto(post)
 
 
@@ -65,7 +77,14 @@ async def update_post(
         ),
         user_id=request_user.id,
     )
-    await feed_service.update_post(user_id=request_user.id, post=post)
+    await feed_service.notify(
+        domain.FeedEventDomain(
+            type=domain.FeedEventType.updated,
+            user_id=request_user.id,
+            post_id=post.id,
+            post=post,
+        )
+    )
     return schema_mappers.PostMapper.map_domain_to_dto(post)
 
 
@@ -87,7 +106,13 @@ async def delete_post(
     feed_service: dependencies.FeedService,
 ) -> fastapi.Response:
     await post_service.delete_post(post_id=id, user_id=request_user.id)
-    await feed_service.delete_post(user_id=request_user.id, post_id=id)
+    await feed_service.notify(
+        domain.FeedEventDomain(
+            type=domain.FeedEventType.deleted,
+            user_id=request_user.id,
+            post_id=id,
+        )
+    )
     return fastapi.Response(status_code=status.HTTP_200_OK)
 
 
@@ -117,26 +142,48 @@ async def get_post(
     response_model=list[dto.PostDTO],
     response_description="Успешно получены посты друзей",
     summary="Поиск постов друзей",
-    description="Поиск постов друзей",
+    description="Поиск постов друзей. Для глубокой прокрутки передавайте курсор "
+    f"из заголовка {NEXT_CURSOR_HEADER} предыдущей страницы вместо offset",
     operation_id="feed_posts",
     responses=responses.response_400 | responses.response_500 | responses.response_503,
 )
 async def feed_posts(
+    response: fastapi.Response,
     request_user: dependencies.RequestUser,
     feed_service: dependencies.FeedService,
     post_service: dependencies.PostService,
-    offset: typing.Annotated[int, fastapi.Query(examples=[100])] = 100,
-    limit: typing.Annotated[int, fastapi.Query(examples=[10])] = 10,
+    offset: typing.Annotated[int, fastapi.Query(examples=[100], ge=0)] = 0,
+    limit: typing.Annotated[int, fastapi.Query(examples=[10], gt=0)] = 10,
+    cursor: typing.Annotated[
+        typing.Optional[str],
+        fastapi.Query(description="Курсор следующей страницы, offset игнорируется"),
+    ] = None,
 ) -> list[dto.PostDTO]:
+    feed_cursor = None
+    if cursor is not None:
+        try:
+            feed_cursor = schema_mappers.FeedCursorMapper.map_dto_to_domain(cursor)
+        except ValueError as err:
+            raise fastapi_exceptions.RequestValidationError(
+                [{"loc": ("query", "cursor"), "msg": str(err), "type": "value_error"}]
+            ) from err
+
     try:
-        posts = await feed_service.feed(
-            user_id=request_user.id, offset=offset, limit=limit
+        page = await feed_service.feed_page(
+            user_id=request_user.id, offset=offset, limit=limit, cursor=feed_cursor
         )
     except aioredis.RedisError:
-        posts = await post_service.feed(
-            user_id=request_user.id, offset=offset, limit=limit
+        page = await post_service.feed_page(
+            user_id=request_user.id, offset=offset, limit=limit, cursor=feed_cursor
+        )
+
+    # Страница бывает короче limit из-за удаленных постов, поэтому курсор
+    # отдается всегда, когда просмотр ленты не дошел до конца
+    if page.next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = (
+            schema_mappers.FeedCursorMapper.map_domain_to_dto(page.next_cursor)
         )
-    return [schema_mappers.PostMapper.map_domain_to_dto(post) for post in posts]
+    return [schema_mappers.PostMapper.map_domain_to_dto(post) for post in page.posts]
 
 
 @router.websocket("/feed/posted")
@@ -148,12 +195,17 @@ async def ws_post_feed(
     """
     Устанавливает вэб-сокет соединение для отправки постов в режиме реального времени
     """
-    await ws_manager.connect(websocket, request_user)
-    while True:
-        try:
-            message = await websocket.receive_text()
+    try:
+        await ws_manager.connect(websocket, request_user)
+        while True:
+            message = await asyncio.wait_for(
+                websocket.receive_text(), timeout=ws_manager.idle_timeout
+            )
             logger.info(f"Received message: {message}")
-        except websockets.WebSocketDisconnect as e:
-            logger.error(f"Websocket exception: {e}")
-            ws_manager.disconnect(websocket)
-            break
+    except websockets.WebSocketDisconnect as e:
+        logger.info(f"Websocket is disconnected: {e}")
+    except asyncio.TimeoutError:
+        logger.info(f"Websocket of {request_user.id} is idle, closing")
+        await websocket.close(code=status.WS_1001_GOING_AWAY)
+    finally:
+        await ws_manager.disconnect(websocket, request_user)
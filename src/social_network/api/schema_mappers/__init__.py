@@ -1,9 +1,10 @@
 from social_network.api.schema_mappers.chat import MessageMapper
 from social_network.api.schema_mappers.friend import FriendMapper
-from social_network.api.schema_mappers.post import PostMapper
+from social_network.api.schema_mappers.post import FeedCursorMapper, PostMapper
 from social_network.api.schema_mappers.user import RegistrationMapper, UserMapper
 
 __all__ = [
+    "FeedCursorMapper",
     "FriendMapper",
     "MessageMapper",
     "PostMapper",
@@ -1,8 +1,17 @@
+import base64
+import binascii
+import datetime
+import struct
 import uuid
 
 from social_network.api import models as dto
 from social_network.domain import models as domain
 
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+MICROSECOND = datetime.timedelta(microseconds=1)
+# created_at (мкс от эпохи), id
+CURSOR = struct.Struct("!q16s")
+
 
 class PostMapper:
     @staticmethod
@@ -24,3 +33,34 @@ class PostMapper:
         updating_post_dto: dto.UpdatingPostDTO,
     ) -> domain.UpdatingPostDomain:
         return domain.UpdatingPostDomain(**updating_post_dto.model_dump())
+
+
+class FeedCursorMapper:
+    """Курсор ленты передается клиенту непрозрачной base64url-строкой"""
+
+    @staticmethod
+    def map_domain_to_dto(cursor: domain.FeedCursor) -> str:
+        created_at = cursor.created_at
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=datetime.timezone.utc)
+        return (
+            base64.urlsafe_b64encode(
+                CURSOR.pack((created_at - EPOCH) // MICROSECOND, cursor.id.bytes)
+            )
+            .rstrip(b"=")
+            .decode()
+        )
+
+    @staticmethod
+    def map_dto_to_domain(cursor: str) -> domain.FeedCursor:
+        try:
+            created_at, id_ = CURSOR.unpack(
+                base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            )
+            # Подделанный курсор может указывать за пределы datetime
+            return domain.FeedCursor(
+                created_at=EPOCH + datetime.timedelta(microseconds=created_at),
+                id=uuid.UUID(bytes=id_),
+            )
+        except (binascii.Error, struct.error, ValueError, OverflowError) as err:
+            raise ValueError(f"Invalid feed cursor {cursor!r}") from err
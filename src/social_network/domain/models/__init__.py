@@ -6,18 +6,33 @@ from social_network.domain.models.chat import (
     NewChatMessageDomain,
     NewChatParticipantDomain,
 )
+from social_network.domain.models.feed import (
+    FeedCursor,
+    FeedEventDomain,
+    FeedEventType,
+    FeedPage,
+)
 from social_network.domain.models.friend import FriendDomain, NewFriendDomain
 from social_network.domain.models.post import (
     NewPostDomain,
     PostDomain,
     UpdatingPostDomain,
 )
-from social_network.domain.models.user import NewUserDomain, UserDomain
+from social_network.domain.models.user import (
+    NewUserDomain,
+    PrincipalDomain,
+    UserDomain,
+    UserProfileDomain,
+)
 
 __all__ = [
     "ChatDomain",
     "ChatMessageDomain",
     "ChatParticipantDomain",
+    "FeedCursor",
+    "FeedEventDomain",
+    "FeedEventType",
+    "FeedPage",
     "FriendDomain",
     "FriendDomain",
     "NewChatDomain",
@@ -27,6 +42,8 @@ __all__ = [
     "NewPostDomain",
     "NewUserDomain",
     "PostDomain",
+    "PrincipalDomain",
     "UpdatingPostDomain",
     "UserDomain",
+    "UserProfileDomain",
 ]
@@ -0,0 +1,60 @@
+import datetime
+import enum
+import typing
+import uuid
+
+import pydantic
+
+from social_network.domain.models.post import PostDomain
+
+
+class FeedEventType(str, enum.Enum):
+    created = "created"
+    updated = "updated"
+    deleted = "deleted"
+
+
+class FeedEventDomain(pydantic.BaseModel):
+    """
+    Событие об изменении поста, которое нужно разнести по лентам друзей автора.
+    Идентификатор события служит ключом идемпотентности при повторной доставке
+    """
+
+    id: uuid.UUID = pydantic.Field(default_factory=uuid.uuid4)
+    type: FeedEventType
+    user_id: uuid.UUID
+    post_id: uuid.UUID
+    post: typing.Optional[PostDomain] = None
+
+
+class FeedCursor(pydantic.BaseModel):
+    """
+    Позиция в ленте для keyset-пагинации: лента упорядочена по (created_at, id)
+    по убыванию, следующая страница начинается сразу после поста-курсора
+    """
+
+    created_at: datetime.datetime
+    id: uuid.UUID
+
+    @classmethod
+    def of(cls, post: PostDomain) -> "FeedCursor":
+        return cls(created_at=post.created_at, id=post.id)
+
+
+class FeedPage(pydantic.BaseModel):
+    """
+    Страница ленты. next_cursor – позиция, на которой остановился просмотр ленты.
+    Удаленные посты в страницу не попадают, поэтому страница бывает короче limit,
+    хотя лента не закончилась. None – лента закончилась
+    """
+
+    posts: list[PostDomain]
+    next_cursor: typing.Optional[FeedCursor] = None
+
+    @classmethod
+    def of(cls, posts: list[PostDomain], limit: int) -> "FeedPage":
+        """Страница из БД: удаленные посты отброшены до LIMIT, короткая страница – последняя"""
+        return cls(
+            posts=posts,
+            next_cursor=FeedCursor.of(posts[-1]) if len(posts) >= limit else None,
+        )
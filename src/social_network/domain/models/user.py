@@ -1,4 +1,5 @@
 import datetime
+import typing
 import uuid
 
 import pydantic
@@ -6,7 +7,7 @@ import pydantic
 from social_network.domain import mixins
 
 
-class NewUserDomain(
+class UserProfileDomain(
     mixins.ModelWithCreatedAtUpdatedAtDeletedAtMixin, pydantic.BaseModel
 ):
     first_name: str
@@ -14,8 +15,25 @@ class NewUserDomain(
     birthdate: datetime.datetime
     biography: str
     city: str
+
+
+class NewUserDomain(UserProfileDomain):
     password: str
+    credentials_digest: typing.Optional[str] = None
+
 
+class PrincipalDomain(UserProfileDomain):
+    """
+    Авторизованный пользователь: без хэша пароля и дайджеста учетных данных,
+    поэтому его можно класть в кэш и отдавать обработчикам запросов
+    """
 
-class UserDomain(NewUserDomain):
     id: uuid.UUID
+
+    @classmethod
+    def of(cls, user: "PrincipalDomain") -> "PrincipalDomain":
+        return cls.model_validate(user.model_dump(include=set(cls.model_fields)))
+
+
+class UserDomain(NewUserDomain, PrincipalDomain):
+    pass
@@ -4,19 +4,38 @@ from social_network.domain.services.chat import (
     ChatService,
     RedisUDFChatService,
 )
-from social_network.domain.services.feed import AsyncFeedService, FeedService
+from social_network.domain.services.feed import (
+    AsyncFeedService,
+    AsyncFeedServicePool,
+    FeedService,
+    merge_feeds,
+)
 from social_network.domain.services.friend import FriendService
+from social_network.domain.services.passwords import (
+    HASHERS,
+    PasswordHasher,
+    Pbkdf2Hasher,
+    ScryptHasher,
+)
 from social_network.domain.services.post import PostService
+from social_network.domain.services.single_flight import SingleFlight
 from social_network.domain.services.user import UserService
 
 __all__ = [
+    "HASHERS",
     "AbstractChatService",
     "AsyncFeedService",
+    "AsyncFeedServicePool",
     "AuthService",
     "ChatService",
     "FeedService",
     "FriendService",
+    "PasswordHasher",
+    "Pbkdf2Hasher",
     "PostService",
     "RedisUDFChatService",
+    "ScryptHasher",
+    "SingleFlight",
     "UserService",
+    "merge_feeds",
 ]
@@ -1,22 +1,32 @@
+import contextlib
 import datetime
+import functools
 import typing
+import uuid
 
 from cryptography import fernet
 from jose import JWTError, jwt
 
 from social_network.domain import exceptions as domain_exceptions
 from social_network.domain import models
-from social_network.domain.services import abstract
+from social_network.domain.services import abstract, passwords
+from social_network.infrastructure import cache, executor
 from social_network.infrastructure.database import exceptions as database_exceptions
 from social_network.infrastructure.database import uow
 
 
+@functools.lru_cache(maxsize=16)
+def get_fernet(secret: str) -> fernet.Fernet:
+    """Разбор ключа Fernet не бесплатный, а секрет на процесс один"""
+    return fernet.Fernet(secret)
+
+
 def encrypt_password(password: str, secret: str) -> str:
-    return fernet.Fernet(secret).encrypt(password.encode()).decode()
+    return get_fernet(secret).encrypt(password.encode()).decode()
 
 
 def decrypt_password(password: str, secret: str) -> str:
-    return fernet.Fernet(secret).decrypt(password).decode()
+    return get_fernet(secret).decrypt(password).decode()
 
 
 def create_access_token(
@@ -33,6 +43,22 @@ def create_access_token(
     )
 
 
+def decode_access_token(
+    token: str, secret: str, algorithm: str
+) -> dict[str, typing.Any]:
+    return jwt.decode(token=token, key=secret, algorithms=[algorithm])
+
+
+@contextlib.contextmanager
+def fernet_errors() -> typing.Iterator[None]:
+    try:
+        yield
+    except ValueError as exc:
+        raise domain_exceptions.FernetKeyError() from exc
+    except (fernet.InvalidToken, fernet.InvalidSignature) as exc:
+        raise domain_exceptions.FernetInvalidTokenError(str(exc)) from exc
+
+
 class AuthService(abstract.AbstractService):
     def __init__(
         self,
@@ -40,29 +66,42 @@ class AuthService(abstract.AbstractService):
         secret: str,
         algorithm: str,
         token_ttl_seconds: int,
+        principal_cache: typing.Optional[cache.PrincipalCache] = None,
+        password_hasher: typing.Optional[passwords.PasswordHasher] = None,
+        crypto_executor: typing.Optional[executor.Executor] = None,
     ) -> None:
         super().__init__(unit_of_work=unit_of_work)
         self._secret = secret
         self._algorithm = algorithm
         self._token_ttl_seconds = token_ttl_seconds
+        self._principal_cache = principal_cache
+        self._password_hasher = password_hasher or passwords.ScryptHasher()
+        # Асинхронные методы выполняют криптографию в пуле, а не в event loop
+        self._crypto_executor = crypto_executor or executor.DEFAULT
 
     @property
     def uow(self) -> uow.UserUnitOfWork:
         return typing.cast(uow.UserUnitOfWork, self._uow)
 
     def encrypt_password(self, password: str) -> str:
-        try:
+        with fernet_errors():
             return encrypt_password(password=password, secret=self._secret)
-        except ValueError as exc:
-            raise domain_exceptions.FernetKeyError() from exc
+
+    async def aencrypt_password(self, password: str) -> str:
+        with fernet_errors():
+            return await self._crypto_executor.run(
+                encrypt_password, password, self._secret
+            )
 
     def decrypt_password(self, password: str) -> str:
-        try:
+        with fernet_errors():
             return decrypt_password(password=password, secret=self._secret)
-        except ValueError as exc:
-            raise domain_exceptions.FernetKeyError() from exc
-        except (fernet.InvalidToken, fernet.InvalidSignature) as exc:
-            raise domain_exceptions.FernetInvalidTokenError(str(exc)) from exc
+
+    async def adecrypt_password(self, password: str) -> str:
+        with fernet_errors():
+            return await self._crypto_executor.run(
+                decrypt_password, password, self._secret
+            )
 
     def create_access_token(self, id_: str) -> str:
         return create_access_token(
@@ -72,23 +111,74 @@ class AuthService(abstract.AbstractService):
             secret=self._secret,
         )
 
+    async def acreate_access_token(self, id_: str) -> str:
+        return await self._crypto_executor.run(
+            create_access_token,
+            id_,
+            self._token_ttl_seconds,
+            self._secret,
+            self._algorithm,
+        )
+
     def decode_access_token(self, token: str) -> dict[str, typing.Any]:
         try:
-            return jwt.decode(
-                token=token, key=self._secret, algorithms=[self._algorithm]
+            return decode_access_token(
+                token=token, secret=self._secret, algorithm=self._algorithm
             )
         except JWTError:
             raise domain_exceptions.InvalidTokenError(token)
 
+    async def adecode_access_token(self, token: str) -> dict[str, typing.Any]:
+        try:
+            return await self._crypto_executor.run(
+                decode_access_token, token, self._secret, self._algorithm
+            )
+        except JWTError:
+            raise domain_exceptions.InvalidTokenError(token)
+
+    def credentials_digest(self, user: models.NewUserDomain, password: str) -> str:
+        return passwords.credentials_digest(
+            user=user, password=password, secret=self._secret
+        )
+
+    async def hash_password(self, password: str) -> str:
+        return await self._crypto_executor.run(self._password_hasher.hash, password)
+
+    async def verify_password(self, password: str, hashed: str) -> bool:
+        if passwords.is_legacy(hashed):
+            return await self.adecrypt_password(password=hashed) == password
+        if (hasher := passwords.hasher_of(hashed)) is None:
+            return False
+        return await self._crypto_executor.run(hasher.verify, password, hashed)
+
+    def password_needs_rehash(self, hashed: str) -> bool:
+        return passwords.is_legacy(hashed) or self._password_hasher.needs_rehash(hashed)
+
     async def _duplicate_exists(self, item: models.NewUserDomain) -> bool:
+        digest = self.credentials_digest(item, item.password)
         async for _ in self.uow.transaction(read_only=True):
-            users = await self.uow.users.find_all(
-                filters=item.model_dump(exclude={"password"}),
-                exclude_deleted=True,
+            users = await self.uow.users.find_duplicates(
+                credentials_digest=digest,
+                profile=item.model_dump(
+                    include={
+                        "first_name",
+                        "second_name",
+                        "birthdate",
+                        "biography",
+                        "city",
+                    }
+                ),
             )
         for user in users:
-            if self.decrypt_password(password=user.password) == item.password:
+            if user.credentials_digest == digest:
                 return True
+            # Старые записи без дайджеста: пароль зашифрован Fernet
+            if user.credentials_digest is None and passwords.is_legacy(user.password):
+                if (
+                    await self.adecrypt_password(password=user.password)
+                    == item.password
+                ):
+                    return True
 
         return False
 
@@ -99,14 +189,17 @@ class AuthService(abstract.AbstractService):
         async for _ in self.uow.transaction():
             user = await self.uow.users.create(
                 models.NewUserDomain(
-                    **new_user.model_dump(exclude={"password"}),
-                    password=self.encrypt_password(password=new_user.password),
+                    **new_user.model_dump(exclude={"password", "credentials_digest"}),
+                    password=await self.hash_password(new_user.password),
+                    credentials_digest=self.credentials_digest(
+                        new_user, new_user.password
+                    ),
                 )
             )
         return user
 
-    async def authorize(self, token: str) -> models.UserDomain:
-        payload = self.decode_access_token(token)
+    async def authorize(self, token: str) -> models.PrincipalDomain:
+        payload = await self.adecode_access_token(token)
         expire = payload.get("exp", 0)
         expire_time = datetime.datetime.fromtimestamp(
             int(expire), tz=datetime.timezone.utc
@@ -117,13 +210,37 @@ class AuthService(abstract.AbstractService):
         if (user_id := payload.get("sub")) is None:
             raise domain_exceptions.InvalidTokenError(token)
 
+        if self._principal_cache is not None:
+            cached = await self._principal_cache.get(user_id, expires_at=int(expire))
+            if cached is not None:
+                return cached
+
         async for _ in self.uow.transaction(read_only=True):
             try:
                 user = await self.uow.users.find_one(user_id)
             except database_exceptions.ObjectDoesNotExistError as exc:
                 raise domain_exceptions.UserNotFoundError(user_id) from exc
 
-        return user
+        principal = models.PrincipalDomain.of(user)
+        if self._principal_cache is not None:
+            await self._principal_cache.set(user_id, principal, expires_at=int(expire))
+        return principal
+
+    async def invalidate_user(self, user_id: typing.Union[str, uuid.UUID]) -> None:
+        """Вызывается при удалении или изменении пользователя"""
+        if self._principal_cache is not None:
+            await self._principal_cache.invalidate(user_id)
+
+    async def _rehash_password(self, user: models.UserDomain, password: str) -> None:
+        """Пароль в старом формате или с устаревшими параметрами пересчитывается при входе"""
+        hashed = await self.hash_password(password)
+        async for _ in self.uow.transaction():
+            await self.uow.users.update_credentials(
+                id_=str(user.id),
+                password=hashed,
+                credentials_digest=self.credentials_digest(user, password),
+            )
+        await self.invalidate_user(user.id)
 
     async def login(self, id_: str, password: str) -> str:
         async for _ in self.uow.transaction(read_only=True):
@@ -132,7 +249,10 @@ class AuthService(abstract.AbstractService):
             except database_exceptions.ObjectDoesNotExistError as err:
                 raise domain_exceptions.UserNotFoundError(id_) from err
 
-        if self.decrypt_password(password=user.password) != password:
+        if not await self.verify_password(password, user.password):
             raise domain_exceptions.WrongPasswordError()
 
-        return self.create_access_token(id_)
+        if self.password_needs_rehash(user.password):
+            await self._rehash_password(user, password)
+
+        return await self.acreate_access_token(id_)
@@ -9,7 +9,7 @@ from redis import asyncio as aioredis
 
 from social_network.domain import exceptions as domain_exceptions
 from social_network.domain import models
-from social_network.domain.models import UserDomain
+from social_network.domain.models import UserProfileDomain
 from social_network.domain.services import abstract
 from social_network.infrastructure.database import (
     exceptions as database_exceptions,
@@ -22,21 +22,21 @@ from social_network.infrastructure.database import (
 class AbstractChatService(abstract.AbstractService):
     @abc.abstractmethod
     async def make_dialog(
-        self, user: models.UserDomain, friend_id: uuid.UUID
+        self, user: models.PrincipalDomain, friend_id: uuid.UUID
     ) -> models.ChatDomain: ...
 
     @abc.abstractmethod
     async def write_message(
-        self, user: models.UserDomain, friend_id: uuid.UUID, text: str
+        self, user: models.PrincipalDomain, friend_id: uuid.UUID, text: str
     ) -> models.ChatMessageDomain: ...
 
     @abc.abstractmethod
     async def show_messages(
-        self, user: models.UserDomain, friend_id: uuid.UUID
+        self, user: models.PrincipalDomain, friend_id: uuid.UUID
     ) -> list[models.ChatMessageDomain]: ...
 
     @staticmethod
-    def _make_chat_name(user: UserDomain, friend: UserDomain) -> str:
+    def _make_chat_name(user: UserProfileDomain, friend: UserProfileDomain) -> str:
         return f"{user.second_name} – {friend.second_name} chat"
 
 
@@ -46,7 +46,7 @@ class ChatService(AbstractChatService):
         return typing.cast(uow.ChatUnitOfWork, self._uow)
 
     async def make_dialog(
-        self, user: models.UserDomain, friend_id: uuid.UUID
+        self, user: models.PrincipalDomain, friend_id: uuid.UUID
     ) -> models.ChatDomain:
         async for _ in self.uow.transaction():
             try:
@@ -77,7 +77,7 @@ class ChatService(AbstractChatService):
         return dialog
 
     async def write_message(
-        self, user: models.UserDomain, friend_id: uuid.UUID, text: str
+        self, user: models.PrincipalDomain, friend_id: uuid.UUID, text: str
     ) -> models.ChatMessageDomain:
         async for _ in self.uow.transaction():
             dialog_id = await self.uow.chats.find_dialog_id(
@@ -98,7 +98,7 @@ class ChatService(AbstractChatService):
         return message
 
     async def show_messages(
-        self, user: models.UserDomain, friend_id: uuid.UUID
+        self, user: models.PrincipalDomain, friend_id: uuid.UUID
     ) -> list[models.ChatMessageDomain]:
         async for _ in self.uow.transaction():
             dialog_id = await self.uow.chats.find_dialog_id(
@@ -136,7 +136,7 @@ class RedisUDFChatService(AbstractChatService):
         return f"messages:{str(dialog_id)}"
 
     async def make_dialog(
-        self, user: models.UserDomain, friend_id: uuid.UUID
+        self, user: models.PrincipalDomain, friend_id: uuid.UUID
     ) -> models.ChatDomain:
         async for _ in self.uow.transaction():
             try:
@@ -159,7 +159,7 @@ class RedisUDFChatService(AbstractChatService):
         return chat
 
     async def write_message(
-        self, user: models.UserDomain, friend_id: uuid.UUID, text: str
+        self, user: models.PrincipalDomain, friend_id: uuid.UUID, text: str
     ) -> models.ChatMessageDomain:
         for chat_id in (
             self.make_dialog_key(user_id=user.id, friend_id=friend_id),
@@ -194,7 +194,7 @@ class RedisUDFChatService(AbstractChatService):
         )
 
     async def show_messages(
-        self, user: models.UserDomain, friend_id: uuid.UUID
+        self, user: models.PrincipalDomain, friend_id: uuid.UUID
     ) -> list[models.ChatMessageDomain]:
         for chat_id in (
             self.make_dialog_key(user_id=user.id, friend_id=friend_id),
@@ -1,8 +1,11 @@
 import asyncio
 import datetime
 import functools
+import heapq
+import itertools
 import json
 import logging
+import operator
 import typing
 import uuid
 
@@ -11,11 +14,36 @@ from redis import asyncio as aioredis
 
 from social_network.api import models as dto
 from social_network.domain import models
-from social_network.domain.services import abstract
-from social_network.infrastructure.database import uow
+from social_network.domain.services import abstract, single_flight
+from social_network.infrastructure import cache, metrics, redis_scripts
+from social_network.infrastructure.database import repository, uow
 
 logger = logging.getLogger(__name__)
 
+FANOUT_ROUTING_KEY = "fanout"
+
+UUID_SIZE = 16
+# Тело удаленного поста. Лента может ссылаться на удаленный пост до своего прогрева
+TOMBSTONE = b""
+# Член множества селебрити, который есть в нем всегда: отличает ленту без селебрити
+# от множества, которого нет в Redis
+CELEBRITIES_SENTINEL = b""
+# Единственный член ленты без постов: пустая лента прогрета и не перечитывается
+# из БД на каждом запросе. Первый разосланный в ленту пост его удаляет
+EMPTY_FEED = b""
+
+FEED_WARM_UPS = metrics.Counter(
+    "social_network_feed_warm_ups_total",
+    "Запросы холодной ленты: leader прогревает ленту, coalesced ждет его результат",
+    labelnames=("role",),
+)
+FEED_CACHE_FALLBACKS = metrics.Counter(
+    "social_network_feed_cache_fallbacks_total",
+    "Запросы мимо свежего кэша: stale – отдали устаревшую ленту и обновляем ее в фоне, "
+    "db – ленту прогревает другой процесс, пошли в БД",
+    labelnames=("reason",),
+)
+
 
 def handle_redis_error():
     def wrapper(func):
@@ -31,6 +59,26 @@ def handle_redis_error():
     return wrapper
 
 
+def merge_feeds(
+    *feeds: list[tuple[bytes, float]], offset: int, limit: int
+) -> list[tuple[bytes, float]]:
+    """
+    K-way слияние лент, отсортированных по убыванию score.
+    Пост селебрити может оказаться и в ленте пользователя (после прогрева из БД),
+    и в outbox автора, поэтому дубликаты отбрасываются
+    """
+    seen: set[bytes] = set()
+    entries: list[tuple[bytes, float]] = []
+    for post_id, score in heapq.merge(*feeds, key=operator.itemgetter(1), reverse=True):
+        if post_id in seen:
+            continue
+        seen.add(post_id)
+        entries.append((post_id, score))
+        if len(entries) == offset + limit:
+            break
+    return entries[offset:]
+
+
 def handle_rmq_error():
     def wrapper(func):
         @functools.wraps(func)
@@ -58,43 +106,196 @@ class AsyncFeedService(abstract.AbstractAsyncService):
         self = cls(exchange=exchange, channel=rmq_channel)
         return self
 
+    @staticmethod
+    def routing_key(user_id: uuid.UUID) -> str:
+        return f"feed:{user_id}"
+
+    @staticmethod
+    def user_id_of(routing_key: str) -> uuid.UUID:
+        return uuid.UUID(routing_key.removeprefix("feed:"))
+
     async def bind(
         self, user_id: uuid.UUID
     ) -> typing.Optional[aio_pika.abc.AbstractQueue]:
+        """
+        Очередь сокета (ws.delivery_mode=queue). У каждого сокета своя очередь,
+        привязанная к ленте пользователя: вкладки одного пользователя получают
+        все сообщения, а не делят их между собой, и закрытие одной вкладки
+        не удаляет очередь остальных
+        """
         queue = None
         if self._channel and self._exchange:
             queue = await self._channel.declare_queue(
-                name=f"feed:{user_id}", durable=True, exclusive=True
+                name=f"{self.routing_key(user_id)}:{uuid.uuid4()}", exclusive=True
             )
-            await queue.bind(self._exchange, routing_key=f"feed:{user_id}")
+            await queue.bind(self._exchange, routing_key=self.routing_key(user_id))
+        return queue
+
+    async def bind_shared(self) -> typing.Optional[aio_pika.abc.AbstractQueue]:
+        """
+        Общая очередь процесса (ws.delivery_mode=shared).
+        Имя выдает брокер, очередь удаляется вместе с соединением.
+        Привязки к лентам пользователей добавляются через subscribe
+        """
+        queue = None
+        if self._channel and self._exchange:
+            queue = await self._channel.declare_queue(exclusive=True, auto_delete=True)
+        return queue
+
+    async def subscribe(
+        self, queue: aio_pika.abc.AbstractQueue, user_id: uuid.UUID
+    ) -> None:
+        if self._exchange:
+            await queue.bind(self._exchange, routing_key=self.routing_key(user_id))
+
+    async def unsubscribe(
+        self, queue: aio_pika.abc.AbstractQueue, user_id: uuid.UUID
+    ) -> None:
+        if self._exchange:
+            await queue.unbind(self._exchange, routing_key=self.routing_key(user_id))
+
+    async def bind_fanout(
+        self, queue_name: str
+    ) -> typing.Optional[aio_pika.abc.AbstractQueue]:
+        """
+        Общая для всех воркеров очередь событий об изменении постов
+        """
+        queue = None
+        if self._channel and self._exchange:
+            queue = await self._channel.declare_queue(name=queue_name, durable=True)
+            await queue.bind(self._exchange, routing_key=FANOUT_ROUTING_KEY)
         return queue
 
+    @handle_rmq_error()
+    async def publish_event(self, event: models.FeedEventDomain) -> bool:
+        """
+        Ставит событие в очередь воркера рассылки.
+        Возвращает False, если очередь недоступна и событие нужно обработать на месте
+        """
+        if not self._exchange:
+            return False
+
+        logger.info(f"publishing {event.type} event {event.id} to {FANOUT_ROUTING_KEY}")
+        await self._exchange.publish(
+            message=aio_pika.Message(
+                event.model_dump_json().encode(),
+                content_type="application/json",
+                message_id=str(event.id),
+                delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+            ),
+            routing_key=FANOUT_ROUTING_KEY,
+        )
+        return True
+
+    @staticmethod
+    def _serialize(data: models.PostDomain) -> bytes:
+        # Клиенты ждут JSON-строку с JSON внутри, поэтому формат сохраняем
+        return json.dumps(
+            dto.PostWsDTO(
+                payload=dto.PostWsPayload(
+                    postId=data.id,
+                    postText=data.text,
+                    author_user_id=data.author_id,
+                )
+            ).model_dump_json()
+        ).encode()
+
     @handle_rmq_error()
     async def publish(
         self, data: models.PostDomain, to: typing.Optional[uuid.UUID] = None
     ) -> None:
         routing_key = "feed"
         if to:
-            routing_key = f"{routing_key}:{to}"
+            routing_key = self.routing_key(to)
 
         if self._exchange:
             logger.info(f"publishing {data} to {routing_key}")
             await self._exchange.publish(
                 message=aio_pika.Message(
-                    json.dumps(
-                        dto.PostWsDTO(
-                            payload=dto.PostWsPayload(
-                                postId=data.id,
-                                postText=data.text,
-                                author_user_id=data.author_id,
-                            )
-                        ).model_dump_json()
-                    ).encode(),
+                    self._serialize(data),
                     delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
                 ),
                 routing_key=routing_key,
             )
 
+    async def publish_many(
+        self, data: models.PostDomain, to: list[uuid.UUID], batch_size: int = 500
+    ) -> int:
+        """
+        Рассылает пост в очереди нескольких пользователей.
+        Сообщение сериализуется один раз, публикации пачки уходят в канал подряд,
+        а подтверждения брокера (publisher confirms) ожидаются все вместе.
+        У пользователя без открытого соединения нет очереди, поэтому сообщение
+        публикуется без mandatory: брокер молча отбрасывает его вместо Basic.Return.
+        Возвращает количество неудачных публикаций. Если не удалась ни одна,
+        брокер недоступен: исключение пробрасывается, и событие можно повторить,
+        не продублировав уже доставленные сообщения
+        """
+        if not self._exchange or not to:
+            return 0
+
+        message = aio_pika.Message(
+            self._serialize(data), delivery_mode=aio_pika.DeliveryMode.PERSISTENT
+        )
+        failures: list[BaseException] = []
+        for batch in itertools.batched(to, batch_size):
+            results = await asyncio.gather(
+                *(
+                    self._exchange.publish(
+                        message=message,
+                        routing_key=self.routing_key(user_id),
+                        mandatory=False,
+                    )
+                    for user_id in batch
+                ),
+                return_exceptions=True,
+            )
+            failures.extend(
+                result for result in results if isinstance(result, BaseException)
+            )
+
+        if failures:
+            logger.error(
+                f"Failed to publish post {data.id} to {len(failures)} of {len(to)} feeds: "
+                f"{', '.join(sorted({type(exc).__name__ for exc in failures}))}"
+            )
+            if len(failures) == len(to):
+                raise failures[0]
+        else:
+            logger.info(f"Published post {data.id} to {len(to)} feeds")
+        return len(failures)
+
+
+class AsyncFeedServicePool:
+    """
+    Пул сервисов публикации, созданный один раз на время жизни приложения.
+    Каждый сервис работает на своем канале RMQ с уже объявленным exchange,
+    поэтому запросу не нужен лишний поход в брокер, а публикации разных
+    запросов распределяются по каналам по кругу
+    """
+
+    def __init__(self, async_feed_services: list[AsyncFeedService]) -> None:
+        self._async_feed_services = itertools.cycle(async_feed_services)
+
+    @classmethod
+    async def create(
+        cls,
+        rmq_connection: typing.Optional[aio_pika.abc.AbstractRobustConnection],
+        size: int,
+    ) -> "AsyncFeedServicePool":
+        if rmq_connection is None:
+            return cls([AsyncFeedService(exchange=None, channel=None)])
+        async_feed_services = []
+        for _ in range(size):
+            channel = typing.cast(
+                aio_pika.abc.AbstractRobustChannel, await rmq_connection.channel()
+            )
+            async_feed_services.append(await AsyncFeedService.create(channel))
+        return cls(async_feed_services)
+
+    def get(self) -> AsyncFeedService:
+        return next(self._async_feed_services)
+
 
 class FeedService(abstract.AbstractService):
     def __init__(
@@ -104,16 +305,43 @@ class FeedService(abstract.AbstractService):
         async_feed_service: AsyncFeedService,
         cache_capacity: int = 1000,
         ttl: int = 600,
+        max_staleness: int = 300,
         lock_timeout: float = 60.0,
         celebrity_friends_threshold: int = 500,
+        fanout_batch_size: int = 500,
+        fanout_worker_is_enabled: bool = False,
+        post_ttl: int = 24 * 60 * 60,
+        warm_ups: typing.Optional[single_flight.SingleFlight[bool]] = None,
+        timeline_is_enabled: bool = False,
     ) -> None:
         super().__init__(unit_of_work)
         self._async_feed_service = async_feed_service
         self._capacity = cache_capacity
         self._ttl = ttl
+        self._max_staleness = max_staleness
         self._lock_timeout = lock_timeout
         self._redis = redis
         self._celebrity_friends_threshold = celebrity_friends_threshold
+        self._fanout_batch_size = fanout_batch_size
+        self._fanout_worker_is_enabled = fanout_worker_is_enabled
+        self._post_ttl = post_ttl
+        self._warm_ups = warm_ups or single_flight.SingleFlight()
+        self._timeline_is_enabled = timeline_is_enabled
+        self._push_script = self._redis.register_script(
+            redis_scripts.load_script(redis_scripts.FEED_PUSH)
+        )
+        self._remove_script = self._redis.register_script(
+            redis_scripts.load_script(redis_scripts.FEED_REMOVE)
+        )
+        self._replace_script = self._redis.register_script(
+            redis_scripts.load_script(redis_scripts.FEED_REPLACE)
+        )
+        self._celebrities_add_script = self._redis.register_script(
+            redis_scripts.load_script(redis_scripts.CELEBRITIES_ADD)
+        )
+        self._posts_cache_script = self._redis.register_script(
+            redis_scripts.load_script(redis_scripts.POSTS_CACHE)
+        )
 
     @property
     def uow(self) -> uow.FeedUnitOfWork:
@@ -128,87 +356,345 @@ class FeedService(abstract.AbstractService):
         return f"lock:{user_id}"
 
     @staticmethod
-    def ttl_key(user_id: uuid.UUID) -> str:
-        return f"ttl:{user_id}"
+    def outbox_key(user_id: uuid.UUID) -> str:
+        return f"outbox:{user_id}"
 
     @staticmethod
-    def _parse(post: models.PostDomain) -> tuple[str, float]:
-        return post.model_dump_json(), post.updated_at.timestamp()
+    def celebrities_key(user_id: uuid.UUID) -> str:
+        return f"celebrities:{user_id}"
 
-    async def _count(self, user_id) -> int:
-        return await self._redis.zcard(self.feed_key(user_id))
+    @staticmethod
+    def warm_up_key(user_id: uuid.UUID) -> str:
+        return f"warmup:{user_id}:{uuid.uuid4()}"
 
-    async def _add(self, post: models.PostDomain, user_id: uuid.UUID) -> None:
-        data, score = self._parse(post)
-        await self._redis.zadd(name=self.feed_key(user_id), mapping={data: score})
+    @staticmethod
+    def post_key(post_id: uuid.UUID) -> str:
+        return f"post:{post_id}"
 
-    async def _expire(self, user_id: uuid.UUID, ttl: int) -> None:
-        await self._redis.set(
-            name=self.ttl_key(user_id),
-            value=str(
-                (
-                    datetime.datetime.now(datetime.timezone.utc)
-                    + datetime.timedelta(seconds=ttl)
-                ).timestamp()
-            ),
-        )
+    @staticmethod
+    def _parse(post: models.PostDomain) -> tuple[bytes, float]:
+        """
+        Лента хранит только идентификатор поста, тело поста лежит в post:{id}
+        в единственном экземпляре
+        """
+        return post.id.bytes, post.created_at.timestamp()
 
-    async def _is_expired(self, user_id: uuid.UUID) -> bool:
-        expiration_ts = await self._redis.get(self.ttl_key(user_id)) or 0
-        return datetime.datetime.now(datetime.timezone.utc).timestamp() > float(
-            expiration_ts
+    async def _cache_posts(
+        self, pipe: aioredis.client.Pipeline, posts: typing.Iterable[models.PostDomain]
+    ) -> None:
+        """
+        Тела постов пишутся Lua-скриптом, который не перезаписывает tombstone:
+        событие создания или изменения, пришедшее после удаления, не воскрешает пост
+        """
+        posts = list(posts)
+        if not posts:
+            return
+        await self._posts_cache_script(
+            keys=[self.post_key(post.id) for post in posts],
+            args=[self._post_ttl, *map(cache.encode_post, posts)],
+            client=pipe,
         )
 
+    async def _load(self, post_ids: list[bytes]) -> list[models.PostDomain]:
+        """
+        Тела постов читаются одним MGET. Удаленные посты (tombstone) пропускаются,
+        вытесненные из кэша – дочитываются из БД и кэшируются заново
+        """
+        if not post_ids:
+            return []
+
+        # Ленты, прогретые до перехода на общий кэш постов, хранят посты целиком
+        bodies: list[typing.Any] = [
+            post_id if len(post_id) != UUID_SIZE else None for post_id in post_ids
+        ]
+        keys = [
+            self.post_key(uuid.UUID(bytes=post_id))
+            for post_id, body in zip(post_ids, bodies)
+            if body is None
+        ]
+        if keys:
+            cached = iter(await self._redis.mget(keys))
+            bodies = [body if body is not None else next(cached) for body in bodies]
+
+        missing = [
+            uuid.UUID(bytes=post_id)
+            for post_id, body in zip(post_ids, bodies)
+            if body is None
+        ]
+        posts_from_db: dict[uuid.UUID, models.PostDomain] = {}
+        if missing:
+            logger.info(f"Posts {missing} are evicted from cache. Load from db")
+            async for _ in self.uow.transaction():
+                posts_from_db = {
+                    post.id: post for post in await self.uow.posts.find_many(missing)
+                }
+            async with self._redis.pipeline(transaction=False) as pipe:
+                await self._cache_posts(pipe, posts_from_db.values())
+                for id_ in missing:
+                    if id_ not in posts_from_db:
+                        pipe.set(self.post_key(id_), TOMBSTONE, ex=self._post_ttl)
+                await pipe.execute()
+
+        posts = []
+        for post_id, body in zip(post_ids, bodies):
+            if body == TOMBSTONE:
+                continue
+            if body is None:
+                if post := posts_from_db.get(uuid.UUID(bytes=post_id)):
+                    posts.append(post)
+                continue
+            posts.append(cache.decode_post(body))
+        return posts
+
+    def _feed_repository(
+        self,
+    ) -> typing.Union[repository.PostRepository, repository.TimelineRepository]:
+        """
+        Материализованные ленты (timelines) читаются по первичному ключу одной секции
+        вместо соединения постов с друзьями и сортировки
+        """
+        if self._timeline_is_enabled:
+            return self.uow.timelines
+        return self.uow.posts
+
+    @property
+    def _lifetime(self) -> int:
+        """Лента живет ttl секунд свежей и еще max_staleness секунд устаревшей"""
+        return self._ttl + self._max_staleness
+
+    def _is_fresh(self, ttl_ms: int) -> bool:
+        """
+        Срок жизни ленты – нативный TTL ключа. Его задает только прогрев, рассылка
+        постов его не продлевает. Пока до удаления ключа осталось больше
+        max_staleness, лента свежая.
+        -2 – ленты нет, -1 – лента без срока жизни (из старой версии), ее нужно пересобрать
+        """
+        return ttl_ms > self._max_staleness * 1000
+
     async def _invalidate(self, user_id: uuid.UUID) -> None:
-        await self._redis.delete(self.feed_key(user_id))
+        await self._redis.delete(self.feed_key(user_id), self.celebrities_key(user_id))
+
+    async def _renew_outboxes(self, celebrities: list[uuid.UUID]) -> None:
+        """
+        Outbox должен жить не меньше лент, которые его читают: прогрев ленты продлевает
+        outbox ее селебрити до срока жизни ленты (EXPIRE GT не укорачивает срок).
+        Outbox, которого нет, не создается – в прогретой ленте уже есть все посты
+        селебрити из БД, а новые посты создадут outbox заново
+        """
+        if not celebrities:
+            return
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for celebrity in celebrities:
+                pipe.expire(self.outbox_key(celebrity), self._lifetime, gt=True)
+            await pipe.execute()
+
+    def _store_celebrities(
+        self,
+        pipe: aioredis.client.Pipeline,
+        user_id: uuid.UUID,
+        celebrities: list[uuid.UUID],
+        ttl_ms: int,
+    ) -> None:
+        pipe.delete(self.celebrities_key(user_id))
+        pipe.sadd(
+            self.celebrities_key(user_id),
+            CELEBRITIES_SENTINEL,
+            *(str(celebrity) for celebrity in celebrities),
+        )
+        pipe.pexpire(self.celebrities_key(user_id), ttl_ms)
+
+    async def _rebuild_celebrities(self, user_id: uuid.UUID, ttl_ms: int) -> set[bytes]:
+        """
+        Множество селебрити пропало, а лента еще жива: собираем его из БД
+        на оставшийся срок жизни ленты, иначе посты селебрити выпадут из ленты
+        """
+        logger.info(f"Rebuilding {self.celebrities_key(user_id)}")
+        async for _ in self.uow.transaction():
+            celebrities = await self.uow.friends.find_celebrities(
+                user_id=user_id, threshold=self._celebrity_friends_threshold
+            )
+        await self._renew_outboxes(celebrities)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            self._store_celebrities(
+                pipe,
+                user_id,
+                celebrities,
+                ttl_ms if ttl_ms > 0 else self._lifetime * 1000,
+            )
+            await pipe.execute()
+        return {str(celebrity).encode() for celebrity in celebrities}
 
     async def _warm_up(self, user_id: uuid.UUID) -> None:
         logger.info(f"Warming up {self.feed_key(user_id)}")
-        posts_count = await self._count(user_id)
-        if posts_count:
-            await self._redis.delete(self.feed_key(user_id))
-
+        started_at = datetime.datetime.now(tz=datetime.timezone.utc).timestamp()
         async for _ in self.uow.transaction():
-            posts = await self.uow.posts.feed(
+            posts = await self._feed_repository().feed(
                 user_id=user_id,
                 offset=0,
                 limit=self._capacity,
             )
-        for post in posts:
-            await self._add(post=post, user_id=user_id)
-        await self._expire(user_id=user_id, ttl=self._ttl)
+            celebrities = await self.uow.friends.find_celebrities(
+                user_id=user_id, threshold=self._celebrity_friends_threshold
+            )
 
-    @handle_redis_error()
-    async def _cache_post(
-        self, friend: models.FriendDomain, post: models.PostDomain
+        # Читатели ходят в кэш без блокировки и не должны видеть ленту частично
+        # заполненной. Поэтому лента собирается во временном ключе одним pipeline
+        # (тела постов и один ZADD), а подменяется атомарным RENAME.
+        # Временный ключ живет столько же, сколько лента: если прогрев прервется,
+        # он удалится сам, а RENAME перенесет его срок жизни на ленту.
+        # Посты, разосланные в живую ленту после чтения БД, скрипт переносит
+        # во временный ключ перед RENAME
+        warm_up_key = self.warm_up_key(user_id)
+        # Без постов в ленту переносится все, что разослано после начала чтения
+        newest_score = max(
+            (score for _, score in map(self._parse, posts)), default=started_at
+        )
+        async with self._redis.pipeline(transaction=False) as pipe:
+            await self._cache_posts(pipe, posts)
+            pipe.zadd(
+                name=warm_up_key,
+                mapping=dict(map(self._parse, posts)) if posts else {EMPTY_FEED: 0},
+            )
+            pipe.expire(warm_up_key, self._lifetime)
+            await pipe.execute()
+
+        # Посты селебрити не рассылаются по лентам, их забираем из outbox при чтении.
+        # Множество селебрити живет столько же, сколько лента
+        await self._renew_outboxes(celebrities)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            await self._replace_script(
+                keys=[warm_up_key, self.feed_key(user_id)],
+                args=[newest_score, self._capacity],
+                client=pipe,
+            )
+            self._store_celebrities(pipe, user_id, celebrities, self._lifetime * 1000)
+            await pipe.execute()
+
+    async def _refresh(self, user_id: uuid.UUID, wait: bool) -> bool:
+        """
+        Прогрев ленты под блокировкой Redis – один на кластер.
+        Если ленту уже прогревает другой процесс, то без wait сразу возвращает False,
+        а с wait дожидается его и не прогревает ленту повторно
+        """
+        lock = self._redis.lock(name=self.lock_key(user_id), timeout=self._lock_timeout)
+        if not await lock.acquire(blocking=wait, blocking_timeout=self._lock_timeout):
+            return False
+
+        try:
+            if not self._is_fresh(await self._redis.pttl(self.feed_key(user_id))):
+                await self._warm_up(user_id=user_id)
+        finally:
+            await lock.release()
+        return True
+
+    async def _revalidate(self, user_id: uuid.UUID) -> bool:
+        """
+        Фоновое обновление устаревшей ленты. Сессия unit of work хранится
+        в контексте задачи, поэтому фоновая транзакция не мешает запросу, который ее запустил
+        """
+        try:
+            return await self._refresh(user_id=user_id, wait=False)
+        except Exception:
+            logger.exception(f"Failed to refresh {self.feed_key(user_id)}")
+            return False
+
+    async def _push(
+        self, friends: list[models.FriendDomain], post: models.PostDomain
     ) -> None:
-        async with self._redis.lock(
-            name=self.lock_key(friend.friend_id),
-            blocking_timeout=self._lock_timeout,
+        """
+        Добавляем пост в ленты друзей пачками: один pipeline на пачку,
+        внутри которого на каждую ленту выполняется Lua-скрипт.
+        Скрипт атомарен, поэтому блокировка ленты на запись не нужна
+        """
+        data, score = self._parse(post)
+        async with self._redis.pipeline(transaction=False) as pipe:
+            await self._cache_posts(pipe, [post])
+            await pipe.execute()
+
+        for batch in itertools.batched(friends, self._fanout_batch_size):
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for friend in batch:
+                    await self._push_script(
+                        keys=[self.feed_key(friend.friend_id)],
+                        args=[data, score, self._capacity],
+                        client=pipe,
+                    )
+                results = await pipe.execute()
+            logger.info(
+                f"Added post {post.id} to {results.count(1)} feeds, "
+                f"skipped {results.count(0)} cold feeds"
+            )
+
+    async def _push_to_outbox(
+        self,
+        user_id: uuid.UUID,
+        friends: list[models.FriendDomain],
+        post: models.PostDomain,
+    ) -> None:
+        """
+        Пост селебрити кладем только в его outbox – O(1) вместо O(friends).
+        Ленты друзей подтянут его при чтении.
+
+        Если outbox еще не было, автор мог только что стать селебрити: ленты друзей,
+        прогретые раньше, о нем не знают. Тогда добавляем автора в их множества
+        селебрити – O(friends), но один раз на переход
+        """
+        data, score = self._parse(post)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.exists(self.outbox_key(user_id))
+            await self._cache_posts(pipe, [post])
+            pipe.zadd(self.outbox_key(user_id), mapping={data: score})
+            pipe.zremrangebyrank(self.outbox_key(user_id), 0, -(self._capacity + 1))
+            pipe.expire(self.outbox_key(user_id), self._lifetime)
+            outbox_exists, *_ = await pipe.execute()
+        logger.info(f"Added post {post.id} to {self.outbox_key(user_id)}")
+        if outbox_exists:
+            return
+
+        added = 0
+        for batch in itertools.batched(friends, self._fanout_batch_size):
+            added += await self._celebrities_add_script(
+                keys=[self.celebrities_key(friend.friend_id) for friend in batch],
+                args=[str(user_id)],
+            )
+        logger.info(f"Added celebrity {user_id} to {added} warm feeds")
+
+    async def notify(self, event: models.FeedEventDomain) -> None:
+        """
+        Если включен воркер рассылки, отдаем ему событие и не ждем обновления лент.
+        Иначе (или если очередь недоступна) обновляем ленты в рамках запроса
+        """
+        if (
+            self._fanout_worker_is_enabled
+            and await self._async_feed_service.publish_event(event)
         ):
-            posts_count = await self._count(friend.friend_id)
-            if not posts_count:
-                logger.info(
-                    f"Cache {self.feed_key(friend.friend_id)} is not warmed up yet. Skip."
-                )
-                return
+            return None
+        await self._apply_in_place(event)
 
-            is_expired = await self._is_expired(user_id=friend.friend_id)
-            if is_expired:
-                logger.info(
-                    f"Cache {self.feed_key(friend.friend_id)} is expired. Warm up"
-                )
-                await self._warm_up(user_id=friend.friend_id)
-                return
+    @handle_rmq_error()
+    @handle_redis_error()
+    async def _apply_in_place(self, event: models.FeedEventDomain) -> None:
+        """Кэш лент не должен ронять запрос, изменивший пост: ошибки Redis и RMQ глотаем"""
+        await self.apply(event)
 
-            if extra_feed_posts_count := max(-1, posts_count - self._capacity) + 1:
-                await self._redis.zpopmin(
-                    self.feed_key(friend.friend_id), extra_feed_posts_count
+    async def apply(self, event: models.FeedEventDomain) -> None:
+        """
+        Ошибки Redis и RMQ пробрасываются: воркер рассылки повторяет событие
+        или отправляет его в dead-letter очередь
+        """
+        match event.type:
+            case models.FeedEventType.created:
+                await self.add_post(
+                    user_id=event.user_id,
+                    post=typing.cast(models.PostDomain, event.post),
                 )
-
-            await self._add(post=post, user_id=friend.friend_id)
-            await self._expire(user_id=friend.friend_id, ttl=self._ttl)
-            logger.info(f"Added post {post.id} to {self.feed_key(friend.friend_id)}")
+            case models.FeedEventType.updated:
+                await self.update_post(
+                    user_id=event.user_id,
+                    post=typing.cast(models.PostDomain, event.post),
+                )
+            case models.FeedEventType.deleted:
+                await self.delete_post(user_id=event.user_id, post_id=event.post_id)
 
     async def add_post(self, user_id: uuid.UUID, post: models.PostDomain) -> None:
         async for _ in self.uow.transaction():
@@ -216,57 +702,85 @@ class FeedService(abstract.AbstractService):
                 exclude_deleted=True,
                 filters={"user_id": user_id},
             )
+            if self._timeline_is_enabled:
+                await self.uow.timelines.create(post)
         if len(friends) > self._celebrity_friends_threshold:
             # Невилируем эффект Леди Гаги.
             # Пользователи делятся на селебрити и обычных.
-            # Для селебрити они просто добавляют посты, для обычных - добавляют посты и обновляют ленту
+            # Посты селебрити попадают в их outbox (pull), посты обычных рассылаются по лентам (push)
+            await self._push_to_outbox(user_id=user_id, friends=friends, post=post)
             return None
 
-        for friend in friends:
-            await asyncio.gather(
-                self._async_feed_service.publish(data=post, to=friend.friend_id),
-                self._cache_post(friend=friend, post=post),
-            )
+        await asyncio.gather(
+            self._push(friends=friends, post=post),
+            self._async_feed_service.publish_many(
+                data=post,
+                to=[friend.friend_id for friend in friends],
+                batch_size=self._fanout_batch_size,
+            ),
+        )
 
-    @handle_redis_error()
     async def delete_post(self, user_id: uuid.UUID, post_id: uuid.UUID) -> None:
-        async for _ in self.uow.transaction():
-            friends, post = await asyncio.gather(
-                self.uow.friends.find_all(
-                    exclude_deleted=True,
-                    filters={"user_id": user_id},
-                ),
-                self.uow.posts.find_one(str(post_id)),
-            )
-        for friend in friends:
-            async with self._redis.lock(
-                name=self.lock_key(friend.friend_id),
-                blocking_timeout=self._lock_timeout,
-            ):
-                await self._invalidate(friend.friend_id)
-                logger.info(
-                    f"Deleted post {post.id} from {self.feed_key(friend.friend_id)} – invalidated cache"
-                )
-
-    @handle_redis_error()
-    async def update_post(self, user_id: uuid.UUID, post: models.PostDomain) -> None:
+        """
+        Тело поста заменяем на tombstone, а сам пост точечно удаляем из лент друзей
+        и outbox автора: один Lua-скрипт на пачку лент, остальной кэш остается прогретым
+        """
         async for _ in self.uow.transaction():
             friends = await self.uow.friends.find_all(
                 exclude_deleted=True,
                 filters={"user_id": user_id},
             )
-        for friend in friends:
-            async with self._redis.lock(
-                name=self.lock_key(friend.friend_id),
-                blocking_timeout=self._lock_timeout,
-            ):
-                await self._invalidate(friend.friend_id)
-                logger.info(
-                    f"Updated post {post.id} from {self.feed_key(friend.friend_id)} – invalidated cache"
+            if self._timeline_is_enabled:
+                await self.uow.timelines.delete(
+                    await self.uow.posts.find_one(str(post_id))
                 )
+        await self._redis.set(self.post_key(post_id), TOMBSTONE, ex=self._post_ttl)
+
+        keys = [
+            self.outbox_key(user_id),
+            *(self.feed_key(friend.friend_id) for friend in friends),
+        ]
+        removed = 0
+        for batch in itertools.batched(keys, self._fanout_batch_size):
+            removed += await self._remove_script(keys=batch, args=[post_id.bytes])
+        logger.info(f"Deleted post {post_id} of {user_id} from {removed} feeds")
+
+    async def update_post(self, user_id: uuid.UUID, post: models.PostDomain) -> None:
+        """
+        Score поста – время создания, поэтому редактирование не меняет порядок лент:
+        достаточно перезаписать тело поста
+        """
+        await self._redis.set(
+            self.post_key(post.id), cache.encode_post(post), ex=self._post_ttl
+        )
+        logger.info(f"Updated post {post.id} of {user_id} in {self.post_key(post.id)}")
 
-    @handle_redis_error()
     async def add_friend(self, user_id: uuid.UUID, friend_id: uuid.UUID) -> None:
+        if self._timeline_is_enabled:
+            async for _ in self.uow.transaction():
+                await self.uow.timelines.add_author(
+                    user_id=user_id, author_id=friend_id
+                )
+                await self.uow.timelines.add_author(
+                    user_id=friend_id, author_id=user_id
+                )
+        await self._invalidate_friends(user_id=user_id, friend_id=friend_id)
+
+    async def delete_friend(self, user_id: uuid.UUID, friend_id: uuid.UUID) -> None:
+        if self._timeline_is_enabled:
+            async for _ in self.uow.transaction():
+                await self.uow.timelines.remove_author(
+                    user_id=user_id, author_id=friend_id
+                )
+                await self.uow.timelines.remove_author(
+                    user_id=friend_id, author_id=user_id
+                )
+        await self._forget_friends(user_id=user_id, friend_id=friend_id)
+
+    @handle_redis_error()
+    async def _invalidate_friends(
+        self, user_id: uuid.UUID, friend_id: uuid.UUID
+    ) -> None:
         """Нужно удалить из ленты пользователя посты его друзей. Операция редкая – проще инвалидировать кэш"""
         for id_ in (user_id, friend_id):
             async with self._redis.lock(
@@ -276,7 +790,7 @@ class FeedService(abstract.AbstractService):
                 logger.info(f"Added friend {friend_id} to {id_} – invalidated cache")
 
     @handle_redis_error()
-    async def delete_friend(self, user_id: uuid.UUID, friend_id: uuid.UUID) -> None:
+    async def _forget_friends(self, user_id: uuid.UUID, friend_id: uuid.UUID) -> None:
         """
         Нужно удалить из ленты пользователя посты его удаленного друга.
         Операция редкая – проще инвалидировать кэш
@@ -290,55 +804,220 @@ class FeedService(abstract.AbstractService):
                     f"Removed friendship between {friend_id} and {id_} – invalidated cache"
                 )
 
+    @staticmethod
+    def _range(
+        pipe: aioredis.client.Pipeline,
+        key: str,
+        start: int,
+        limit: int,
+        cursor: typing.Optional[models.FeedCursor],
+    ) -> None:
+        """
+        Добавляет в pipeline чтение страницы ключа: по позиции или после курсора.
+        Курсор переводится в score, поэтому глубина страницы не влияет на стоимость
+        чтения. Посты с тем же score, что и у курсора, читаются отдельно: среди них
+        нужны только те, что идут после курсора по id
+        """
+        if cursor is None:
+            pipe.zrange(
+                name=key, start=start, end=start + limit - 1, desc=True, withscores=True
+            )
+            return
+
+        score = cursor.created_at.timestamp()
+        pipe.zrevrangebyscore(name=key, max=score, min=score, withscores=True)
+        pipe.zrevrangebyscore(
+            name=key,
+            max=f"({score}",
+            min="-inf",
+            start=0,
+            num=limit,
+            withscores=True,
+        )
+
+    @staticmethod
+    def _pages(
+        results: list[typing.Any], cursor: typing.Optional[models.FeedCursor]
+    ) -> list[list[tuple[bytes, float]]]:
+        """
+        Собирает ответы, добавленные в pipeline через _range, в страницы ключей.
+        Метка пустой ленты в страницы не попадает
+        """
+        if cursor is None:
+            pages = results
+        else:
+            pages = [
+                [
+                    (post_id, score)
+                    for post_id, score in ties
+                    if post_id < cursor.id.bytes
+                ]
+                + older
+                for ties, older in itertools.batched(results, 2)
+            ]
+        return [
+            [(post_id, score) for post_id, score in page if post_id != EMPTY_FEED]
+            for page in pages
+        ]
+
+    async def _read(
+        self,
+        user_id: uuid.UUID,
+        offset: int,
+        limit: int,
+        cursor: typing.Optional[models.FeedCursor],
+    ) -> tuple[int, int, set[bytes], list[tuple[bytes, float]]]:
+        """Срок жизни, размер ленты, селебрити и страница ленты за один запрос в Redis"""
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.pttl(self.feed_key(user_id))
+            pipe.zcard(self.feed_key(user_id))
+            pipe.smembers(self.celebrities_key(user_id))
+            self._range(pipe, self.feed_key(user_id), offset, limit, cursor)
+            ttl_ms, posts_count, celebrities, *page = await pipe.execute()
+        (entries,) = self._pages(page, cursor)
+        return ttl_ms, posts_count, celebrities, entries[:limit]
+
+    @staticmethod
+    def _cursor_of(entry: tuple[bytes, float]) -> models.FeedCursor:
+        """Позиция записи ленты. Удаленный пост тоже задает позицию"""
+        post_id, score = entry
+        if len(post_id) != UUID_SIZE:
+            return models.FeedCursor.of(cache.decode_post(post_id))
+        return models.FeedCursor(
+            created_at=datetime.datetime.fromtimestamp(score, tz=datetime.timezone.utc),
+            id=uuid.UUID(bytes=post_id),
+        )
+
+    async def _feed_from_cache(
+        self,
+        user_id: uuid.UUID,
+        offset: int,
+        limit: int,
+        cursor: typing.Optional[models.FeedCursor] = None,
+    ) -> typing.Optional[
+        tuple[list[models.PostDomain], list[tuple[bytes, float]], bool]
+    ]:
+        """
+        Возвращает страницу ленты из кэша, просмотренные записи ленты (вместе
+        с удаленными постами) и признак того, что лента в кэше обрезана
+        по емкости (следующие посты нужно искать в БД).
+
+        Stale-while-revalidate: устаревшая лента отдается сразу и обновляется в фоне.
+        Холодную ленту прогревает один запрос на процесс (single flight) и один на кластер
+        (блокировка в Redis), остальные ждут его. None – лента холодная и прогреть ее
+        не удалось
+        """
+        logger.info(f"Feed from cache {self.feed_key(user_id)}")
+        key = self.feed_key(user_id)
+        ttl_ms, posts_count, celebrities, entries = await self._read(
+            user_id=user_id, offset=offset, limit=limit, cursor=cursor
+        )
+        if not posts_count:
+            is_warm, is_leader = await self._warm_ups.do(
+                key, functools.partial(self._refresh, user_id=user_id, wait=True)
+            )
+            FEED_WARM_UPS.inc(role="leader" if is_leader else "coalesced")
+            if not is_warm:
+                FEED_CACHE_FALLBACKS.inc(reason="db")
+                return None
+            ttl_ms, posts_count, celebrities, entries = await self._read(
+                user_id=user_id, offset=offset, limit=limit, cursor=cursor
+            )
+        elif not self._is_fresh(ttl_ms):
+            FEED_CACHE_FALLBACKS.inc(reason="stale")
+            self._warm_ups.start(key, functools.partial(self._revalidate, user_id))
+
+        if CELEBRITIES_SENTINEL not in celebrities:
+            celebrities = await self._rebuild_celebrities(user_id, ttl_ms)
+        celebrities.discard(CELEBRITIES_SENTINEL)
+        if celebrities:
+            # Гибридная лента: то, что разослано пользователю (push),
+            # сливаем с outbox селебрити, на которых он подписан (pull).
+            # По позиции страницу можно найти только после слияния с начала лент
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for feed_key in (
+                    key,
+                    *(
+                        self.outbox_key(
+                            uuid.UUID(typing.cast(bytes, celebrity).decode())
+                        )
+                        for celebrity in celebrities
+                    ),
+                ):
+                    self._range(
+                        pipe,
+                        feed_key,
+                        0,
+                        limit if cursor else offset + limit,
+                        cursor,
+                    )
+                feeds = self._pages(await pipe.execute(), cursor)
+            entries = merge_feeds(*feeds, offset=0 if cursor else offset, limit=limit)
+
+        posts = await self._load([post_id for post_id, _ in entries])
+        return posts, entries, posts_count >= self._capacity
+
     async def feed(
-        self, user_id: uuid.UUID, offset: int, limit: int
+        self,
+        user_id: uuid.UUID,
+        offset: int,
+        limit: int,
+        cursor: typing.Optional[models.FeedCursor] = None,
     ) -> list[models.PostDomain]:
-        use_cache = True
-        if offset > self._capacity:
-            use_cache = False
+        page = await self.feed_page(
+            user_id=user_id, offset=offset, limit=limit, cursor=cursor
+        )
+        return page.posts
+
+    async def feed_page(
+        self,
+        user_id: uuid.UUID,
+        offset: int,
+        limit: int,
+        cursor: typing.Optional[models.FeedCursor] = None,
+    ) -> models.FeedPage:
+        """
+        Страница ленты по позиции (offset) или после курсора. С курсором offset
+        игнорируется, а страница находится и в кэше, и в БД по ключу (created_at, id),
+        поэтому стоимость чтения не растет с глубиной прокрутки.
+
+        Удаленные посты в кэше занимают место в странице, но в нее не попадают.
+        Следующий курсор указывает на последнюю просмотренную запись, поэтому
+        короткая страница не обрывает прокрутку
+        """
+        if cursor is not None:
+            offset = 0
 
         posts_from_cache: list[models.PostDomain] = []
-        if use_cache:
-            logger.info(f"Feed from cache {self.feed_key(user_id)}")
-            lock = self._redis.lock(
-                name=self.lock_key(user_id), timeout=self._lock_timeout
+        entries: list[tuple[bytes, float]] = []
+        cache_is_truncated = True
+        if offset < self._capacity:
+            cached = await self._feed_from_cache(
+                user_id=user_id, offset=offset, limit=limit, cursor=cursor
             )
-            lock_acquired = await lock.acquire(blocking=False)
-            if lock_acquired:
-                posts_count = await self._redis.zcard(self.feed_key(user_id))
-                is_expired = await self._is_expired(user_id=user_id)
-                if not posts_count or is_expired:
-                    await self._warm_up(user_id=user_id)
-
-                cached_posts = await self._redis.zrange(
-                    name=self.feed_key(user_id),
-                    start=offset,
-                    end=offset + limit,
-                    desc=True,
-                )
-                posts_from_cache = [
-                    models.PostDomain(**json.loads(post)) for post in cached_posts
-                ]
-                await lock.release()
+            if cached is not None:
+                posts_from_cache, entries, cache_is_truncated = cached
 
-        if (
-            len(posts_from_cache) < limit
-            and len(posts_from_cache) + offset <= self._capacity
-        ):
-            return posts_from_cache
-
-        if (
-            len(posts_from_cache) >= limit
-            or self._capacity < len(posts_from_cache) + offset
-        ):
-            return posts_from_cache[: limit + 1]
+        if len(entries) >= limit:
+            return models.FeedPage(
+                posts=posts_from_cache, next_cursor=self._cursor_of(entries[-1])
+            )
+        if not cache_is_truncated:
+            return models.FeedPage(posts=posts_from_cache)
 
         logger.info("Feed from db")
+        if cursor is not None and entries:
+            cursor = self._cursor_of(entries[-1])
+        # С курсором продолжаем с позиции кэша, по offset – с числа отданных постов:
+        # удаленных постов в БД нет, они не сдвигают offset
+        rest = limit - (len(entries) if cursor else len(posts_from_cache))
         async for _ in self.uow.transaction():
-            posts_from_db = await self.uow.posts.feed(
+            posts_from_db = await self._feed_repository().feed(
                 user_id=user_id,
-                offset=offset + len(posts_from_cache),
-                limit=limit - len(posts_from_cache),
+                offset=0 if cursor else offset + len(posts_from_cache),
+                limit=rest,
+                cursor=cursor,
             )
 
-        return posts_from_cache + posts_from_db
+        page = models.FeedPage.of(posts_from_db, limit=rest)
+        return page.model_copy(update={"posts": posts_from_cache + posts_from_db})
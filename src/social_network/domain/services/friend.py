@@ -19,7 +19,7 @@ class FriendService(abstract.AbstractService):
         return typing.cast(uow.FriendUnitOfWork, self._uow)
 
     async def make_friendship(
-        self, user: models.UserDomain, friend_id: uuid.UUID
+        self, user: models.PrincipalDomain, friend_id: uuid.UUID
     ) -> models.FriendDomain:
         async for _ in self.uow.transaction():
             try:
@@ -44,7 +44,7 @@ class FriendService(abstract.AbstractService):
         return friend
 
     async def delete_friendship(
-        self, user: models.UserDomain, friend_id: uuid.UUID
+        self, user: models.PrincipalDomain, friend_id: uuid.UUID
     ) -> None:
         async for _ in self.uow.transaction():
             user_friends, friend_friends = await asyncio.gather(
@@ -0,0 +1,160 @@
+import abc
+import base64
+import hashlib
+import hmac
+import secrets
+import typing
+
+from social_network.domain import models
+
+# Пароли, зашифрованные Fernet до перехода на хэширование: токен Fernet
+# всегда начинается с версии 0x80 и временной метки, т.е. с "gAAAAA" в base64
+LEGACY_FERNET_PREFIX = "gAAAAA"
+SEPARATOR = "$"
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data.encode(), validate=True)
+
+
+class ParsedHash(typing.NamedTuple):
+    name: str
+    params: tuple[int, ...]
+    salt: bytes
+    digest: bytes
+
+
+def parse(hashed: str) -> typing.Optional[ParsedHash]:
+    """Разбор хэша вида name$param...$salt$digest; None – хэш не в этом формате"""
+    try:
+        name, *params, salt, digest = hashed.split(SEPARATOR)
+        return ParsedHash(
+            name=name,
+            params=tuple(map(int, params)),
+            salt=_b64decode(salt),
+            digest=_b64decode(digest),
+        )
+    except ValueError:
+        return None
+
+
+class PasswordHasher(abc.ABC):
+    """
+    Хэширование паролей с солью. Хэш хранит имя алгоритма и параметры,
+    поэтому алгоритм и его стоимость можно менять без миграции:
+    старые хэши проверяются своими параметрами и пересчитываются при входе
+    """
+
+    name: typing.ClassVar[str]
+
+    @abc.abstractmethod
+    def _derive(self, password: str, salt: bytes, params: tuple[int, ...]) -> bytes: ...
+
+    @property
+    @abc.abstractmethod
+    def _params(self) -> tuple[int, ...]: ...
+
+    def hash(self, password: str) -> str:
+        salt = secrets.token_bytes(16)
+        return SEPARATOR.join(
+            (
+                self.name,
+                *map(str, self._params),
+                _b64encode(salt),
+                _b64encode(self._derive(password, salt, self._params)),
+            )
+        )
+
+    def verify(self, password: str, hashed: str) -> bool:
+        """Битый хэш или хэш чужого алгоритма не подтверждает ни один пароль"""
+        parsed = parse(hashed)
+        if parsed is None or parsed.name != self.name:
+            return False
+        try:
+            derived = self._derive(password, parsed.salt, parsed.params)
+        except ValueError:
+            return False
+        return hmac.compare_digest(derived, parsed.digest)
+
+    def needs_rehash(self, hashed: str) -> bool:
+        parsed = parse(hashed)
+        return parsed is None or (parsed.name, parsed.params) != (
+            self.name,
+            self._params,
+        )
+
+
+class ScryptHasher(PasswordHasher):
+    name = "scrypt"
+
+    def __init__(self, n: int = 2**14, r: int = 8, p: int = 1) -> None:
+        self._n = n
+        self._r = r
+        self._p = p
+
+    @property
+    def _params(self) -> tuple[int, ...]:
+        return self._n, self._r, self._p
+
+    def _derive(self, password: str, salt: bytes, params: tuple[int, ...]) -> bytes:
+        n, r, p = params
+        return hashlib.scrypt(
+            password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r, dklen=32
+        )
+
+
+class Pbkdf2Hasher(PasswordHasher):
+    name = "pbkdf2_sha256"
+
+    def __init__(self, iterations: int = 600_000) -> None:
+        self._iterations = iterations
+
+    @property
+    def _params(self) -> tuple[int, ...]:
+        return (self._iterations,)
+
+    def _derive(self, password: str, salt: bytes, params: tuple[int, ...]) -> bytes:
+        (iterations,) = params
+        return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+
+
+HASHERS: dict[str, type[PasswordHasher]] = {
+    ScryptHasher.name: ScryptHasher,
+    Pbkdf2Hasher.name: Pbkdf2Hasher,
+}
+
+
+def is_legacy(hashed: str) -> bool:
+    return hashed.startswith(LEGACY_FERNET_PREFIX)
+
+
+def hasher_of(hashed: str) -> typing.Optional[PasswordHasher]:
+    """
+    Хэшер с параметрами по умолчанию: параметры конкретного хэша берутся из него самого.
+    None – алгоритм хэша неизвестен
+    """
+    hasher = HASHERS.get(hashed.split(SEPARATOR, 1)[0])
+    return None if hasher is None else hasher()
+
+
+def credentials_digest(user: models.NewUserDomain, password: str, secret: str) -> str:
+    """
+    Детерминированный HMAC анкеты и пароля. По нему дубликат регистрации
+    ищется одним запросом по индексу, без расшифровки паролей-кандидатов.
+    Без секрета по дайджесту нельзя перебрать пароль
+    """
+    message = "\x1f".join(
+        (
+            user.first_name,
+            user.second_name,
+            user.birthdate.date().isoformat(),
+            user.biography,
+            user.city,
+            password,
+        )
+    )
+    return hmac.new(secret.encode(), message.encode(), hashlib.sha256).hexdigest()
@@ -73,10 +73,29 @@ class PostService(abstract.AbstractService):
             return post
 
     async def feed(
-        self, user_id: uuid.UUID, offset: int, limit: int
+        self,
+        user_id: uuid.UUID,
+        offset: int,
+        limit: int,
+        cursor: typing.Optional[models.FeedCursor] = None,
     ) -> list[models.PostDomain]:
         async for _ in self.uow.transaction():
             posts = await self.uow.posts.feed(
-                user_id=user_id, offset=offset, limit=limit
+                user_id=user_id,
+                offset=0 if cursor else offset,
+                limit=limit,
+                cursor=cursor,
             )
         return posts
+
+    async def feed_page(
+        self,
+        user_id: uuid.UUID,
+        offset: int,
+        limit: int,
+        cursor: typing.Optional[models.FeedCursor] = None,
+    ) -> models.FeedPage:
+        return models.FeedPage.of(
+            await self.feed(user_id=user_id, offset=offset, limit=limit, cursor=cursor),
+            limit=limit,
+        )
@@ -0,0 +1,48 @@
+import asyncio
+import typing
+
+T = typing.TypeVar("T")
+
+
+class SingleFlight(typing.Generic[T]):
+    """
+    Схлопывание одинаковых конкурентных вызовов в пределах процесса:
+    первый вызов по ключу (лидер) выполняет работу, остальные ждут его результат.
+    Экземпляр живет все время работы приложения и общий для всех запросов
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[str, asyncio.Future[T]] = {}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._calls
+
+    def _forget(self, key: str, future: asyncio.Future[T]) -> None:
+        self._calls.pop(key, None)
+        # Лидер мог быть отменен (клиент отключился) – забираем исключение,
+        # чтобы asyncio не ругался на необработанную ошибку
+        if not future.cancelled():
+            future.exception()
+
+    def start(self, key: str, func: typing.Callable[[], typing.Awaitable[T]]) -> bool:
+        """
+        Запускает работу в фоне, если по ключу еще ничего не выполняется.
+        Задача хранится в реестре до завершения, поэтому ее не соберет GC
+        """
+        if key in self._calls:
+            return False
+        future = asyncio.ensure_future(func())
+        self._calls[key] = future
+        future.add_done_callback(lambda f: self._forget(key, f))
+        return True
+
+    async def do(
+        self, key: str, func: typing.Callable[[], typing.Awaitable[T]]
+    ) -> tuple[T, bool]:
+        """
+        Возвращает результат и признак того, что вызов был лидером.
+        Работа выполняется в отдельной задаче, поэтому отмена лидера не отменяет
+        ее для остальных ожидающих
+        """
+        is_leader = self.start(key, func)
+        return await asyncio.shield(self._calls[key]), is_leader
@@ -0,0 +1,5 @@
+from social_network.fanout.worker import FanoutWorker
+
+__all__ = [
+    "FanoutWorker",
+]
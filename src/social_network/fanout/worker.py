@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import typing
+
+import aio_pika
+import aio_pika.abc
+import pydantic
+import sentry_sdk
+from redis import asyncio as aioredis
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from social_network import settings
+from social_network.api import dependencies
+from social_network.domain import models, services
+from social_network.infrastructure.database import retry
+
+logger = logging.getLogger(__name__)
+
+RETRIES_HEADER = "x-fanout-retries"
+
+# Состояния события в Redis: processing – событие захвачено воркером, done – применено
+PROCESSING = b"processing"
+DONE = b"done"
+
+
+class FanoutWorker:
+    """
+    Воркер рассылки постов по лентам друзей.
+    Забирает события из очереди posts_fanout и применяет их к кэшу лент.
+
+    - backpressure: брокер отдает не больше prefetch_count неподтвержденных сообщений,
+      а одновременно обрабатывается не больше concurrency событий
+    - retries: упавшее событие уходит в очередь задержки своей попытки и по истечении
+      TTL возвращается брокером в основную очередь, не занимая слот воркера.
+      После max_retries попыток событие уходит в dead-letter очередь
+    - идемпотентность: воркер захватывает событие (processing) на processing_timeout
+      и отмечает его примененным (done) только после apply. Повторно доставленное
+      примененное событие пропускается; захваченное – откладывается, пока захват
+      не истечет или не завершится
+    """
+
+    def __init__(self, social_network_settings: settings.SocialNetworkSettings) -> None:
+        self._settings = social_network_settings
+        self._semaphore = asyncio.Semaphore(self._settings.fanout.concurrency)
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    @staticmethod
+    def idempotency_key(event_id: str) -> str:
+        return f"fanout:{event_id}"
+
+    def _retry_delay_ms(self, retries: int) -> int:
+        return int(self._settings.fanout.retry_delay_seconds * retries * 1000)
+
+    def retry_queue(self, retries: int) -> str:
+        # Задержка в имени: очередь с другими аргументами нельзя переобъявить
+        return f"{self._settings.fanout.queue}.retry.{self._retry_delay_ms(retries)}"
+
+    async def _declare_retry_queues(
+        self, channel: aio_pika.abc.AbstractChannel
+    ) -> None:
+        """
+        Очередь задержки на каждую попытку: сообщения в ней живут одинаково долго,
+        поэтому истекают по порядку и через default exchange возвращаются в основную очередь
+        """
+        for retries in range(1, max(self._settings.fanout.max_retries, 1) + 1):
+            await channel.declare_queue(
+                self.retry_queue(retries),
+                durable=True,
+                arguments={
+                    "x-message-ttl": self._retry_delay_ms(retries),
+                    "x-dead-letter-exchange": "",
+                    "x-dead-letter-routing-key": self._settings.fanout.queue,
+                },
+            )
+
+    async def _retry(
+        self,
+        channel: aio_pika.abc.AbstractChannel,
+        message: aio_pika.abc.AbstractIncomingMessage,
+        postpone: bool = False,
+    ) -> None:
+        """
+        postpone – событие захвачено другим воркером: ждем его, не тратя попытку.
+        Если переопубликовать событие не удалось, оно возвращается в основную очередь
+        """
+        retries = int(typing.cast(int, message.headers.get(RETRIES_HEADER, 0)))
+        if not postpone:
+            retries += 1
+        routing_key = self.retry_queue(max(retries, 1))
+        if retries > self._settings.fanout.max_retries:
+            logger.error(
+                f"Event {message.message_id} exceeded {self._settings.fanout.max_retries} retries"
+            )
+            routing_key = self._settings.fanout.dead_letter_queue
+
+        try:
+            await channel.default_exchange.publish(
+                aio_pika.Message(
+                    message.body,
+                    content_type=message.content_type,
+                    message_id=message.message_id,
+                    headers={**message.headers, RETRIES_HEADER: retries},
+                    delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                ),
+                routing_key=routing_key,
+            )
+        except Exception:
+            # Иначе process() отклонит сообщение без возврата в очередь,
+            # а у основной очереди нет dead-letter exchange – событие потеряется.
+            # Если закрыт сам канал, брокер вернет неподтвержденное сообщение в очередь
+            logger.exception(f"Failed to republish event {message.message_id}. Requeue")
+            await message.nack(requeue=True)
+
+    async def _handle(
+        self,
+        message: aio_pika.abc.AbstractIncomingMessage,
+        channel: aio_pika.abc.AbstractChannel,
+        redis: aioredis.Redis,
+        feed_service: services.FeedService,
+    ) -> None:
+        async with message.process(ignore_processed=True):
+            try:
+                event = models.FeedEventDomain.model_validate_json(message.body)
+            except pydantic.ValidationError as exc:
+                logger.error(f"Invalid fanout event {message.message_id}: {exc}")
+                return
+
+            key = self.idempotency_key(str(event.id))
+            is_claimed = False
+            try:
+                state = await self._claim(redis, key)
+                if state == DONE:
+                    logger.info(f"Event {event.id} is already processed. Skip.")
+                    return
+                if state == PROCESSING:
+                    logger.info(f"Event {event.id} is being processed. Postpone.")
+                    await self._retry(channel=channel, message=message, postpone=True)
+                    return
+
+                is_claimed = True
+                await feed_service.apply(event)
+                await redis.set(key, DONE, ex=self._settings.fanout.idempotency_ttl)
+            except Exception as exc:
+                logger.exception(f"Failed to process event {event.id}")
+                sentry_sdk.capture_exception(exc)
+                if is_claimed:
+                    await self._release(redis, key)
+                await self._retry(channel=channel, message=message)
+
+    async def _claim(self, redis: aioredis.Redis, key: str) -> typing.Optional[bytes]:
+        """
+        Захватывает событие. None – событие захвачено этим воркером,
+        иначе – состояние, в котором событие оставил другой воркер
+        """
+        if await redis.set(
+            key, PROCESSING, nx=True, ex=self._settings.fanout.processing_timeout
+        ):
+            return None
+        # Захват мог истечь между SET и GET – тогда событие просто откладываем
+        return typing.cast(typing.Optional[bytes], await redis.get(key)) or PROCESSING
+
+    @staticmethod
+    async def _release(redis: aioredis.Redis, key: str) -> None:
+        try:
+            await redis.delete(key)
+        except aioredis.RedisError:
+            logger.exception(f"Failed to release {key}. It expires by timeout")
+
+    async def _dispatch(self, *args: typing.Any) -> None:
+        try:
+            await self._handle(*args)
+        finally:
+            self._semaphore.release()
+
+    async def run(self) -> None:
+        retry.configure(retry.RetryPolicy.create(**self._settings.db.retry_options))
+        redis = aioredis.from_url(self._settings.redis.connection_url)
+        master = create_async_engine(
+            url=self._settings.db.connection_url,
+            **self._settings.db.engine_options,
+        )
+        slave = None
+        if self._settings.db.ro_connection_url:
+            slave = create_async_engine(
+                url=self._settings.db.ro_connection_url,
+                **self._settings.db.engine_options,
+            )
+
+        rmq_connection = await aio_pika.connect_robust(
+            self._settings.rmq.connection_url
+        )
+        try:
+            channel = await rmq_connection.channel()
+            await channel.set_qos(prefetch_count=self._settings.fanout.prefetch_count)
+            async_feed_service = await services.AsyncFeedService.create(channel)
+            await channel.declare_queue(
+                self._settings.fanout.dead_letter_queue, durable=True
+            )
+            await self._declare_retry_queues(channel)
+            queue = typing.cast(
+                aio_pika.abc.AbstractQueue,
+                await async_feed_service.bind_fanout(self._settings.fanout.queue),
+            )
+            feed_service = dependencies.build_feed_service(
+                social_network_settings=self._settings,
+                redis=redis,
+                async_feed_service=async_feed_service,
+                master_factory=async_sessionmaker(master, expire_on_commit=False),
+                slave_factory=None
+                if slave is None
+                else async_sessionmaker(slave, expire_on_commit=False),
+            )
+
+            logger.info(f"Fanout worker is consuming {self._settings.fanout.queue}")
+            async with queue.iterator() as messages:
+                async for message in messages:
+                    await self._semaphore.acquire()
+                    task = asyncio.create_task(
+                        self._dispatch(message, channel, redis, feed_service)
+                    )
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+        finally:
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+            coros = [redis.close(), master.dispose(), rmq_connection.close()]
+            if slave:
+                coros.append(slave.dispose())
+            await asyncio.gather(*coros)
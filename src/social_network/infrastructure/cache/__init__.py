@@ -0,0 +1,8 @@
+from social_network.infrastructure.cache.post_codec import decode_post, encode_post
+from social_network.infrastructure.cache.principal import PrincipalCache
+
+__all__ = [
+    "PrincipalCache",
+    "decode_post",
+    "encode_post",
+]
@@ -0,0 +1,73 @@
+import datetime
+import json
+import struct
+import typing
+
+from social_network.domain import models
+
+VERSION = 1
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+MICROSECOND = datetime.timedelta(microseconds=1)
+NO_DATETIME = -(2**63)
+LEGACY_JSON_PREFIX = ord("{")
+
+# version, id, author_id, created_at, updated_at, deleted_at (мкс от эпохи), далее текст в utf-8
+HEADER = struct.Struct("!B16s16sqqq")
+
+
+def _pack_datetime(value: typing.Optional[datetime.datetime]) -> int:
+    if value is None:
+        return NO_DATETIME
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return (value - EPOCH) // MICROSECOND
+
+
+def _unpack_datetime(value: int) -> typing.Optional[datetime.datetime]:
+    if value == NO_DATETIME:
+        return None
+    return EPOCH + datetime.timedelta(microseconds=value)
+
+
+def encode_post(post: models.PostDomain) -> bytes:
+    """
+    Компактное бинарное представление поста для кэша:
+    фиксированный заголовок из 65 байт и текст поста
+    """
+    return (
+        HEADER.pack(
+            VERSION,
+            post.id.bytes,
+            post.author_id.bytes,
+            _pack_datetime(post.created_at),
+            _pack_datetime(post.updated_at),
+            _pack_datetime(post.deleted_at),
+        )
+        + post.text.encode()
+    )
+
+
+def decode_post(data: bytes) -> models.PostDomain:
+    """
+    Идентификаторы передаются в pydantic сырыми байтами, а даты – готовыми объектами,
+    поэтому разбор строк не нужен. Записи в старом JSON-формате по-прежнему читаются
+    """
+    if data[0] == LEGACY_JSON_PREFIX:
+        return models.PostDomain(**json.loads(data))
+
+    version, id_, author_id, created_at, updated_at, deleted_at = HEADER.unpack_from(
+        data
+    )
+    if version != VERSION:
+        raise ValueError(f"Unknown post encoding version: {version}")
+
+    return models.PostDomain.model_validate(
+        {
+            "id": id_,
+            "author_id": author_id,
+            "text": data[HEADER.size :].decode(),
+            "created_at": _unpack_datetime(created_at),
+            "updated_at": _unpack_datetime(updated_at),
+            "deleted_at": _unpack_datetime(deleted_at),
+        }
+    )
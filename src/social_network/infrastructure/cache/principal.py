@@ -0,0 +1,127 @@
+import collections
+import logging
+import time
+import typing
+import uuid
+
+from redis import asyncio as aioredis
+
+from social_network.domain import models
+from social_network.infrastructure import metrics
+
+logger = logging.getLogger(__name__)
+
+PRINCIPAL_CACHE_REQUESTS = metrics.Counter(
+    "social_network_principal_cache_requests_total",
+    "Поиск авторизованного пользователя в кэше: tier – local (память процесса) "
+    "или redis, outcome – hit или miss",
+    labelnames=("tier", "outcome"),
+)
+
+
+class PrincipalCache:
+    """
+    Кэш авторизованных пользователей, чтобы не ходить в БД на каждый запрос.
+
+    - первый уровень – LRU в памяти процесса на capacity записей
+    - второй уровень (необязательный) – Redis, общий для всех процессов
+    - ключ – id пользователя: подпись и срок действия токена проверяются до кэша,
+      поэтому все токены пользователя делят одну запись
+    - запись живет не дольше ttl и не дольше токена, по которому ее положили
+    - invalidate удаляет запись из обоих уровней; в других процессах локальная
+      запись доживает свой ttl, поэтому он короткий
+    - хранится PrincipalDomain: хэш пароля и дайджест учетных данных в кэш
+      (и в Redis) не попадают
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        ttl: float,
+        redis: typing.Optional[aioredis.Redis] = None,
+    ) -> None:
+        self._capacity = capacity
+        self._ttl = ttl
+        self._redis = redis
+        self._entries: collections.OrderedDict[
+            str, tuple[float, models.PrincipalDomain]
+        ] = collections.OrderedDict()
+
+    @staticmethod
+    def key(user_id: typing.Union[str, uuid.UUID]) -> str:
+        return f"auth:principal:{user_id}"
+
+    def _ttl_for(self, expires_at: float) -> float:
+        return min(self._ttl, expires_at - time.time())
+
+    def _get_local(self, user_id: str) -> typing.Optional[models.PrincipalDomain]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        expires_at, user = entry
+        if expires_at <= time.monotonic():
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return user
+
+    def _set_local(
+        self, user_id: str, user: models.PrincipalDomain, ttl: float
+    ) -> None:
+        self._entries[user_id] = (time.monotonic() + ttl, user)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self._capacity:
+            self._entries.popitem(last=False)
+
+    async def get(
+        self, user_id: str, expires_at: float
+    ) -> typing.Optional[models.PrincipalDomain]:
+        """expires_at – срок действия токена (timestamp)"""
+        if (user := self._get_local(user_id)) is not None:
+            PRINCIPAL_CACHE_REQUESTS.inc(tier="local", outcome="hit")
+            return user
+        PRINCIPAL_CACHE_REQUESTS.inc(tier="local", outcome="miss")
+
+        if self._redis is None:
+            return None
+        try:
+            data = await self._redis.get(self.key(user_id))
+        except aioredis.RedisError:
+            logger.exception("Failed to read principal from redis")
+            return None
+        if data is None:
+            PRINCIPAL_CACHE_REQUESTS.inc(tier="redis", outcome="miss")
+            return None
+        PRINCIPAL_CACHE_REQUESTS.inc(tier="redis", outcome="hit")
+
+        user = models.PrincipalDomain.model_validate_json(data)
+        if (ttl := self._ttl_for(expires_at)) > 0:
+            self._set_local(user_id, user, ttl)
+        return user
+
+    async def set(
+        self, user_id: str, user: models.PrincipalDomain, expires_at: float
+    ) -> None:
+        ttl = self._ttl_for(expires_at)
+        if ttl <= 0:
+            return
+        user = models.PrincipalDomain.of(user)
+        self._set_local(user_id, user, ttl)
+
+        if self._redis is None:
+            return
+        try:
+            await self._redis.set(
+                self.key(user_id), user.model_dump_json(), px=int(ttl * 1000)
+            )
+        except aioredis.RedisError:
+            logger.exception("Failed to write principal to redis")
+
+    async def invalidate(self, user_id: typing.Union[str, uuid.UUID]) -> None:
+        self._entries.pop(str(user_id), None)
+        if self._redis is None:
+            return
+        try:
+            await self._redis.delete(self.key(user_id))
+        except aioredis.RedisError:
+            logger.exception("Failed to delete principal from redis")
@@ -9,7 +9,7 @@ from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import async_engine_from_config
 
 from social_network.infrastructure.database import models
-from social_network.settings import DbSettings
+from social_network.settings import AuthSettings, DbSettings
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -36,9 +36,13 @@ class MigrationSettings(BaseSettings):
     )
 
     db: DbSettings = Field(title="Database Settings", default_factory=DbSettings)
+    auth: AuthSettings = Field(title="Auth Settings", default_factory=AuthSettings)
 
 
-config.set_main_option("sqlalchemy.url", MigrationSettings().db.connection_url)
+migration_settings = MigrationSettings()
+config.set_main_option("sqlalchemy.url", migration_settings.db.connection_url)
+# Секрет нужен миграциям данных, которые расшифровывают пароли
+config.attributes["auth_secret"] = migration_settings.auth.secret
 
 
 def run_migrations_offline() -> None:
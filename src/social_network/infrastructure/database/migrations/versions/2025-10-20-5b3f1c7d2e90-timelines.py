@@ -0,0 +1,53 @@
+"""timelines
+
+Revision ID: 5b3f1c7d2e90
+Revises: e04f753fc730
+Create Date: 2025-10-20 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5b3f1c7d2e90"
+down_revision: Union[str, None] = "e04f753fc730"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TIMELINE_PARTITIONS = 16
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "timelines",
+        sa.Column("user_id", sa.UUID(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("post_id", sa.UUID(), nullable=False),
+        sa.Column("author_id", sa.UUID(), nullable=False),
+        sa.PrimaryKeyConstraint("user_id", "created_at", "post_id"),
+        postgresql_partition_by="HASH (user_id)",
+    )
+    for remainder in range(TIMELINE_PARTITIONS):
+        op.execute(f"""
+            CREATE TABLE IF NOT EXISTS timelines_{remainder} PARTITION OF timelines
+            FOR VALUES WITH (MODULUS {TIMELINE_PARTITIONS}, REMAINDER {remainder});
+        """)
+    # Заполняем ленты уже опубликованными постами друзей
+    op.execute("""
+        INSERT INTO timelines (user_id, created_at, post_id, author_id)
+        SELECT f.friend_id, p.created_at, p.id, p.author_id
+        FROM posts p JOIN friends f ON p.author_id = f.user_id
+        WHERE p.deleted_at IS NULL
+        AND f.deleted_at IS NULL
+        AND f.friend_id != p.author_id
+        ON CONFLICT DO NOTHING;
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("timelines")
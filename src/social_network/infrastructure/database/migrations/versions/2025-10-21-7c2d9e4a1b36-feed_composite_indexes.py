@@ -0,0 +1,45 @@
+"""feed-composite-indexes
+
+Revision ID: 7c2d9e4a1b36
+Revises: 5b3f1c7d2e90
+Create Date: 2025-10-21 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7c2d9e4a1b36"
+down_revision: Union[str, None] = "5b3f1c7d2e90"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Посты друга в порядке ленты: lateral-запрос читает из индекса только top-N
+    # строк на друга (index-only scan), а курсор (created_at, id) – граница диапазона
+    op.create_index(
+        "ix_posts_author_id_created_at_id",
+        "posts",
+        ["author_id", sa.text("created_at DESC"), sa.text("id DESC")],
+        unique=False,
+        postgresql_where=sa.text("deleted_at IS NULL"),
+    )
+    # Друзья пользователя без обращения к таблице
+    op.create_index(
+        "ix_friends_friend_id_user_id",
+        "friends",
+        ["friend_id", "user_id"],
+        unique=False,
+        postgresql_where=sa.text("deleted_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_friends_friend_id_user_id", table_name="friends")
+    op.drop_index("ix_posts_author_id_created_at_id", table_name="posts")
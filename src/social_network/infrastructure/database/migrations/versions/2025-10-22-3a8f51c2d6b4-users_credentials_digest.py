@@ -0,0 +1,128 @@
+"""users-credentials-digest
+
+Revision ID: 3a8f51c2d6b4
+Revises: 7c2d9e4a1b36
+Create Date: 2025-10-22 12:00:00.000000
+
+"""
+
+import datetime
+import hashlib
+import hmac
+import logging
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import context, op
+from cryptography import fernet
+
+# revision identifiers, used by Alembic.
+revision: str = "3a8f51c2d6b4"
+down_revision: Union[str, None] = "7c2d9e4a1b36"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+
+# Миграция не импортирует код приложения: он меняется, а ревизия должна
+# выполняться так же, как в момент ее написания. Ниже – копии на 2025-10-22
+# social_network.domain.services.passwords.credentials_digest и
+# social_network.domain.services.auth.decrypt_password
+
+
+def credentials_digest(user: sa.RowMapping, password: str, secret: str) -> str:
+    birthdate: datetime.datetime = user["birthdate"]
+    message = "\x1f".join(
+        (
+            user["first_name"],
+            user["second_name"],
+            # Приложение читает timestamptz через asyncpg, т.е. в UTC
+            birthdate.astimezone(datetime.timezone.utc).date().isoformat(),
+            user["biography"],
+            user["city"],
+            password,
+        )
+    )
+    return hmac.new(secret.encode(), message.encode(), hashlib.sha256).hexdigest()
+
+
+def decrypt_password(password: str, secret: str) -> str:
+    return fernet.Fernet(secret).decrypt(password).decode()
+
+
+def backfill_credentials_digest(secret: str) -> None:
+    """
+    Дайджест для существующих пользователей: Fernet-пароль расшифровывается,
+    сам пароль остается прежним и перехэшируется при следующем входе
+    """
+    bind = op.get_bind()
+    last_id = None
+    while True:
+        rows = (
+            bind.execute(
+                sa.text(
+                    "SELECT * FROM users WHERE credentials_digest IS NULL "
+                    + ("AND id > :last_id " if last_id else "")
+                    + "ORDER BY id LIMIT :limit"
+                ),
+                {"last_id": last_id, "limit": BATCH_SIZE},
+            )
+            .mappings()
+            .all()
+        )
+        if not rows:
+            break
+        updates = []
+        for row in rows:
+            try:
+                password = decrypt_password(password=row["password"], secret=secret)
+            except (fernet.InvalidToken, ValueError):
+                logger.warning(f"Password of user {row['id']} can not be decrypted")
+                continue
+            updates.append(
+                {
+                    "id": row["id"],
+                    "credentials_digest": credentials_digest(
+                        user=row, password=password, secret=secret
+                    ),
+                }
+            )
+        if updates:
+            bind.execute(
+                sa.text(
+                    "UPDATE users SET credentials_digest = :credentials_digest "
+                    "WHERE id = :id"
+                ),
+                updates,
+            )
+        last_id = rows[-1]["id"]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "users", sa.Column("credentials_digest", sa.String(length=64), nullable=True)
+    )
+    op.create_index(
+        "ix_users_credentials_digest",
+        "users",
+        ["credentials_digest"],
+        unique=False,
+        postgresql_where=sa.text("deleted_at IS NULL"),
+    )
+    if secret := context.config.attributes.get("auth_secret"):
+        backfill_credentials_digest(secret)
+    else:
+        logger.warning(
+            "AUTH__SECRET is not set: credentials digest is not backfilled, "
+            "duplicates of old users are checked by decrypting their passwords"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_users_credentials_digest", table_name="users")
+    op.drop_column("users", "credentials_digest")
@@ -6,6 +6,7 @@ from social_network.infrastructure.database.models.chat import (
 )
 from social_network.infrastructure.database.models.friend import FriendORM
 from social_network.infrastructure.database.models.post import PostORM
+from social_network.infrastructure.database.models.timeline import TimelineORM
 from social_network.infrastructure.database.models.user import UserORM
 
 __all__ = [
@@ -15,5 +16,6 @@ __all__ = [
     "ChatParticipantORM",
     "FriendORM",
     "PostORM",
+    "TimelineORM",
     "UserORM",
 ]
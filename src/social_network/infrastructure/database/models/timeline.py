@@ -0,0 +1,31 @@
+import datetime
+import uuid
+
+import sqlalchemy.orm
+
+from social_network.infrastructure.database.models import base
+
+
+class TimelineORM(base.BaseORM):
+    """
+    Материализованная лента пользователя: по строке на каждый пост друга.
+    Первичный ключ (user_id, created_at, post_id) покрывает чтение страницы ленты,
+    поэтому оно выполняется index-only сканированием одной секции
+    """
+
+    __tablename__ = "timelines"
+
+    user_id: sqlalchemy.orm.Mapped[uuid.UUID] = sqlalchemy.orm.MappedColumn(
+        primary_key=True
+    )
+    created_at: sqlalchemy.orm.Mapped[datetime.datetime] = sqlalchemy.orm.MappedColumn(
+        primary_key=True
+    )
+    post_id: sqlalchemy.orm.Mapped[uuid.UUID] = sqlalchemy.orm.MappedColumn(
+        primary_key=True
+    )
+    author_id: sqlalchemy.orm.Mapped[uuid.UUID] = sqlalchemy.orm.MappedColumn(
+        nullable=False
+    )
+
+    __table_args__ = ({"postgresql_partition_by": "HASH (user_id)"},)
@@ -1,4 +1,5 @@
 import datetime
+import typing
 import uuid
 
 import sqlalchemy.orm
@@ -20,6 +21,9 @@ class UserORM(mixins.CreatedAtUpdatedAtDeletedAtMixin, base.BaseORM):
     )
     city: sqlalchemy.orm.Mapped[str]
     password: sqlalchemy.orm.Mapped[str]
+    credentials_digest: sqlalchemy.orm.Mapped[typing.Optional[str]] = (
+        sqlalchemy.orm.MappedColumn(sqlalchemy.String(64))
+    )
 
     __table_args__ = (
         sqlalchemy.Index(
@@ -34,4 +38,9 @@ class UserORM(mixins.CreatedAtUpdatedAtDeletedAtMixin, base.BaseORM):
             postgresql_using="gin",
             postgresql_ops={"second_name": "gin_trgm_ops"},
         ),
+        sqlalchemy.Index(
+            "ix_users_credentials_digest",
+            "credentials_digest",
+            postgresql_where=sqlalchemy.text("deleted_at IS NULL"),
+        ),
     )
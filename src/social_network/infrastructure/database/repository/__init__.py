@@ -1,5 +1,6 @@
 from social_network.infrastructure.database.repository.abstract import (
     AbstractRepository,
+    BaseRepository,
 )
 from social_network.infrastructure.database.repository.chat import (
     ChatMessageRepository,
@@ -12,16 +13,21 @@ from social_network.infrastructure.database.repository.friend import (
 from social_network.infrastructure.database.repository.post import (
     PostRepository,
 )
+from social_network.infrastructure.database.repository.timeline import (
+    TimelineRepository,
+)
 from social_network.infrastructure.database.repository.user import (
     UserRepository,
 )
 
 __all__ = [
     "AbstractRepository",
+    "BaseRepository",
     "ChatMessageRepository",
     "ChatParticipantRepository",
     "ChatRepository",
     "FriendRepository",
     "PostRepository",
+    "TimelineRepository",
     "UserRepository",
 ]
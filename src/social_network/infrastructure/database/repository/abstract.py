@@ -1,4 +1,5 @@
 import abc
+import contextvars
 import typing
 
 from social_network.infrastructure.database import exceptions
@@ -9,16 +10,22 @@ UpdatingEntity = typing.TypeVar("UpdatingEntity")
 DBSessionType = typing.TypeVar("DBSessionType")
 
 
-class AbstractRepository(
-    abc.ABC, typing.Generic[Entity, NewEntity, UpdatingEntity, DBSessionType]
-):
+class BaseRepository(typing.Generic[DBSessionType]):
     def __init__(self) -> None:
-        self._db_session: typing.Optional[DBSessionType] = None
+        # Репозиторий создается один раз на процесс, а сессия принадлежит транзакции:
+        # она хранится в контексте задачи, поэтому конкурентные запросы не мешают друг другу
+        self._db_session_var: contextvars.ContextVar[typing.Optional[DBSessionType]] = (
+            contextvars.ContextVar(f"{type(self).__name__}.db_session", default=None)
+        )
+
+    @property
+    def _db_session(self) -> typing.Optional[DBSessionType]:
+        return self._db_session_var.get()
 
     def __call__(
         self, db_session: typing.Optional[DBSessionType] = None
-    ) -> "AbstractRepository[Entity, NewEntity, UpdatingEntity, DBSessionType]":
-        self._db_session = db_session
+    ) -> typing.Self:
+        self._db_session_var.set(db_session)
         return self
 
     def _get_db_session(self) -> DBSessionType:
@@ -26,6 +33,12 @@ class AbstractRepository(
             raise exceptions.NoSessionError("Session not found")
         return self._db_session
 
+
+class AbstractRepository(
+    BaseRepository[DBSessionType],
+    abc.ABC,
+    typing.Generic[Entity, NewEntity, UpdatingEntity, DBSessionType],
+):
     @abc.abstractmethod
     async def create(self, item: NewEntity) -> Entity: ...
 
@@ -10,6 +10,18 @@ from social_network.infrastructure.database import exceptions
 from social_network.infrastructure.database import models as orm
 from social_network.infrastructure.database.repository import abstract, mixins
 
+FIND_DIALOG_ID = sqlalchemy.text(
+    "SELECT chat_id "
+    "FROM chat_participants "
+    "WHERE user_id IN (:user_id, :friend_id) "
+    "GROUP BY chat_id "
+    "HAVING COUNT(*) = 2"
+)
+CREATE_MESSAGE = sqlalchemy.text(
+    "INSERT INTO chat_messages (id, author_id, chat_id, text, created_at, updated_at, deleted_at) "
+    "VALUES (:id, :author_id, :chat_id, :text, :created_at, :updated_at, :deleted_at)"
+)
+
 
 class ChatRepository(
     abstract.AbstractRepository[
@@ -44,9 +56,10 @@ class ChatRepository(
         chats = (
             (
                 await session.execute(
-                    self.prepare_select(
+                    *self.prepare_select(
                         model_class=orm.ChatORM,
-                        where_clause=f"id IN ({', '.join((f"'{item['''id''']}'" for item in insert_items))})",
+                        where_clause="id = ANY(:ids)",
+                        params={"ids": [item["id"] for item in insert_items]},
                     )
                 )
             )
@@ -66,15 +79,7 @@ class ChatRepository(
     ) -> typing.Optional[uuid.UUID]:
         session = self._get_db_session()
         result = await session.execute(
-            sqlalchemy.text(
-                f"""
-                SELECT chat_id
-                FROM chat_participants
-                WHERE user_id IN ('{user_id}', '{friend_id}')
-                GROUP BY chat_id
-                HAVING COUNT(*) = 2;
-                """
-            )
+            FIND_DIALOG_ID, {"user_id": user_id, "friend_id": friend_id}
         )
         try:
             return result.scalar_one()
@@ -92,7 +97,7 @@ class ChatRepository(
         chats = (
             (
                 await session.execute(
-                    self.prepare_select(
+                    *self.prepare_select(
                         model_class=orm.ChatORM,
                         filters=filters,
                         order_by=order_by,
@@ -154,9 +159,10 @@ class ChatParticipantRepository(
         participants = (
             (
                 await session.execute(
-                    self.prepare_select(
+                    *self.prepare_select(
                         model_class=orm.ChatParticipantORM,
-                        where_clause=f"id IN ({', '.join((f"'{item['''id''']}'" for item in insert_items))})",
+                        where_clause="id = ANY(:ids)",
+                        params={"ids": [item["id"] for item in insert_items]},
                     )
                 )
             )
@@ -184,7 +190,7 @@ class ChatParticipantRepository(
         participants = (
             (
                 await session.execute(
-                    self.prepare_select(
+                    *self.prepare_select(
                         model_class=orm.ChatParticipantORM,
                         filters=filters,
                         order_by=order_by,
@@ -225,10 +231,7 @@ class ChatMessageRepository(
 ):
     @property
     def _create_statement(self) -> sqlalchemy.TextClause:
-        return sqlalchemy.text(
-            "INSERT INTO chat_messages (id, author_id, chat_id, text, created_at, updated_at, deleted_at) "
-            "VALUES (:id, :author_id, :chat_id, :text, :created_at, :updated_at, :deleted_at)"
-        )
+        return CREATE_MESSAGE
 
     async def create(
         self, item: models.NewChatMessageDomain
@@ -252,9 +255,10 @@ class ChatMessageRepository(
         messages = (
             (
                 await session.execute(
-                    self.prepare_select(
+                    *self.prepare_select(
                         model_class=orm.ChatMessageORM,
-                        where_clause=f"id IN ({', '.join((f"'{item['''id''']}'" for item in insert_items))})",
+                        where_clause="id = ANY(:ids)",
+                        params={"ids": [item["id"] for item in insert_items]},
                     )
                 )
             )
@@ -280,7 +284,7 @@ class ChatMessageRepository(
         messages = (
             (
                 await session.execute(
-                    self.prepare_select(
+                    *self.prepare_select(
                         model_class=orm.ChatMessageORM,
                         filters=filters,
                         order_by=order_by,
@@ -54,9 +54,10 @@ class FriendRepository(
         friends = (
             (
                 await session.execute(
-                    self.prepare_select(
+                    *self.prepare_select(
                         model_class=orm.FriendORM,
-                        where_clause=f"id IN ({', '.join((f"'{item['''id''']}'" for item in insert_friends))})",
+                        where_clause="id = ANY(:ids)",
+                        params={"ids": [item["id"] for item in insert_friends]},
                     )
                 )
             )
@@ -82,7 +83,7 @@ class FriendRepository(
         friends = (
             (
                 await session.execute(
-                    self.prepare_select(
+                    *self.prepare_select(
                         model_class=orm.FriendORM,
                         filters=filters,
                         order_by=order_by,
@@ -96,6 +97,28 @@ class FriendRepository(
         )
         return [models.FriendDomain(**friend) for friend in friends]
 
+    async def find_celebrities(
+        self, user_id: uuid.UUID, threshold: int
+    ) -> list[uuid.UUID]:
+        """
+        Авторы, на которых подписан пользователь и у которых больше threshold друзей
+        """
+        session = self._get_db_session()
+        result = await session.execute(
+            sqlalchemy.text(
+                "SELECT f.user_id "
+                "FROM friends f "
+                "WHERE f.friend_id = :user_id "
+                "AND f.deleted_at IS NULL "
+                "AND ("
+                "SELECT COUNT(*) FROM friends c "
+                "WHERE c.user_id = f.user_id AND c.deleted_at IS NULL"
+                ") > :threshold"
+            ),
+            {"user_id": str(user_id), "threshold": threshold},
+        )
+        return list(result.scalars().all())
+
     async def update(self, item: models.FriendDomain) -> models.FriendDomain:
         item.updated_at = datetime.datetime.now(datetime.timezone.utc)
         session = self._get_db_session()
@@ -1,9 +1,11 @@
 from social_network.infrastructure.database.repository.mixins.select import (
     ModelInSelectType,
     SelectPreparationMixin,
+    compile_select,
 )
 
 __all__ = [
     "ModelInSelectType",
     "SelectPreparationMixin",
+    "compile_select",
 ]
@@ -1,3 +1,4 @@
+import functools
 import typing
 from typing import Generic, Optional, TypeVar
 
@@ -8,6 +9,36 @@ from social_network.infrastructure.database import models
 ModelInSelectType = TypeVar("ModelInSelectType", bound=models.BaseORM)
 
 
+@functools.lru_cache(maxsize=1024)
+def compile_select(
+    table: str,
+    select_fields: typing.Optional[str],
+    where_clause: typing.Optional[str],
+    filter_keys: tuple[str, ...],
+    exclude_deleted: bool,
+    order_by: typing.Optional[str],
+    has_limit: bool,
+) -> sqlalchemy.TextClause:
+    """
+    Текст запроса зависит только от его формы, значения передаются параметрами.
+    Поэтому asyncpg переиспользует подготовленный запрос, а Postgres – его план
+    """
+    conditions = [f"{key} = :{key}" for key in filter_keys]
+    if where_clause:
+        conditions.insert(0, where_clause)
+    if exclude_deleted:
+        conditions.append("deleted_at IS NULL")
+
+    query = f"SELECT {select_fields or '*'} FROM {table}"
+    if conditions:
+        query += f" WHERE {' AND '.join(conditions)}"
+    if order_by:
+        query += f" ORDER BY {order_by}"
+    if has_limit:
+        query += " LIMIT :limit"
+    return sqlalchemy.text(query)
+
+
 class SelectPreparationMixin(Generic[ModelInSelectType]):
     @staticmethod
     def prepare_select(
@@ -15,25 +46,26 @@ class SelectPreparationMixin(Generic[ModelInSelectType]):
         *,
         select_fields: typing.Optional[str] = None,
         where_clause: typing.Optional[str] = None,
+        params: typing.Optional[dict[str, typing.Any]] = None,
         filters: typing.Optional[dict[str, typing.Any]] = None,
         exclude_deleted: bool = False,
         order_by: typing.Optional[str] = None,
         limit: Optional[int] = None,
-    ) -> sqlalchemy.TextClause:
-        query = f"SELECT {select_fields or '*'} FROM {model_class.__tablename__}"
-        if where_clause:
-            if exclude_deleted:
-                where_clause += " AND deleted_at IS NULL"
-            query += f" WHERE {where_clause}"
-        elif filters:
-            query += f" WHERE {' AND '.join([f"""{k} = '{str(v)}'""" for k, v in filters.items()])}"
-            if exclude_deleted:
-                query += " AND deleted_at IS NULL"
-        elif exclude_deleted:
-            query += " WHERE deleted_at IS NULL"
-
-        if order_by:
-            query += f" ORDER BY {order_by}"
+    ) -> tuple[sqlalchemy.TextClause, dict[str, typing.Any]]:
+        """
+        Возвращает запрос и его параметры: session.execute(*self.prepare_select(...)).
+        where_clause – условие с параметрами из params, filters – равенства колонок
+        """
+        statement = compile_select(
+            model_class.__tablename__,
+            select_fields,
+            where_clause,
+            tuple(filters or ()),
+            exclude_deleted,
+            order_by,
+            bool(limit),
+        )
+        values = {**(params or {}), **(filters or {})}
         if limit:
-            query += f" LIMIT {limit}"
-        return sqlalchemy.text(query)
+            values["limit"] = limit
+        return statement, values
@@ -11,6 +11,60 @@ from social_network.infrastructure.database import exceptions
 from social_network.infrastructure.database import models as orm
 from social_network.infrastructure.database.repository import abstract, mixins
 
+FEED_QUERY_JOIN = "join"
+FEED_QUERY_LATERAL = "lateral"
+
+FEED_QUERIES = {
+    FEED_QUERY_JOIN: (
+        "SELECT p.* "
+        "FROM posts p JOIN friends f "
+        "ON p.author_id = f.user_id "
+        "WHERE p.author_id != :current_user_id "
+        "AND p.deleted_at IS NULL "
+        "AND f.deleted_at IS NULL "
+        "AND f.friend_id = :current_user_id "
+        "{after_cursor}"
+        "ORDER BY p.created_at DESC, p.id DESC "
+        "OFFSET :offset "
+        "LIMIT :limit"
+    ),
+    # Top-N по каждому другу: индекс (author_id, created_at DESC, id DESC)
+    # отдает посты друга уже упорядоченными, поэтому каждая ветка читает не больше
+    # offset + limit записей индекса, а тела постов читаются только для итоговой страницы
+    FEED_QUERY_LATERAL: (
+        "SELECT p.* "
+        "FROM ("
+        "SELECT lp.id "
+        "FROM friends f "
+        "CROSS JOIN LATERAL ("
+        "SELECT p.id, p.created_at "
+        "FROM posts p "
+        "WHERE p.author_id = f.user_id "
+        "AND p.deleted_at IS NULL "
+        "{after_cursor}"
+        "ORDER BY p.created_at DESC, p.id DESC "
+        "LIMIT :depth"
+        ") lp "
+        "WHERE f.friend_id = :current_user_id "
+        "AND f.user_id != :current_user_id "
+        "AND f.deleted_at IS NULL "
+        "ORDER BY lp.created_at DESC, lp.id DESC "
+        "OFFSET :offset "
+        "LIMIT :limit"
+        ") top JOIN posts p ON p.id = top.id "
+        "ORDER BY p.created_at DESC, p.id DESC"
+    ),
+}
+FEED_AFTER_CURSOR = "AND (p.created_at, p.id) < (:cursor_created_at, :cursor_id) "
+# Текст запроса ленты для каждого варианта – без курсора и с курсором
+FEED_STATEMENTS = {
+    (variant, with_cursor): sqlalchemy.text(
+        query.format(after_cursor=FEED_AFTER_CURSOR if with_cursor else "")
+    )
+    for variant, query in FEED_QUERIES.items()
+    for with_cursor in (False, True)
+}
+
 
 class PostRepository(
     abstract.AbstractRepository[
@@ -18,6 +72,20 @@ class PostRepository(
     ],
     mixins.SelectPreparationMixin[orm.PostORM],
 ):
+    """
+    Лента строится одним из вариантов запроса (db.feed_query_variant):
+    - join: посты всех друзей соединяются и сортируются целиком
+    - lateral: для каждого друга берутся только его последние offset + limit постов
+      по индексу ix_posts_author_id_created_at_id, и сортируется уже их объединение.
+      Выгоднее, когда у друзей много постов
+    """
+
+    def __init__(self, feed_query_variant: str = FEED_QUERY_JOIN) -> None:
+        super().__init__()
+        if feed_query_variant not in FEED_QUERIES:
+            raise ValueError(f"Unknown feed query variant {feed_query_variant}")
+        self._feed_query_variant = feed_query_variant
+
     @property
     def _create_statement(self) -> sqlalchemy.TextClause:
         return sqlalchemy.text(
@@ -50,9 +118,10 @@ class PostRepository(
         posts = (
             (
                 await session.execute(
-                    self.prepare_select(
+                    *self.prepare_select(
                         model_class=orm.PostORM,
-                        where_clause=f"id IN ({', '.join((f"'{item['''id''']}'" for item in insert_posts))})",
+                        where_clause="id = ANY(:ids)",
+                        params={"ids": [item["id"] for item in insert_posts]},
                     )
                 )
             )
@@ -78,7 +147,7 @@ class PostRepository(
         posts = (
             (
                 await session.execute(
-                    self.prepare_select(
+                    *self.prepare_select(
                         model_class=orm.PostORM,
                         filters=filters,
                         order_by=order_by,
@@ -92,6 +161,24 @@ class PostRepository(
         )
         return [models.PostDomain(**post) for post in posts]
 
+    async def find_many(self, ids: list[uuid.UUID]) -> list[models.PostDomain]:
+        """Неудаленные посты по списку идентификаторов, порядок не гарантируется"""
+        session = self._get_db_session()
+        posts = (
+            (
+                await session.execute(
+                    sqlalchemy.text(
+                        "SELECT * FROM posts "
+                        "WHERE id = ANY(:ids) AND deleted_at IS NULL"
+                    ),
+                    {"ids": ids},
+                )
+            )
+            .mappings()
+            .all()
+        )
+        return [models.PostDomain(**post) for post in posts]
+
     async def update(self, item: models.UpdatingPostDomain) -> models.PostDomain:
         session = self._get_db_session()
         await session.execute(
@@ -112,25 +199,33 @@ class PostRepository(
         raise NotImplementedError()
 
     async def feed(
-        self, user_id: uuid.UUID, offset: int, limit: int
+        self,
+        user_id: uuid.UUID,
+        offset: int,
+        limit: int,
+        cursor: typing.Optional[models.FeedCursor] = None,
     ) -> list[models.PostDomain]:
+        """
+        С курсором страница ищется по ключу (created_at, id), а не через OFFSET:
+        Postgres не читает и не отбрасывает посты предыдущих страниц
+        """
         session = self._get_db_session()
+        params: dict[str, typing.Any] = {
+            "current_user_id": str(user_id),
+            "offset": offset,
+            "limit": limit,
+            "depth": offset + limit,
+        }
+        if cursor is not None:
+            params |= {
+                "cursor_created_at": cursor.created_at,
+                "cursor_id": cursor.id,
+            }
         posts = (
             (
                 await session.execute(
-                    sqlalchemy.text(
-                        "SELECT p.* "
-                        "FROM posts p JOIN friends f "
-                        "ON p.author_id = f.user_id "
-                        "WHERE p.author_id != :current_user_id "
-                        "AND p.deleted_at IS NULL "
-                        "AND f.deleted_at IS NULL "
-                        "AND f.friend_id = :current_user_id "
-                        "ORDER BY p.created_at DESC "
-                        "OFFSET :offset "
-                        "LIMIT :limit"
-                    ),
-                    {"current_user_id": str(user_id), "offset": offset, "limit": limit},
+                    FEED_STATEMENTS[(self._feed_query_variant, cursor is not None)],
+                    params,
                 )
             )
             .mappings()
@@ -0,0 +1,130 @@
+import typing
+import uuid
+
+import sqlalchemy
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from social_network.domain import models
+from social_network.infrastructure.database.repository import abstract
+
+
+class TimelineRepository(abstract.BaseRepository[AsyncSession]):
+    """
+    Материализованные ленты пользователей (таблица timelines).
+    Пост записывается в ленты всех друзей автора одним INSERT ... SELECT,
+    а страница ленты читается из одной секции по первичному ключу
+    без соединения с friends и сортировки постов всех друзей.
+    Ленты не редактируются и не читаются по id, поэтому CRUD не нужен
+    """
+
+    async def create(self, item: models.PostDomain) -> models.PostDomain:
+        session = self._get_db_session()
+        await session.execute(
+            sqlalchemy.text(
+                "INSERT INTO timelines (user_id, created_at, post_id, author_id) "
+                "SELECT f.friend_id, :created_at, :post_id, :author_id "
+                "FROM friends f "
+                "WHERE f.user_id = :author_id "
+                "AND f.deleted_at IS NULL "
+                "AND f.friend_id != :author_id "
+                "ON CONFLICT DO NOTHING"
+            ),
+            {
+                "created_at": item.created_at,
+                "post_id": item.id,
+                "author_id": item.author_id,
+            },
+        )
+        return item
+
+    async def delete(self, item: models.PostDomain) -> None:
+        """Время создания поста известно, поэтому удаление – поиск по первичному ключу"""
+        session = self._get_db_session()
+        await session.execute(
+            sqlalchemy.text(
+                "DELETE FROM timelines t "
+                "USING friends f "
+                "WHERE f.user_id = :author_id "
+                "AND t.user_id = f.friend_id "
+                "AND t.created_at = :created_at "
+                "AND t.post_id = :post_id"
+            ),
+            {
+                "created_at": item.created_at,
+                "post_id": item.id,
+                "author_id": item.author_id,
+            },
+        )
+
+    async def add_author(self, user_id: uuid.UUID, author_id: uuid.UUID) -> None:
+        """Новый друг: переносим его посты в ленту пользователя"""
+        session = self._get_db_session()
+        await session.execute(
+            sqlalchemy.text(
+                "INSERT INTO timelines (user_id, created_at, post_id, author_id) "
+                "SELECT :user_id, p.created_at, p.id, p.author_id "
+                "FROM posts p "
+                "WHERE p.author_id = :author_id "
+                "AND p.deleted_at IS NULL "
+                "ON CONFLICT DO NOTHING"
+            ),
+            {"user_id": user_id, "author_id": author_id},
+        )
+
+    async def remove_author(self, user_id: uuid.UUID, author_id: uuid.UUID) -> None:
+        """Удаленный друг: убираем его посты из ленты пользователя"""
+        session = self._get_db_session()
+        await session.execute(
+            sqlalchemy.text(
+                "DELETE FROM timelines "
+                "WHERE user_id = :user_id AND author_id = :author_id"
+            ),
+            {"user_id": user_id, "author_id": author_id},
+        )
+
+    async def feed(
+        self,
+        user_id: uuid.UUID,
+        offset: int,
+        limit: int,
+        cursor: typing.Optional[models.FeedCursor] = None,
+    ) -> list[models.PostDomain]:
+        session = self._get_db_session()
+        params: dict[str, typing.Any] = {
+            "current_user_id": user_id,
+            "offset": offset,
+            "limit": limit,
+        }
+        after_cursor = ""
+        if cursor is not None:
+            after_cursor = (
+                "AND (t.created_at, t.post_id) < (:cursor_created_at, :cursor_id) "
+            )
+            params |= {
+                "cursor_created_at": cursor.created_at,
+                "cursor_id": cursor.id,
+            }
+        posts = (
+            (
+                await session.execute(
+                    sqlalchemy.text(
+                        # Удаленные посты отбрасываются до LIMIT, иначе страница
+                        # окажется короче. Соединение идет в порядке первичного
+                        # ключа ленты и останавливается, набрав limit постов
+                        "SELECT p.* "
+                        "FROM timelines t "
+                        "JOIN posts p ON p.id = t.post_id "
+                        "WHERE t.user_id = :current_user_id "
+                        "AND p.deleted_at IS NULL "
+                        f"{after_cursor}"
+                        "ORDER BY t.created_at DESC, t.post_id DESC "
+                        "OFFSET :offset "
+                        "LIMIT :limit"
+                    ),
+                    params,
+                )
+            )
+            .mappings()
+            .all()
+        )
+        return [models.PostDomain(**post) for post in posts]
@@ -9,6 +9,9 @@ from social_network.infrastructure.database import exceptions
 from social_network.infrastructure.database import models as orm
 from social_network.infrastructure.database.repository import abstract, mixins
 
+# Пользователь по id (find_one): запрос каждого авторизованного запроса
+FIND_BY_ID = sqlalchemy.text("SELECT * FROM users WHERE id = :id")
+
 
 class UserRepository(
     abstract.AbstractRepository[
@@ -19,8 +22,8 @@ class UserRepository(
     @property
     def _create_statement(self) -> sqlalchemy.TextClause:
         return sqlalchemy.text(
-            "INSERT INTO users (id, first_name, second_name, birthdate, biography, city, password, created_at, updated_at, deleted_at) "
-            "VALUES (:id, :first_name, :second_name, :birthdate, :biography, :city, :password, :created_at, :updated_at, :deleted_at)"
+            "INSERT INTO users (id, first_name, second_name, birthdate, biography, city, password, credentials_digest, created_at, updated_at, deleted_at) "
+            "VALUES (:id, :first_name, :second_name, :birthdate, :biography, :city, :password, :credentials_digest, :created_at, :updated_at, :deleted_at)"
         )
 
     async def create(self, item: models.NewUserDomain) -> models.UserDomain:
@@ -43,9 +46,10 @@ class UserRepository(
         users = (
             (
                 await session.execute(
-                    self.prepare_select(
+                    *self.prepare_select(
                         model_class=orm.UserORM,
-                        where_clause=f"id IN ({', '.join((f"'{item['''id''']}'" for item in insert_items))})",
+                        where_clause="id = ANY(:ids)",
+                        params={"ids": [item["id"] for item in insert_items]},
                     )
                 )
             )
@@ -61,9 +65,14 @@ class UserRepository(
         users = (
             (
                 await session.execute(
-                    self.prepare_select(
+                    *self.prepare_select(
                         model_class=orm.UserORM,
-                        where_clause=f"second_name LIKE '{second_name_prefix}%' AND first_name LIKE '{first_name_prefix}%'",
+                        where_clause="second_name LIKE :second_name_prefix "
+                        "AND first_name LIKE :first_name_prefix",
+                        params={
+                            "second_name_prefix": f"{second_name_prefix}%",
+                            "first_name_prefix": f"{first_name_prefix}%",
+                        },
                         exclude_deleted=True,
                         order_by="created_at desc",
                     )
@@ -75,10 +84,11 @@ class UserRepository(
         return [models.UserDomain(**user) for user in users]
 
     async def find_one(self, id_: str) -> models.UserDomain:
-        users = await self.find_all(filters={"id": id_})
+        session = self._get_db_session()
+        users = (await session.execute(FIND_BY_ID, {"id": id_})).mappings().all()
         if not users:
             raise exceptions.ObjectDoesNotExistError(model="users", id_=id_)
-        return users[0]
+        return models.UserDomain(**users[0])
 
     async def find_all(
         self,
@@ -91,7 +101,7 @@ class UserRepository(
         users = (
             (
                 await session.execute(
-                    self.prepare_select(
+                    *self.prepare_select(
                         model_class=orm.UserORM,
                         filters=filters,
                         order_by=order_by,
@@ -105,6 +115,46 @@ class UserRepository(
         )
         return [models.UserDomain(**user) for user in users]
 
+    async def find_duplicates(
+        self, credentials_digest: str, profile: dict[str, typing.Any]
+    ) -> list[models.UserDomain]:
+        """
+        Пользователи с тем же дайджестом анкеты и пароля (поиск по индексу),
+        а также старые записи без дайджеста с той же анкетой: их пароль
+        можно сравнить только после расшифровки
+        """
+        session = self._get_db_session()
+        users = (
+            (
+                await session.execute(
+                    sqlalchemy.text(
+                        "SELECT * FROM users WHERE deleted_at IS NULL AND ("
+                        "credentials_digest = :credentials_digest OR ("
+                        "credentials_digest IS NULL AND first_name = :first_name "
+                        "AND second_name = :second_name AND birthdate = :birthdate "
+                        "AND biography = :biography AND city = :city))"
+                    ),
+                    profile | {"credentials_digest": credentials_digest},
+                )
+            )
+            .mappings()
+            .all()
+        )
+        return [models.UserDomain(**user) for user in users]
+
+    async def update_credentials(
+        self, id_: str, password: str, credentials_digest: str
+    ) -> None:
+        session = self._get_db_session()
+        await session.execute(
+            sqlalchemy.text(
+                "UPDATE users SET password = :password, "
+                "credentials_digest = :credentials_digest, updated_at = now() "
+                "WHERE id = :id"
+            ),
+            {"id": id_, "password": password, "credentials_digest": credentials_digest},
+        )
+
     async def update(self, item: models.UserDomain) -> models.UserDomain:
         raise NotImplementedError()
 
@@ -1,33 +1,157 @@
 import asyncio
+import contextvars
+import dataclasses
 import logging
+import random
+import threading
 import time
 import types
 import typing
 
-DEFAULT_RETRIES_MAX_ATTEMPTS = 10
-DEFAULT_RETRY_DELAY_SECONDS = 1
+from social_network.infrastructure import metrics
+
+DEFAULT_RETRIES_MAX_ATTEMPTS = 5
+DEFAULT_RETRY_DELAY_SECONDS = 0.05
+DEFAULT_RETRY_MAX_DELAY_SECONDS = 2.0
+DEFAULT_RETRY_BUDGET_CAPACITY = 20.0
+DEFAULT_RETRY_BUDGET_REFILL_PER_SECOND = 2.0
 
 ExceptionHandlers = dict[
     typing.Type[BaseException], typing.Optional[typing.Callable[[BaseException], bool]]
 ]
 
+RETRIES = metrics.Counter(
+    "social_network_retries_total",
+    "Исключения, после которых решался вопрос о повторе: retried – повторили, "
+    "exhausted – закончились попытки, budget – закончился бюджет повторов процесса, "
+    "deadline – повтор не успевает до дедлайна запроса",
+    labelnames=("exception", "outcome"),
+)
+
+# Момент (time.monotonic), после которого повторять бессмысленно: клиент уже не ждет ответа
+_deadline: contextvars.ContextVar[typing.Optional[float]] = contextvars.ContextVar(
+    "retry_deadline", default=None
+)
+
+
+def set_deadline(timeout_seconds: typing.Optional[float]) -> None:
+    _deadline.set(
+        None if timeout_seconds is None else time.monotonic() + timeout_seconds
+    )
+
+
+def get_deadline() -> typing.Optional[float]:
+    return _deadline.get()
+
+
+class RetryBudget:
+    """
+    Бюджет повторов процесса (token bucket): каждый повтор тратит токен,
+    токены восстанавливаются с постоянной скоростью. Во время аварии бюджет
+    быстро заканчивается, и повторы перестают умножать нагрузку на базу
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float) -> None:
+        self._capacity = capacity
+        self._refill_per_second = refill_per_second
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self._capacity,
+                self._tokens + (now - self._updated_at) * self._refill_per_second,
+            )
+            self._updated_at = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+@dataclasses.dataclass
+class RetryPolicy:
+    """
+    Экспоненциальная задержка с полным джиттером:
+    случайная величина от 0 до min(max_delay, delay * 2 ** (attempt - 1))
+    """
+
+    max_attempts: int = DEFAULT_RETRIES_MAX_ATTEMPTS
+    delay: float = DEFAULT_RETRY_DELAY_SECONDS
+    max_delay: float = DEFAULT_RETRY_MAX_DELAY_SECONDS
+    budget: typing.Optional[RetryBudget] = dataclasses.field(
+        default_factory=lambda: RetryBudget(
+            capacity=DEFAULT_RETRY_BUDGET_CAPACITY,
+            refill_per_second=DEFAULT_RETRY_BUDGET_REFILL_PER_SECOND,
+        )
+    )
+
+    @classmethod
+    def create(
+        cls,
+        max_attempts: int,
+        delay: float,
+        max_delay: float,
+        budget_capacity: float,
+        budget_refill_per_second: float,
+    ) -> "RetryPolicy":
+        return cls(
+            max_attempts=max_attempts,
+            delay=delay,
+            max_delay=max_delay,
+            budget=RetryBudget(
+                capacity=budget_capacity, refill_per_second=budget_refill_per_second
+            ),
+        )
+
+    def backoff(self, attempt_number: int) -> float:
+        return random.uniform(
+            0, min(self.max_delay, self.delay * 2 ** (attempt_number - 1))
+        )
+
+
+DEFAULT_POLICY = RetryPolicy()
+
+
+def configure(policy: RetryPolicy) -> None:
+    """Политика по умолчанию задается один раз при старте процесса"""
+    global DEFAULT_POLICY
+    DEFAULT_POLICY = policy
+
 
 class RetryAttempt:
     def __init__(
         self,
         notify_success: typing.Callable[..., None],
-        max_attempts: int,
+        policy: RetryPolicy,
         exceptions_handlers: typing.Optional[ExceptionHandlers] = None,
     ) -> None:
         self._notify_success = notify_success
         self._attempt_number = 0
-        self._max_attempts = max_attempts
+        self._policy = policy
         self._logger = logging.getLogger(__name__)
         self._exceptions_handlers = exceptions_handlers or {}
+        self.delay = 0.0
 
     def __enter__(self) -> None:
         self._attempt_number += 1
 
+    def _can_retry(self, exc_type: typing.Type[BaseException]) -> bool:
+        outcome = "retried"
+        self.delay = self._policy.backoff(self._attempt_number)
+        deadline = get_deadline()
+        if self._attempt_number > self._policy.max_attempts:
+            outcome = "exhausted"
+        elif deadline is not None and time.monotonic() + self.delay >= deadline:
+            outcome = "deadline"
+        elif self._policy.budget and not self._policy.budget.try_acquire():
+            outcome = "budget"
+        RETRIES.inc(exception=exc_type.__name__, outcome=outcome)
+        return outcome == "retried"
+
     def __exit__(
         self,
         exc_type: typing.Optional[typing.Type[BaseException]],
@@ -38,34 +162,33 @@ class RetryAttempt:
             self._notify_success()
             return True
 
-        if self._attempt_number <= self._max_attempts:
-            for exception_type, handler in self._exceptions_handlers.items():
-                if exc_type is exception_type or issubclass(exc_type, exception_type):
-                    exception_is_handled = True
-                    if handler:
-                        exception_is_handled = handler(
-                            typing.cast(BaseException, exc_val)
-                        )
+        for exception_type, handler in self._exceptions_handlers.items():
+            if exc_type is exception_type or issubclass(exc_type, exception_type):
+                exception_is_handled = True
+                if handler:
+                    exception_is_handled = handler(typing.cast(BaseException, exc_val))
 
-                    self._logger.debug(
-                        f"Detected {exc_type} while attempt {self._attempt_number}."
-                    )
-                    return exception_is_handled
+                self._logger.debug(
+                    f"Detected {exc_type} while attempt {self._attempt_number}."
+                )
+                return exception_is_handled and self._can_retry(exc_type)
 
         return False
 
 
 def retry(
-    max_attempts: int = DEFAULT_RETRIES_MAX_ATTEMPTS,
-    delay: float = DEFAULT_RETRY_DELAY_SECONDS,
+    max_attempts: typing.Optional[int] = None,
+    delay: typing.Optional[float] = None,
     exceptions_handlers: typing.Optional[ExceptionHandlers] = None,
+    policy: typing.Optional[RetryPolicy] = None,
 ) -> typing.Generator[RetryAttempt, None, None]:
     """Retry a piece of code in case of certain exceptions
 
     Args:
-        max_attempts (int): do retry this times
-        delay (float): delay between attempts
+        max_attempts (Optional[int]): do retry this times, overrides policy
+        delay (Optional[float]): base delay between attempts, overrides policy
         exceptions_handlers (Optional[ExceptionHandlers]): dict with exceptions and their handlers
+        policy (Optional[RetryPolicy]): backoff and budget, DEFAULT_POLICY by default
 
     Yields:
         RetryAttempt: RetryAttempt context manager
@@ -77,25 +200,28 @@ def retry(
         nonlocal success
         success = True
 
-    attempt = RetryAttempt(succeed, max_attempts, exceptions_handlers)
-    for i in range(max_attempts + 1):
+    policy = _override(policy, max_attempts, delay)
+    attempt = RetryAttempt(succeed, policy, exceptions_handlers)
+    for i in range(policy.max_attempts + 1):
         yield attempt
         if success:
             break
-        time.sleep(delay)
+        time.sleep(attempt.delay)
 
 
 async def aretry(
-    max_attempts: int = DEFAULT_RETRIES_MAX_ATTEMPTS,
-    delay: float = DEFAULT_RETRY_DELAY_SECONDS,
+    max_attempts: typing.Optional[int] = None,
+    delay: typing.Optional[float] = None,
     exceptions_handlers: typing.Optional[ExceptionHandlers] = None,
+    policy: typing.Optional[RetryPolicy] = None,
 ) -> typing.AsyncGenerator[RetryAttempt, None]:
     """Async Retry a piece of code in case of certain exceptions
 
     Args:
-        max_attempts (int): do retry this times
-        delay (float): delay between attempts
+        max_attempts (Optional[int]): do retry this times, overrides policy
+        delay (Optional[float]): base delay between attempts, overrides policy
         exceptions_handlers (Optional[ExceptionHandlers]): dict with exceptions and their handlers
+        policy (Optional[RetryPolicy]): backoff and budget, DEFAULT_POLICY by default
 
     Yields:
         RetryAttempt: RetryAttempt context manager
@@ -107,10 +233,26 @@ async def aretry(
         nonlocal success
         success = True
 
-    attempt = RetryAttempt(succeed, max_attempts, exceptions_handlers)
-    for i in range(max_attempts + 1):
+    policy = _override(policy, max_attempts, delay)
+    attempt = RetryAttempt(succeed, policy, exceptions_handlers)
+    for i in range(policy.max_attempts + 1):
         yield attempt
         if success:
             break
 
-        await asyncio.sleep(delay)
+        await asyncio.sleep(attempt.delay)
+
+
+def _override(
+    policy: typing.Optional[RetryPolicy],
+    max_attempts: typing.Optional[int],
+    delay: typing.Optional[float],
+) -> RetryPolicy:
+    policy = policy or DEFAULT_POLICY
+    if max_attempts is None and delay is None:
+        return policy
+    return dataclasses.replace(
+        policy,
+        max_attempts=policy.max_attempts if max_attempts is None else max_attempts,
+        delay=policy.delay if delay is None else delay,
+    )
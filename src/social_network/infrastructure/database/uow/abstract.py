@@ -1,5 +1,5 @@
 import abc
-import asyncio
+import contextvars
 import enum
 import logging
 import types
@@ -11,9 +11,6 @@ from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from social_network.infrastructure.database import exceptions, retry
 
-MAX_CONNECTION_ATTEMPTS: int = 3
-PAUSE_BETWEEN_ATTEMPTS_SECONDS: float = 0.1
-
 
 class Mode(str, enum.Enum):
     read = "read"
@@ -27,13 +24,26 @@ def database_connection_exception_handler(_: BaseException) -> bool:
     return False
 
 
+def transient_database_exception_handler(exc: BaseException) -> bool:
+    """
+    Временный сбой, после которого транзакцию можно начать заново:
+    OperationalError – обрыв соединения, перезапуск или перегрузка сервера,
+    InterfaceError – только если соединение инвалидировано
+    """
+    if isinstance(exc, sa_exc.DBAPIError) and exc.connection_invalidated:
+        return True
+    return isinstance(exc, sa_exc.OperationalError)
+
+
 def get_typical_db_exceptions_handlers(
     extra_handlers: typing.Optional[retry.ExceptionHandlers] = None,
 ) -> retry.ExceptionHandlers:
     return {
-        sa_exc.InterfaceError: database_connection_exception_handler,
+        sa_exc.InterfaceError: transient_database_exception_handler,
         sa_exc.InternalError: database_connection_exception_handler,
-        sa_exc.OperationalError: database_connection_exception_handler,
+        sa_exc.OperationalError: transient_database_exception_handler,
+        # Соединение не получено: повторяем по политике (задержка, бюджет, дедлайн)
+        exceptions.SessionCreationError: None,
         exceptions.DatabaseError: database_connection_exception_handler,
     } | (extra_handlers or {})
 
@@ -44,14 +54,34 @@ class AbstractUnitOfWork(abc.ABC):
         database_name: str,
         master_factory: async_sessionmaker[AsyncSession],
         slave_factory: typing.Optional[async_sessionmaker[AsyncSession]] = None,
-        timeout_seconds: int = 0,
     ) -> None:
         self._database_name = database_name
         self._master_factory = master_factory
         self._slave_factory = slave_factory
-        self._session: typing.Optional[AsyncSession] = None
-        self._timeout_seconds = timeout_seconds
-        self._mode: Mode = Mode.write
+        # Unit of work создается один раз на процесс, а сессия и режим
+        # принадлежат транзакции конкретной задачи
+        self._session_var: contextvars.ContextVar[typing.Optional[AsyncSession]] = (
+            contextvars.ContextVar(f"{type(self).__name__}.session", default=None)
+        )
+        self._mode_var: contextvars.ContextVar[Mode] = contextvars.ContextVar(
+            f"{type(self).__name__}.mode", default=Mode.write
+        )
+
+    @property
+    def _session(self) -> typing.Optional[AsyncSession]:
+        return self._session_var.get()
+
+    @_session.setter
+    def _session(self, session: typing.Optional[AsyncSession]) -> None:
+        self._session_var.set(session)
+
+    @property
+    def _mode(self) -> Mode:
+        return self._mode_var.get()
+
+    @_mode.setter
+    def _mode(self, mode: Mode) -> None:
+        self._mode_var.set(mode)
 
     def _get_session(self) -> AsyncSession:
         if self._mode == Mode.write or not self._slave_factory:
@@ -60,46 +90,39 @@ class AbstractUnitOfWork(abc.ABC):
         return self._slave_factory()
 
     async def __aenter__(self) -> "AbstractUnitOfWork":
-        checking_connection_attempts = MAX_CONNECTION_ATTEMPTS
-        session_is_valid: bool = False
-        while not session_is_valid and checking_connection_attempts > 0:
-            session = self._get_session()
-            try:
-                if self._timeout_seconds > 0:
-                    await session.execute(
-                        sqlalchemy.text(
-                            f"SET STATEMENT_TIMEOUT={self._timeout_seconds}s"
-                        )
-                    )
-                await session.execute(
-                    sqlalchemy.text(
-                        f"SELECT EXISTS (SELECT 1 FROM pg_database WHERE datname = '{self._database_name}')"
-                    )
-                )
-                await self._init_repositories(session)
-                self._session = session
-                session_is_valid = True
-            except (sa_exc.OperationalError, sa_exc.TimeoutError) as exc:
-                logger.debug(
-                    f"Attempt to get session was unsuccessful. "
-                    f"Attempts left: {checking_connection_attempts}. Error: {exc}"
-                )
-                checking_connection_attempts -= 1
-                await session.close()
-                if not checking_connection_attempts:
-                    raise exceptions.SessionCreationError(
-                        f"Exceed {MAX_CONNECTION_ATTEMPTS} db connection attempts"
-                    ) from exc
-                await asyncio.sleep(PAUSE_BETWEEN_ATTEMPTS_SECONDS)
-            except ConnectionError:
-                # Возможно, до RO-реплики доезжают DDL изменения. Переключаем запросы на master-реплику
-                self._mode = Mode.write
-                checking_connection_attempts -= 1
-        if session_is_valid:
-            logger.debug("Unit of work started")
-
+        """
+        Транзакция начинается без служебных запросов: соединение только берется из пула,
+        который сам проверяет его живость (pool_pre_ping), а statement_timeout задается
+        при установке соединения (db.statement_timeout_ms).
+        Ошибка подключения проявляется здесь, до начала работы с репозиториями,
+        как SessionCreationError: transaction повторяет ее по политике повторов
+        и пробрасывает, когда попытки, бюджет или дедлайн закончились
+        """
+        session = self._get_session()
+        try:
+            await session.connection()
+        except (sa_exc.OperationalError, sa_exc.TimeoutError) as exc:
+            await session.close()
+            raise exceptions.SessionCreationError(
+                f"Failed to connect to {self._database_name}: {exc}"
+            ) from exc
+        except BaseException:
+            await session.close()
+            raise
+        await self._init_repositories(session)
+        self._session = session
+        logger.debug("Unit of work started")
         return self
 
+    def _fallback_to_master(self, _: BaseException) -> bool:
+        """
+        Возможно, до RO-реплики доезжают DDL изменения. Переключаем запросы на master-реплику
+        """
+        if self._mode == Mode.write:
+            return False
+        self._mode = Mode.write
+        return True
+
     @abc.abstractmethod
     async def _init_repositories(
         self, session: typing.Optional[AsyncSession] = None
@@ -135,9 +158,17 @@ class AbstractUnitOfWork(abc.ABC):
     async def transaction(
         self, read_only: bool = False
     ) -> typing.AsyncIterator["AbstractUnitOfWork"]:
+        """
+        Временные ошибки БД повторяются по политике повторов. Ошибки commit
+        оборачиваются в DatabaseError и не повторяются: неизвестно, применилась ли
+        транзакция. Исключение из тела цикла async for в генератор не передается,
+        поэтому повторяется начало транзакции, а не запросы тела
+        """
         self._mode = Mode.read if read_only else Mode.write
         async for attempt in retry.aretry(
-            exceptions_handlers=get_typical_db_exceptions_handlers()
+            exceptions_handlers=get_typical_db_exceptions_handlers(
+                {ConnectionError: self._fallback_to_master}
+            )
         ):
             with attempt:
                 async with self as transaction:
@@ -16,13 +16,11 @@ class ChatUnitOfWork(abstract.AbstractUnitOfWork):
         user_repository: repository.UserRepository,
         master_factory: async_sessionmaker[AsyncSession],
         slave_factory: typing.Optional[async_sessionmaker[AsyncSession]] = None,
-        timeout_seconds: int = 0,
     ) -> None:
         super().__init__(
             database_name=database_name,
             master_factory=master_factory,
             slave_factory=slave_factory,
-            timeout_seconds=timeout_seconds,
         )
 
         self.chats = chat_repository
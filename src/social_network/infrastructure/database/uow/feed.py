@@ -12,22 +12,23 @@ class FeedUnitOfWork(abstract.AbstractUnitOfWork):
         database_name: str,
         post_repository: repository.PostRepository,
         friend_repository: repository.FriendRepository,
+        timeline_repository: repository.TimelineRepository,
         master_factory: async_sessionmaker[AsyncSession],
         slave_factory: typing.Optional[async_sessionmaker[AsyncSession]] = None,
-        timeout_seconds: int = 0,
     ) -> None:
         super().__init__(
             database_name=database_name,
             master_factory=master_factory,
             slave_factory=slave_factory,
-            timeout_seconds=timeout_seconds,
         )
 
         self.posts = post_repository
         self.friends = friend_repository
+        self.timelines = timeline_repository
 
     async def _init_repositories(
         self, session: typing.Optional[AsyncSession] = None
     ) -> None:
         self.posts(session)
         self.friends(session)
+        self.timelines(session)
@@ -13,13 +13,11 @@ class PostUnitOfWork(abstract.AbstractUnitOfWork):
         post_repository: repository.PostRepository,
         master_factory: async_sessionmaker[AsyncSession],
         slave_factory: typing.Optional[async_sessionmaker[AsyncSession]] = None,
-        timeout_seconds: int = 0,
     ) -> None:
         super().__init__(
             database_name=database_name,
             master_factory=master_factory,
             slave_factory=slave_factory,
-            timeout_seconds=timeout_seconds,
         )
 
         self.posts = post_repository
@@ -0,0 +1,11 @@
+from social_network.infrastructure.executor.executor import (
+    DEFAULT,
+    Executor,
+    ExecutorKind,
+)
+
+__all__ = [
+    "DEFAULT",
+    "Executor",
+    "ExecutorKind",
+]
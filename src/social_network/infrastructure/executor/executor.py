@@ -0,0 +1,51 @@
+import asyncio
+import concurrent.futures
+import functools
+import typing
+
+T = typing.TypeVar("T")
+
+ExecutorKind = typing.Literal["inline", "thread", "process"]
+
+
+class Executor:
+    """
+    Пул для синхронной CPU-работы (криптография), чтобы она не занимала event loop.
+
+    - inline: функция выполняется прямо в event loop (без накладных расходов на пул)
+    - thread: пул потоков; hashlib и cryptography отпускают GIL на тяжелых операциях
+    - process: пул процессов; функции и аргументы должны сериализоваться pickle
+
+    Очередь ограничена: не больше max_workers * queue_factor задач ждут пул,
+    остальные ждут в event loop и не копятся в памяти пула
+    """
+
+    def __init__(
+        self, kind: ExecutorKind = "thread", max_workers: int = 4, queue_factor: int = 4
+    ) -> None:
+        self._kind = kind
+        self._pool: typing.Optional[concurrent.futures.Executor] = None
+        if kind == "thread":
+            self._pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="crypto"
+            )
+        elif kind == "process":
+            self._pool = concurrent.futures.ProcessPoolExecutor(max_workers=max_workers)
+        self._slots = asyncio.Semaphore(max_workers * queue_factor)
+
+    async def run(self, func: typing.Callable[..., T], *args: typing.Any) -> T:
+        if self._pool is None:
+            return func(*args)
+        async with self._slots:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._pool, functools.partial(func, *args)
+            )
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Пул по умолчанию для сервисов, которым приложение не передало свой (тесты, скрипты).
+# Потоки создаются при первой задаче
+DEFAULT = Executor(kind="thread")
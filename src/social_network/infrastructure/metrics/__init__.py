@@ -0,0 +1,15 @@
+from social_network.infrastructure.metrics.loop_lag import monitor_loop_lag
+from social_network.infrastructure.metrics.metrics import (
+    REGISTRY,
+    Counter,
+    Gauge,
+    Registry,
+)
+
+__all__ = [
+    "REGISTRY",
+    "Counter",
+    "Gauge",
+    "Registry",
+    "monitor_loop_lag",
+]
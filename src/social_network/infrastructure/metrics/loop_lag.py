@@ -0,0 +1,27 @@
+import asyncio
+
+from social_network.infrastructure.metrics.metrics import Counter, Gauge
+
+EVENT_LOOP_LAG = Gauge(
+    "social_network_event_loop_lag_seconds",
+    "Насколько позже срока проснулся последний таймер монитора event loop",
+)
+EVENT_LOOP_LAG_TOTAL = Counter(
+    "social_network_event_loop_lag_seconds_total",
+    "Суммарная задержка таймеров монитора: rate() показывает долю времени, "
+    "когда event loop был занят синхронной работой",
+)
+
+
+async def monitor_loop_lag(interval: float) -> None:
+    """
+    Фоновая задача: засыпает на interval и измеряет, насколько позже проснулась.
+    Задержка – время, которое event loop провел в синхронном коде других задач
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(loop.time() - started - interval, 0.0)
+        EVENT_LOOP_LAG.set(lag)
+        EVENT_LOOP_LAG_TOTAL.inc(lag)
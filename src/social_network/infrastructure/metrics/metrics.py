@@ -0,0 +1,81 @@
+import collections
+import typing
+
+
+class Counter:
+    """
+    Монотонный счетчик в формате Prometheus.
+    Значения хранятся в памяти процесса, каждый воркер uvicorn отдает свои
+    """
+
+    type_ = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: typing.Sequence[str] = (),
+        registry: typing.Optional["Registry"] = None,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self._labelnames = tuple(labelnames)
+        self._values: dict[tuple[str, ...], float] = collections.defaultdict(float)
+        (registry or REGISTRY).register(self)
+
+    def _labelvalues(self, labels: dict[str, str]) -> tuple[str, ...]:
+        if set(labels) != set(self._labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self._labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self._labelnames)
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        if amount < 0:
+            raise ValueError(f"{self.name} can only be incremented")
+        self._values[self._labelvalues(labels)] += amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._labelvalues(labels), 0.0)
+
+    def collect(self) -> typing.Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.type_}"
+        for labelvalues, value in sorted(self._values.items()):
+            labels = ",".join(
+                f'{name}="{value_}"'
+                for name, value_ in zip(self._labelnames, labelvalues)
+            )
+            yield (
+                f"{self.name}{{{labels}}} {value}" if labels else f"{self.name} {value}"
+            )
+
+
+class Gauge(Counter):
+    """Значение, которое может как расти, так и уменьшаться"""
+
+    type_ = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[self._labelvalues(labels)] = value
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, Counter] = {}
+
+    def register(self, metric: Counter) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """Текстовый формат экспозиции Prometheus (version 0.0.4)"""
+        return "".join(
+            f"{line}\n"
+            for metric in self._metrics.values()
+            for line in metric.collect()
+        )
+
+
+REGISTRY = Registry()
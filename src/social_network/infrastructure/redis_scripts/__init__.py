@@ -0,0 +1,17 @@
+from social_network.infrastructure.redis_scripts.scripts import (
+    CELEBRITIES_ADD,
+    FEED_PUSH,
+    FEED_REMOVE,
+    FEED_REPLACE,
+    POSTS_CACHE,
+    load_script,
+)
+
+__all__ = [
+    "CELEBRITIES_ADD",
+    "FEED_PUSH",
+    "FEED_REMOVE",
+    "FEED_REPLACE",
+    "POSTS_CACHE",
+    "load_script",
+]
@@ -0,0 +1,15 @@
+-- Добавляет автора, ставшего селебрити, в множества селебрити прогретых лент.
+-- KEYS – множества селебрити друзей автора (celebrities:user_id)
+-- ARGV[1] – идентификатор автора
+-- Холодные ленты пропускаются: прогрев соберет их множества из БД.
+-- Возвращает количество лент, в которые автор был добавлен
+local author = ARGV[1]
+local added = 0
+
+for _, celebrities_key in ipairs(KEYS) do
+    if redis.call('EXISTS', celebrities_key) == 1 then
+        added = added + redis.call('SADD', celebrities_key, author)
+    end
+end
+
+return added
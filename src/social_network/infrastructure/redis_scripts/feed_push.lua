@@ -0,0 +1,24 @@
+-- Атомарно добавляет пост в ленту пользователя.
+-- KEYS[1] – лента пользователя (feed:user_id)
+-- ARGV[1] – пост, ARGV[2] – score поста, ARGV[3] – емкость ленты
+-- Срок жизни ленты не продлевается: его задает только прогрев, иначе лента,
+-- в которую постоянно пишут, никогда не устареет и не перечитается из БД
+local feed_key = KEYS[1]
+local post = ARGV[1]
+local score = tonumber(ARGV[2])
+local capacity = tonumber(ARGV[3])
+
+-- Лента еще не прогрета или уже удалена по TTL – ее соберет первый запрос на чтение
+if redis.call('EXISTS', feed_key) == 0 then
+    return 0
+end
+
+redis.call('ZADD', feed_key, score, post)
+-- Лента больше не пустая: убираем метку пустой ленты
+redis.call('ZREM', feed_key, '')
+local extra_posts_count = redis.call('ZCARD', feed_key) - capacity
+if extra_posts_count > 0 then
+    redis.call('ZREMRANGEBYRANK', feed_key, 0, extra_posts_count - 1)
+end
+
+return 1
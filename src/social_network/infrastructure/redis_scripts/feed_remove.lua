@@ -0,0 +1,12 @@
+-- Удаляет пост из пачки лент за один вызов.
+-- KEYS – ленты друзей автора (feed:user_id) и outbox автора
+-- ARGV[1] – идентификатор поста
+-- Возвращает количество лент, из которых пост был удален
+local post_id = ARGV[1]
+local removed = 0
+
+for _, feed_key in ipairs(KEYS) do
+    removed = removed + redis.call('ZREM', feed_key, post_id)
+end
+
+return removed
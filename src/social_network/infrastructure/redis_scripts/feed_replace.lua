@@ -0,0 +1,30 @@
+-- Атомарно подменяет ленту пользователя лентой, собранной прогревом.
+-- KEYS[1] – временный ключ прогрева, KEYS[2] – лента пользователя (feed:user_id)
+-- ARGV[1] – score самого нового поста, прочитанного из БД (без постов – время
+-- начала чтения), ARGV[2] – емкость ленты
+-- Пока прогрев читал БД, рассылка могла добавить в живую ленту новые посты.
+-- Их нет во временном ключе, поэтому перед RENAME они переносятся в него,
+-- иначе пропадут из ленты до следующего прогрева.
+-- Лента без постов хранит только метку пустой ленты (пустую строку)
+-- Возвращает количество перенесенных постов
+local warm_up_key = KEYS[1]
+local feed_key = KEYS[2]
+local newest_score = ARGV[1]
+local capacity = tonumber(ARGV[2])
+
+local posts = redis.call('ZRANGEBYSCORE', feed_key, newest_score, '+inf', 'WITHSCORES')
+for i = 1, #posts, 2 do
+    redis.call('ZADD', warm_up_key, posts[i + 1], posts[i])
+end
+
+if redis.call('ZCARD', warm_up_key) > 1 then
+    redis.call('ZREM', warm_up_key, '')
+end
+
+local extra_posts_count = redis.call('ZCARD', warm_up_key) - capacity
+if extra_posts_count > 0 then
+    redis.call('ZREMRANGEBYRANK', warm_up_key, 0, extra_posts_count - 1)
+end
+
+redis.call('RENAME', warm_up_key, feed_key)
+return #posts / 2
@@ -0,0 +1,19 @@
+-- Кэширует тела постов, не трогая удаленные.
+-- KEYS – тела постов (post:id)
+-- ARGV[1] – срок жизни тела в секундах, ARGV[2..] – тела постов в порядке KEYS
+-- События одного поста обрабатываются воркерами параллельно и с повторами,
+-- поэтому создание или изменение поста может прийти после удаления.
+-- Tombstone (пустая строка) не перезаписывается, иначе удаленный пост
+-- вернется в ленты до истечения срока жизни тела
+-- Возвращает количество закэшированных постов
+local ttl = tonumber(ARGV[1])
+local cached = 0
+
+for i, post_key in ipairs(KEYS) do
+    if redis.call('GET', post_key) ~= '' then
+        redis.call('SET', post_key, ARGV[i + 1], 'EX', ttl)
+        cached = cached + 1
+    end
+end
+
+return cached
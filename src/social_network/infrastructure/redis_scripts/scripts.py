@@ -0,0 +1,20 @@
+import functools
+import pathlib
+
+SCRIPTS_DIR = pathlib.Path(__file__).parent
+
+CELEBRITIES_ADD = "celebrities_add"
+FEED_PUSH = "feed_push"
+FEED_REMOVE = "feed_remove"
+FEED_REPLACE = "feed_replace"
+POSTS_CACHE = "posts_cache"
+
+
+@functools.cache
+def load_script(name: str) -> str:
+    """
+    Lua-скрипты выполняются через EVALSHA: redis-py сам загружает скрипт
+    на сервер при первом вызове, поэтому, в отличие от redis_udf,
+    их не нужно регистрировать заранее
+    """
+    return (SCRIPTS_DIR / f"{name}.lua").read_text()
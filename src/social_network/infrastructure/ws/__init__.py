@@ -1,5 +1,11 @@
-from social_network.infrastructure.ws.ws import WSConnectionManager
+from social_network.infrastructure.ws.ws import (
+    SharedWSConnectionManager,
+    WSConnection,
+    WSConnectionManager,
+)
 
 __all__ = [
+    "SharedWSConnectionManager",
+    "WSConnection",
     "WSConnectionManager",
 ]
@@ -1,26 +1,64 @@
 import asyncio
 import dataclasses
 import functools
+import json
+import logging
 import typing
+import uuid
 
 import aio_pika.abc
+import aio_pika.exceptions
 from fastapi import WebSocket
 
 from social_network.domain import models
-from social_network.domain.services import abstract
+from social_network.domain.services import abstract, feed
+from social_network.infrastructure import metrics
 
+logger = logging.getLogger(__name__)
 
-@dataclasses.dataclass
+
+WS_DROPPED_MESSAGES = metrics.Counter(
+    "social_network_ws_dropped_messages_total",
+    "Сообщения, не доставленные в сокет: overflow – вытеснены из переполненного буфера, "
+    "timeout – сокет не принял пачку за send_timeout",
+    labelnames=("reason",),
+)
+
+
+@dataclasses.dataclass(eq=False)
 class WSConnection:
     """
     Коннект сокета характеризуется самим сокетом и пользователем.
     Важно, чтобы по соединению информацию о событиях системы
     не мог получать неавторизованный пользователь.
+
+    Сообщения из RMQ не пишутся в сокет напрямую, а попадают в ограниченный
+    буфер соединения: сообщение подтверждается сразу после постановки в буфер,
+    поэтому медленный клиент не задерживает консьюмера и не вызывает повторные доставки.
+    Буфер разбирает отдельная задача:
+    - до batch_size сообщений отправляются одним фреймом (списком)
+    - при переполнении вытесняется самое старое сообщение
+    - пачка, не отправленная за send_timeout, отбрасывается
+    - после ошибки отправки соединение закрыто: сообщения больше не буферизуются
     """
 
     socket: WebSocket
     queue: typing.Optional[aio_pika.abc.AbstractQueue] = None
-    user: typing.Optional[models.UserDomain] = None
+    user: typing.Optional[models.PrincipalDomain] = None
+    buffer_size: int = 100
+    batch_size: int = 1
+    send_timeout: float = 5.0
+    _buffer: asyncio.Queue[typing.Any] = dataclasses.field(init=False, repr=False)
+    _sender: typing.Optional[asyncio.Task[None]] = dataclasses.field(
+        default=None, init=False, repr=False
+    )
+    _consumer_tag: typing.Optional[str] = dataclasses.field(
+        default=None, init=False, repr=False
+    )
+    _is_closed: bool = dataclasses.field(default=False, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._buffer = asyncio.Queue(maxsize=self.buffer_size)
 
     @property
     def is_authorized(self):
@@ -30,17 +68,87 @@ class WSConnection:
         """
         return self.user is not None
 
+    @property
+    def is_closed(self) -> bool:
+        return self._is_closed
+
     def __eq__(self, other):
         return self.socket == other.socket
 
     def __hash__(self):
         return hash(self.socket)
 
-    async def send_to_ws(self, message: dict[str, typing.Any]) -> bool:
-        if self.is_authorized:
-            await self.socket.send_json(message)
-            return True
-        return False
+    def start(self) -> None:
+        if self._sender is None:
+            self._sender = asyncio.create_task(self._send_forever())
+
+    async def close(self) -> None:
+        """
+        Останавливает отправку и освобождает ресурсы брокера:
+        отменяет консьюмера и удаляет очередь соединения
+        """
+        self._is_closed = True
+        if self._sender is not None:
+            self._sender.cancel()
+            self._sender = None
+        if self.queue is None:
+            return
+        try:
+            if self._consumer_tag is not None:
+                await self.queue.cancel(self._consumer_tag)
+            await self.queue.delete(if_unused=False, if_empty=False)
+        except aio_pika.exceptions.AMQPError as exc:
+            logger.warning(f"Failed to delete queue {self.queue.name}: {exc}")
+        finally:
+            self._consumer_tag = None
+            self.queue = None
+
+    async def send_to_ws(self, message: typing.Any) -> bool:
+        if not self.is_authorized or self._is_closed:
+            return False
+        if self._buffer.full():
+            self._buffer.get_nowait()
+            WS_DROPPED_MESSAGES.inc(reason="overflow")
+        self._buffer.put_nowait(message)
+        return True
+
+    async def _send_forever(self) -> None:
+        while True:
+            batch = [await self._buffer.get()]
+            while len(batch) < self.batch_size and not self._buffer.empty():
+                batch.append(self._buffer.get_nowait())
+
+            try:
+                await asyncio.wait_for(
+                    self.socket.send_json(batch[0] if self.batch_size == 1 else batch),
+                    timeout=self.send_timeout,
+                )
+            except asyncio.TimeoutError:
+                WS_DROPPED_MESSAGES.inc(len(batch), reason="timeout")
+                logger.warning(f"Dropped {len(batch)} messages to a slow socket")
+            except Exception as exc:
+                logger.info(f"Socket is closed: {exc}")
+                await self._mark_closed()
+                return
+
+    async def _mark_closed(self) -> None:
+        """
+        Сокет больше не принимает сообщения, но соединение еще зарегистрировано
+        до disconnect. Буфер очищается, новые сообщения не буферизуются
+        и не считаются вытесненными, а консьюмер очереди соединения отменяется,
+        чтобы брокер не доставлял и не возвращал в очередь сообщения мертвому сокету
+        """
+        self._is_closed = True
+        while not self._buffer.empty():
+            self._buffer.get_nowait()
+        if self.queue is None or self._consumer_tag is None:
+            return
+        try:
+            await self.queue.cancel(self._consumer_tag)
+        except aio_pika.exceptions.AMQPError as exc:
+            logger.warning(f"Failed to cancel consumer {self._consumer_tag}: {exc}")
+        finally:
+            self._consumer_tag = None
 
     async def subscribe(
         self,
@@ -54,38 +162,186 @@ class WSConnection:
     ) -> None:
         callback = functools.partial(message_processor, callback=self.send_to_ws)  # type: ignore
         if self.queue:
-            await self.queue.consume(callback)
-            await asyncio.Future()
+            self._consumer_tag = await self.queue.consume(callback)
 
 
 class WSConnectionManager:
     """
-    Менеджер соединений следит за соединениями вэб-сокетов.
+    Менеджер соединений следит за соединениями вэб-сокетов процесса.
+    Создается один раз на время жизни приложения.
     Соединение можно:
     - создать
-    - разорвать
+    - разорвать: консьюмер отменяется, очередь соединения удаляется
+    Соединение, от клиента которого idle_timeout секунд не было сообщений, закрывается
     """
 
-    def __init__(self, async_service: abstract.AbstractAsyncService) -> None:
+    def __init__(
+        self,
+        async_service: abstract.AbstractAsyncService,
+        buffer_size: int = 100,
+        batch_size: int = 1,
+        send_timeout: float = 5.0,
+        idle_timeout: typing.Optional[float] = None,
+    ) -> None:
         self._async_service = async_service
-        self._connections: set[WSConnection] = set()
+        self.idle_timeout = idle_timeout
+        self._buffer_size = buffer_size
+        self._batch_size = batch_size
+        self._send_timeout = send_timeout
+        self._connections: dict[WebSocket, WSConnection] = {}
 
-    async def connect(self, websocket: WebSocket, user: models.UserDomain) -> None:
+    def _open(
+        self,
+        websocket: WebSocket,
+        user: models.PrincipalDomain,
+        queue: typing.Optional[aio_pika.abc.AbstractQueue] = None,
+    ) -> WSConnection:
+        ws_connection = WSConnection(
+            socket=websocket,
+            user=user,
+            queue=queue,
+            buffer_size=self._buffer_size,
+            batch_size=self._batch_size,
+            send_timeout=self._send_timeout,
+        )
+        ws_connection.start()
+        return ws_connection
+
+    async def connect(self, websocket: WebSocket, user: models.PrincipalDomain) -> None:
         """
-        Создаем соединение и добавляем его в
-        список открытых соединений
+        Создаем соединение, подписываемся на очередь его сокета
+        и добавляем его в список открытых соединений
         """
         await websocket.accept()
         queue = await self._async_service.bind(user.id)
-        ws_connection = WSConnection(socket=websocket, user=user, queue=queue)
-        self._connections.add(ws_connection)
-        await ws_connection.subscribe(
-            message_processor=self._async_service.process_message
-        )
+        ws_connection = self._open(websocket, user, queue)
+        try:
+            await ws_connection.subscribe(
+                message_processor=self._async_service.process_message
+            )
+        except BaseException:
+            # Соединение регистрируется только после подписки:
+            # иначе disconnect для него не вызывается и задача отправки утекает
+            await ws_connection.close()
+            raise
+        self._connections[websocket] = ws_connection
 
-    def disconnect(self, websocket: WebSocket) -> None:
+    async def disconnect(
+        self, websocket: WebSocket, user: models.PrincipalDomain
+    ) -> None:
         """
         Удаляем соединение из списка открытых соединений
         """
-        ws_connection = WSConnection(socket=websocket)
-        self._connections.remove(ws_connection)
+        ws_connection = self._connections.pop(websocket, None)
+        if ws_connection:
+            await ws_connection.close()
+
+    async def close(self) -> None:
+        """
+        Закрывает все соединения процесса при остановке приложения
+        """
+        connections, self._connections = list(self._connections.values()), {}
+        await asyncio.gather(*(connection.close() for connection in connections))
+
+
+class SharedWSConnectionManager(WSConnectionManager):
+    """
+    Менеджер соединений процесса (ws.delivery_mode=shared).
+    Вместо очереди на каждый сокет процесс слушает одну очередь,
+    привязанную к ключам feed:{user_id} только тех пользователей,
+    чьи сокеты открыты в этом процессе. Сообщение раздается локальным сокетам
+    по индексу user_id -> соединения, поэтому число очередей брокера
+    растет с числом процессов, а не сокетов
+    """
+
+    def __init__(
+        self,
+        async_service: feed.AsyncFeedService,
+        buffer_size: int = 100,
+        batch_size: int = 1,
+        send_timeout: float = 5.0,
+        idle_timeout: typing.Optional[float] = None,
+    ) -> None:
+        super().__init__(
+            async_service=async_service,
+            buffer_size=buffer_size,
+            batch_size=batch_size,
+            send_timeout=send_timeout,
+            idle_timeout=idle_timeout,
+        )
+        self._feed_service = async_service
+        self._queue: typing.Optional[aio_pika.abc.AbstractQueue] = None
+        self._consumer_tag: typing.Optional[str] = None
+        self._users: dict[uuid.UUID, dict[WebSocket, WSConnection]] = {}
+        self._lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        self._queue = await self._feed_service.bind_shared()
+        if self._queue:
+            self._consumer_tag = await self._queue.consume(self._dispatch)
+
+    async def connect(self, websocket: WebSocket, user: models.PrincipalDomain) -> None:
+        """
+        Первый сокет пользователя в процессе привязывает его ленту к очереди процесса
+        """
+        await websocket.accept()
+        async with self._lock:
+            connections = self._users.get(user.id)
+            if connections is None:
+                if self._queue:
+                    await self._feed_service.subscribe(self._queue, user.id)
+                connections = self._users[user.id] = {}
+            connections[websocket] = self._open(websocket, user)
+
+    async def disconnect(
+        self, websocket: WebSocket, user: models.PrincipalDomain
+    ) -> None:
+        """
+        Последний закрытый сокет пользователя отвязывает его ленту от очереди процесса
+        """
+        async with self._lock:
+            connections = self._users.get(user.id, {})
+            ws_connection = connections.pop(websocket, None)
+            if ws_connection:
+                await ws_connection.close()
+            if connections:
+                return
+            self._users.pop(user.id, None)
+            if self._queue:
+                await self._feed_service.unsubscribe(self._queue, user.id)
+
+    async def close(self) -> None:
+        """
+        Очередь процесса auto_delete: брокер удалит ее после отмены консьюмера
+        """
+        if self._queue and self._consumer_tag:
+            try:
+                await self._queue.cancel(self._consumer_tag)
+            except aio_pika.exceptions.AMQPError as exc:
+                logger.warning(f"Failed to cancel consumer {self._consumer_tag}: {exc}")
+            self._consumer_tag = None
+        async with self._lock:
+            users, self._users = self._users, {}
+        await asyncio.gather(
+            *(
+                connection.close()
+                for connections in users.values()
+                for connection in connections.values()
+            )
+        )
+
+    async def _dispatch(self, msg: aio_pika.abc.AbstractIncomingMessage) -> None:
+        """
+        Сообщение только раскладывается по буферам соединений,
+        поэтому подтверждается сразу и не возвращается в общую очередь
+        """
+        async with msg.process(ignore_processed=True):
+            try:
+                user_id = self._feed_service.user_id_of(msg.routing_key or "")
+            except ValueError:
+                logger.warning(f"Unexpected routing key {msg.routing_key}")
+                return
+
+            context = json.loads(msg.body.decode())
+            for ws_connection in list(self._users.get(user_id, {}).values()):
+                await ws_connection.send_to_ws(context)
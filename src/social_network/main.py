@@ -21,6 +21,8 @@ def main() -> None:
         app.build_application(),
         host=social_network_settings.server.bind_host,
         port=social_network_settings.server.bind_port,
+        ws_ping_interval=social_network_settings.ws.ping_interval,
+        ws_ping_timeout=social_network_settings.ws.ping_timeout,
     )
 
 
@@ -1,5 +1,6 @@
 import logging
 import typing
+import uuid
 
 import pydantic
 import pydantic_settings
@@ -11,6 +12,12 @@ class ServerSettings(pydantic.BaseModel):
     bind_host: str = "0.0.0.0"
     bind_port: int = 8080
     workers: int = pydantic.Field(default=1, gt=0)
+    # Период монитора задержки event loop (метрика social_network_event_loop_lag_seconds)
+    loop_lag_interval: float = pydantic.Field(default=0.5, gt=0)
+    # Дедлайн запроса (X-Request-Timeout): значение по умолчанию и допустимый диапазон
+    request_timeout_default: float = pydantic.Field(default=30.0, gt=0)
+    request_timeout_min: float = pydantic.Field(default=0.1, gt=0)
+    request_timeout_max: float = pydantic.Field(default=60.0, gt=0)
 
     @property
     def bind(self) -> str:
@@ -20,6 +27,10 @@ class ServerSettings(pydantic.BaseModel):
         logger.info(f"server.bind_host={self.bind_port}")
         logger.info(f"server.bind_port={self.bind_port}")
         logger.info(f"server.workers={self.workers}")
+        logger.info(f"server.loop_lag_interval={self.loop_lag_interval}")
+        logger.info(f"server.request_timeout_default={self.request_timeout_default}")
+        logger.info(f"server.request_timeout_min={self.request_timeout_min}")
+        logger.info(f"server.request_timeout_max={self.request_timeout_max}")
 
 
 class DbSettings(pydantic.BaseModel):
@@ -31,6 +42,54 @@ class DbSettings(pydantic.BaseModel):
     ro_port: typing.Optional[int] = None
     name: str = "socialnetwork"
     pool_size: int = pydantic.Field(default=1, gt=0)
+    feed_query_variant: typing.Literal["join", "lateral"] = "join"
+    # Пул проверяет соединение перед выдачей, вместо проверочного запроса в каждой транзакции
+    pool_pre_ping: bool = True
+    # statement_timeout соединения, 0 – без ограничения
+    statement_timeout_ms: int = pydantic.Field(default=0, ge=0)
+    # Повторы транзакций: экспоненциальная задержка с джиттером и бюджет повторов процесса
+    retry_max_attempts: int = pydantic.Field(default=5, ge=0)
+    retry_delay_seconds: float = pydantic.Field(default=0.05, gt=0)
+    retry_max_delay_seconds: float = pydantic.Field(default=2.0, gt=0)
+    retry_budget_capacity: float = pydantic.Field(default=20.0, ge=0)
+    retry_budget_refill_per_second: float = pydantic.Field(default=2.0, ge=0)
+    # Подготовленных запросов на соединение (кэш драйвера), 0 – не кэшировать.
+    # Запрос готовится при первом выполнении на соединении и дальше берется из кэша
+    statement_cache_size: int = pydantic.Field(default=100, ge=0)
+    # За pgbouncer в режиме transaction: кэш запросов выключен, имена запросов уникальны
+    pgbouncer_mode: bool = False
+
+    @property
+    def engine_options(self) -> dict[str, typing.Any]:
+        statement_cache_size = 0 if self.pgbouncer_mode else self.statement_cache_size
+        connect_args: dict[str, typing.Any] = {
+            # Кэш SQLAlchemy (подготовленные запросы session.execute) и кэш asyncpg
+            "prepared_statement_cache_size": statement_cache_size,
+            "statement_cache_size": statement_cache_size,
+        }
+        if self.pgbouncer_mode:
+            connect_args["prepared_statement_name_func"] = (
+                lambda: f"__asyncpg_{uuid.uuid4()}__"
+            )
+        if self.statement_timeout_ms:
+            connect_args["server_settings"] = {
+                "statement_timeout": str(self.statement_timeout_ms)
+            }
+        return {
+            "pool_size": self.pool_size,
+            "pool_pre_ping": self.pool_pre_ping,
+            "connect_args": connect_args,
+        }
+
+    @property
+    def retry_options(self) -> dict[str, typing.Any]:
+        return {
+            "max_attempts": self.retry_max_attempts,
+            "delay": self.retry_delay_seconds,
+            "max_delay": self.retry_max_delay_seconds,
+            "budget_capacity": self.retry_budget_capacity,
+            "budget_refill_per_second": self.retry_budget_refill_per_second,
+        }
 
     @property
     def connection_url(self) -> str:
@@ -51,6 +110,18 @@ class DbSettings(pydantic.BaseModel):
         logger.info(f"db.ro_port={self.ro_port}")
         logger.info(f"db.name={self.name}")
         logger.info(f"db.pool_size={self.pool_size}")
+        logger.info(f"db.feed_query_variant={self.feed_query_variant}")
+        logger.info(f"db.pool_pre_ping={self.pool_pre_ping}")
+        logger.info(f"db.statement_timeout_ms={self.statement_timeout_ms}")
+        logger.info(f"db.retry_max_attempts={self.retry_max_attempts}")
+        logger.info(f"db.retry_delay_seconds={self.retry_delay_seconds}")
+        logger.info(f"db.retry_max_delay_seconds={self.retry_max_delay_seconds}")
+        logger.info(f"db.retry_budget_capacity={self.retry_budget_capacity}")
+        logger.info(
+            f"db.retry_budget_refill_per_second={self.retry_budget_refill_per_second}"
+        )
+        logger.info(f"db.statement_cache_size={self.statement_cache_size}")
+        logger.info(f"db.pgbouncer_mode={self.pgbouncer_mode}")
 
 
 class RedisSettings(pydantic.BaseModel):
@@ -60,7 +131,10 @@ class RedisSettings(pydantic.BaseModel):
     db: int = 0
     feed_capacity: int = 1000
     ttl: int = 600
+    max_staleness: int = 300
     lock_timeout: float = 5.0
+    fanout_batch_size: int = pydantic.Field(default=500, gt=0)
+    post_ttl: int = 24 * 60 * 60
 
     @property
     def connection_url(self) -> str:
@@ -73,7 +147,10 @@ class RedisSettings(pydantic.BaseModel):
         logger.info(f"redis.db={self.db}")
         logger.info(f"redis.feed_capacity={self.feed_capacity}")
         logger.info(f"redis.ttl={self.ttl}")
+        logger.info(f"redis.max_staleness={self.max_staleness}")
         logger.info(f"redis.lock_timeout={self.lock_timeout}")
+        logger.info(f"redis.fanout_batch_size={self.fanout_batch_size}")
+        logger.info(f"redis.post_ttl={self.post_ttl}")
 
 
 class RmqSettings(pydantic.BaseModel):
@@ -86,6 +163,8 @@ class RmqSettings(pydantic.BaseModel):
     reconnect_interval: int = 5
     fail_fast: int = 1
     prefetch_count: int = 1
+    # Каналы для публикации сообщений из API, exchange на них объявляется один раз
+    channel_pool_size: int = pydantic.Field(default=4, gt=0)
 
     @property
     def connection_url(self) -> str:
@@ -105,17 +184,90 @@ class RmqSettings(pydantic.BaseModel):
         logger.info(f"rmq.reconnect_interval={self.reconnect_interval}")
         logger.info(f"rmq.fail_fast={self.fail_fast}")
         logger.info(f"rmq.prefetch_count={self.prefetch_count}")
+        logger.info(f"rmq.channel_pool_size={self.channel_pool_size}")
+
+
+class FanoutSettings(pydantic.BaseModel):
+    queue: str = "posts_fanout"
+    dead_letter_queue: str = "posts_fanout.dead"
+    prefetch_count: int = pydantic.Field(default=32, gt=0)
+    concurrency: int = pydantic.Field(default=8, gt=0)
+    max_retries: int = pydantic.Field(default=5, ge=0)
+    # Повтор N ждет в очереди задержки retry_delay_seconds * N секунд
+    retry_delay_seconds: float = pydantic.Field(default=1.0, gt=0)
+    idempotency_ttl: int = 24 * 60 * 60
+    # Сколько событие считается захваченным воркером, который мог упасть, не подтвердив его
+    processing_timeout: int = pydantic.Field(default=60, gt=0)
+
+    def print_to_log(self) -> None:
+        logger.info(f"fanout.queue={self.queue}")
+        logger.info(f"fanout.dead_letter_queue={self.dead_letter_queue}")
+        logger.info(f"fanout.prefetch_count={self.prefetch_count}")
+        logger.info(f"fanout.concurrency={self.concurrency}")
+        logger.info(f"fanout.max_retries={self.max_retries}")
+        logger.info(f"fanout.retry_delay_seconds={self.retry_delay_seconds}")
+        logger.info(f"fanout.idempotency_ttl={self.idempotency_ttl}")
+        logger.info(f"fanout.processing_timeout={self.processing_timeout}")
+
+
+class WsSettings(pydantic.BaseModel):
+    """
+    delivery_mode:
+    - queue: у каждого сокета своя очередь feed:{user_id}:{uuid}, привязанная к ленте
+    - shared: у процесса одна очередь, сообщения раздаются локальным сокетам
+    """
+
+    delivery_mode: typing.Literal["queue", "shared"] = "queue"
+    # Очередь shared одна на процесс, поэтому ей нужно больше неподтвержденных сообщений
+    prefetch_count: int = pydantic.Field(default=256, gt=0)
+    # Буфер исходящих сообщений соединения
+    buffer_size: int = pydantic.Field(default=100, gt=0)
+    # Больше 1 – сообщения отправляются списком в одном фрейме
+    batch_size: int = pydantic.Field(default=1, gt=0)
+    send_timeout: float = pydantic.Field(default=5.0, gt=0)
+    # Ping/pong на уровне протокола (uvicorn): закрывает соединения с пропавшими клиентами
+    ping_interval: float = pydantic.Field(default=20.0, gt=0)
+    ping_timeout: float = pydantic.Field(default=20.0, gt=0)
+    # Закрывает соединение, если клиент столько секунд ничего не присылал. None – не закрывать
+    idle_timeout: typing.Optional[float] = pydantic.Field(default=None, gt=0)
+
+    def print_to_log(self) -> None:
+        logger.info(f"ws.delivery_mode={self.delivery_mode}")
+        logger.info(f"ws.prefetch_count={self.prefetch_count}")
+        logger.info(f"ws.buffer_size={self.buffer_size}")
+        logger.info(f"ws.batch_size={self.batch_size}")
+        logger.info(f"ws.send_timeout={self.send_timeout}")
+        logger.info(f"ws.ping_interval={self.ping_interval}")
+        logger.info(f"ws.ping_timeout={self.ping_timeout}")
+        logger.info(f"ws.idle_timeout={self.idle_timeout}")
 
 
 class AuthSettings(pydantic.BaseModel):
     secret: str = ""
     algorithm: str = "HS256"
     token_ttl_seconds: int = 7 * 24 * 60 * 60
+    # Кэш авторизованных пользователей: 0 в principal_cache_ttl отключает кэш
+    principal_cache_size: int = pydantic.Field(default=10000, gt=0)
+    principal_cache_ttl: float = pydantic.Field(default=30.0, ge=0)
+    principal_cache_redis_is_enabled: bool = False
+    # Алгоритм хэширования новых паролей, старые пересчитываются при входе
+    password_hasher: typing.Literal["scrypt", "pbkdf2_sha256"] = "scrypt"
+    # Пул для JWT, Fernet и хэширования паролей: inline выполняет их в event loop
+    crypto_executor: typing.Literal["inline", "thread", "process"] = "thread"
+    crypto_workers: int = pydantic.Field(default=4, gt=0)
 
     def print_to_log(self) -> None:
         logger.debug(f"auth.secret={self.secret}")
         logger.info(f"auth.algorithm={self.algorithm}")
         logger.info(f"auth.token_ttl_seconds={self.token_ttl_seconds}")
+        logger.info(f"auth.principal_cache_size={self.principal_cache_size}")
+        logger.info(f"auth.principal_cache_ttl={self.principal_cache_ttl}")
+        logger.info(
+            f"auth.principal_cache_redis_is_enabled={self.principal_cache_redis_is_enabled}"
+        )
+        logger.info(f"auth.password_hasher={self.password_hasher}")
+        logger.info(f"auth.crypto_executor={self.crypto_executor}")
+        logger.info(f"auth.crypto_workers={self.crypto_workers}")
 
 
 class SentrySettings(pydantic.BaseModel):
@@ -143,11 +295,15 @@ class SocialNetworkSettings(pydantic_settings.BaseSettings):
     db: DbSettings = pydantic.Field(default_factory=DbSettings)
     redis: RedisSettings = pydantic.Field(default_factory=RedisSettings)
     rmq: RmqSettings = pydantic.Field(default_factory=RmqSettings)
+    fanout: FanoutSettings = pydantic.Field(default_factory=FanoutSettings)
+    ws: WsSettings = pydantic.Field(default_factory=WsSettings)
     auth: AuthSettings = pydantic.Field(default_factory=AuthSettings)
     sentry: SentrySettings = pydantic.Field(default_factory=SentrySettings)
 
     celebrity_friends_threshold: int = 500
     redis_udf_is_enabled: bool = False
+    fanout_worker_is_enabled: bool = False
+    timeline_is_enabled: bool = False
 
     level: str = "INFO"
 
@@ -182,10 +338,16 @@ class SocialNetworkSettings(pydantic_settings.BaseSettings):
         self.db.print_to_log()
         self.redis.print_to_log()
         self.rmq.print_to_log()
+        self.fanout.print_to_log()
+        self.ws.print_to_log()
         self.auth.print_to_log()
         self.sentry.print_to_log()
         logger.info(
             f"settings.celebrity_friends_threshold={self.celebrity_friends_threshold}"
         )
         logger.info(f"settings.redis_udf_is_enabled={self.redis_udf_is_enabled}")
+        logger.info(
+            f"settings.fanout_worker_is_enabled={self.fanout_worker_is_enabled}"
+        )
+        logger.info(f"settings.timeline_is_enabled={self.timeline_is_enabled}")
         logger.info(f"settings.level={self.level}")
@@ -0,0 +1,23 @@
+import asyncio
+from logging import config as logging_config
+
+import sentry_sdk
+
+from social_network import fanout, settings
+
+
+def main() -> None:
+    social_network_settings = settings.SocialNetworkSettings()
+    logging_config.dictConfig(social_network_settings.logging)
+    social_network_settings.print_to_log()
+
+    sentry_sdk.init(
+        environment=social_network_settings.sentry.environment,
+        dsn=social_network_settings.sentry.dsn,
+    )
+
+    asyncio.run(fanout.FanoutWorker(social_network_settings).run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Влияние пула криптографии на event loop.
+
+Каждая операция – то, что делает вход пользователя со старым паролем:
+расшифровка пароля Fernet, выпуск JWT и его проверка. Операции идут
+конкурентно через Executor с kind inline (в event loop), thread или process.
+Параллельно работает монитор задержки event loop – тот же, что в приложении
+(метрики social_network_event_loop_lag_seconds*).
+
+Запуск:
+    python -m tests.load.test_auth_crypto.benchmark --operations 5000 --workers 4
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import typing
+
+from cryptography import fernet
+
+from social_network.domain.services import auth
+from social_network.infrastructure import executor
+
+ALGORITHM = "HS256"
+
+
+async def measure_lag(tick: float, lags: list[float]) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(tick)
+        lags.append(max(loop.time() - started - tick, 0.0))
+
+
+async def run(
+    kind: executor.ExecutorKind, args: argparse.Namespace, secret: str, token: str
+) -> None:
+    crypto_executor = executor.Executor(kind=kind, max_workers=args.workers)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def operation() -> None:
+        async with semaphore:
+            await crypto_executor.run(auth.decrypt_password, token, secret)
+            access_token = await crypto_executor.run(
+                auth.create_access_token, "user", 60, secret, ALGORITHM
+            )
+            await crypto_executor.run(
+                auth.decode_access_token, access_token, secret, ALGORITHM
+            )
+
+    lags: list[float] = []
+    monitor = asyncio.create_task(measure_lag(args.tick, lags))
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(operation() for _ in range(args.operations)))
+    finally:
+        elapsed = time.perf_counter() - started
+        # Даем монитору записать последнее измерение: в режиме inline
+        # event loop не отпускается до конца прогона
+        await asyncio.sleep(args.tick * 2)
+        monitor.cancel()
+        crypto_executor.shutdown()
+
+    lags = lags or [0.0]
+    print(
+        f"{kind}: {args.operations / elapsed:.0f} ops/s, "
+        f"loop lag median={statistics.median(lags) * 1000:.2f}ms "
+        f"p99={sorted(lags)[int(len(lags) * 0.99)] * 1000:.2f}ms "
+        f"max={max(lags) * 1000:.2f}ms"
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    secret = fernet.Fernet.generate_key().decode()
+    token = auth.encrypt_password(password="passw0rd", secret=secret)
+    for kind in typing.get_args(executor.ExecutorKind):
+        await run(kind, args, secret, token)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--operations", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--tick", type=float, default=0.005)
+    asyncio.run(main(parser.parse_args()))
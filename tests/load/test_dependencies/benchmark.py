@@ -0,0 +1,64 @@
+"""
+Микробенчмарк разрешения зависимостей запроса.
+
+До: каждый запрос собирает свои репозитории, unit of work и сервисы.
+После: запрос берет готовые сервисы из контейнера, собранного в lifespan.
+Для примера берется набор зависимостей GET /post/feed: auth, feed и post сервисы.
+Соединения с БД, Redis и RMQ не открываются: измеряется только сборка объектов.
+
+Запуск:
+    python -m tests.load.test_dependencies.benchmark --number 100000
+"""
+
+import argparse
+import timeit
+
+from redis import asyncio as aioredis
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from social_network import settings
+from social_network.api import dependencies
+from social_network.domain import services
+from social_network.infrastructure import executor
+
+
+def build_container() -> dependencies.Container:
+    social_network_settings = settings.SocialNetworkSettings()
+    engine = create_async_engine(url=social_network_settings.db.connection_url)
+    return dependencies.Container(
+        social_network_settings=social_network_settings,
+        master_factory=async_sessionmaker(engine, expire_on_commit=False),
+        slave_factory=None,
+        redis=aioredis.from_url(social_network_settings.redis.connection_url),
+        async_feed_services=services.AsyncFeedServicePool(
+            [services.AsyncFeedService(exchange=None, channel=None)]
+        ),
+        feed_warm_ups=services.SingleFlight(),
+        crypto_executor=executor.Executor(kind="inline"),
+    )
+
+
+def main(args: argparse.Namespace) -> None:
+    container = build_container()
+    async_feed_service = services.AsyncFeedService(exchange=None, channel=None)
+
+    def per_request() -> None:
+        container.build_auth_service()
+        container.build_feed_service(async_feed_service)
+        container.build_post_service()
+
+    def singleton() -> None:
+        _ = container.auth_service
+        _ = container.feed_service
+        _ = container.post_service
+
+    for name, func in (("per-request", per_request), ("singleton", singleton)):
+        seconds = min(timeit.repeat(func, number=args.number, repeat=args.repeat))
+        print(f"{name}: {seconds / args.number * 1e6:.2f}us per request")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,146 @@
+"""
+Сравнение планов запроса ленты (join / lateral) на синтетических данных.
+
+Запуск:
+    python -m tests.load.test_feed_query.benchmark --seed --users 100000 --friends 1000
+
+Настройки подключения берутся из DB__* (см. LoadTestsSettings).
+С флагом --seed таблицы users, friends и posts наполняются через generate_series,
+поэтому запускать его нужно только на отдельной БД
+"""
+
+import argparse
+import asyncio
+import json
+import logging.config
+import statistics
+import typing
+
+import sqlalchemy
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+from social_network.infrastructure.database.repository import post
+from tests.load import settings
+
+logger = logging.getLogger(__name__)
+
+SEED_STATEMENTS = (
+    "INSERT INTO users "
+    "(id, first_name, second_name, birthdate, biography, city, password, created_at, updated_at) "
+    "SELECT md5('user' || i)::uuid, 'first_name', 'second_name', now(), '', 'city', '', now(), now() "
+    "FROM generate_series(0, :users - 1) i "
+    "ON CONFLICT DO NOTHING",
+    # Друзья читателя r – пользователи (r + k * step) % users, k = 1..friends
+    "INSERT INTO friends (id, user_id, friend_id, created_at, updated_at) "
+    "SELECT gen_random_uuid(), md5('user' || ((r + k * :step) % :users))::uuid, "
+    "md5('user' || r)::uuid, now(), now() "
+    "FROM generate_series(0, :users - 1) r, generate_series(1, :friends) k",
+    "INSERT INTO posts (id, author_id, text, created_at, updated_at) "
+    "SELECT gen_random_uuid(), md5('user' || a)::uuid, 'text', "
+    "now() - random() * interval '365 days', now() "
+    "FROM generate_series(0, :users - 1) a, generate_series(1, :posts) n",
+    "ANALYZE users",
+    "ANALYZE friends",
+    "ANALYZE posts",
+)
+
+
+async def seed(
+    connection: AsyncConnection, users: int, friends: int, posts: int
+) -> None:
+    params = {
+        "users": users,
+        "friends": friends,
+        "posts": posts,
+        "step": max(users // (friends + 1), 1),
+    }
+    for statement in SEED_STATEMENTS:
+        logger.info(f"Seed: {statement[:60]}...")
+        await connection.execute(sqlalchemy.text(statement), params)
+    await connection.commit()
+
+
+async def explain(
+    connection: AsyncConnection, variant: str, user_id: str, offset: int, limit: int
+) -> dict[str, typing.Any]:
+    query = post.FEED_QUERIES[variant].format(after_cursor="")
+    result = await connection.execute(
+        sqlalchemy.text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}"),
+        {
+            "current_user_id": user_id,
+            "offset": offset,
+            "limit": limit,
+            "depth": offset + limit,
+        },
+    )
+    plan = result.scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return typing.cast(dict[str, typing.Any], plan[0])
+
+
+def buffers(plan: dict[str, typing.Any]) -> int:
+    node = plan["Plan"]
+    return int(node.get("Shared Hit Blocks", 0)) + int(
+        node.get("Shared Read Blocks", 0)
+    )
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+async def main(args: argparse.Namespace) -> None:
+    load_tests_settings = settings.LoadTestsSettings()
+    logging.config.dictConfig(load_tests_settings.logging)
+    engine = create_async_engine(url=load_tests_settings.db.connection_url)
+    try:
+        async with engine.connect() as connection:
+            if args.seed:
+                await seed(connection, args.users, args.friends, args.posts)
+
+            result = await connection.execute(
+                sqlalchemy.text(
+                    "SELECT DISTINCT friend_id::text FROM friends "
+                    "WHERE deleted_at IS NULL ORDER BY 1 LIMIT :samples"
+                ),
+                {"samples": args.samples},
+            )
+            user_ids = list(result.scalars())
+            if not user_ids:
+                logger.error("No friends found. Run with --seed first.")
+                return
+
+            for variant in post.FEED_QUERIES:
+                timings: list[float] = []
+                blocks: list[float] = []
+                for user_id in user_ids:
+                    plan = await explain(
+                        connection, variant, user_id, args.offset, args.limit
+                    )
+                    timings.append(plan["Execution Time"])
+                    blocks.append(buffers(plan))
+                if args.verbose:
+                    print(json.dumps(plan, indent=2))
+                print(
+                    f"{variant}: samples={len(timings)} "
+                    f"median={statistics.median(timings):.2f}ms "
+                    f"p95={percentile(timings, 0.95):.2f}ms "
+                    f"buffers(median)={statistics.median(blocks):.0f}"
+                )
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seed", action="store_true")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--friends", type=int, default=1000)
+    parser.add_argument("--posts", type=int, default=10)
+    parser.add_argument("--samples", type=int, default=100)
+    parser.add_argument("--offset", type=int, default=0)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--verbose", action="store_true")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,118 @@
+"""
+Задержка запросов без подготовки и с подготовленными запросами.
+
+unprepared: кэш подготовленных запросов выключен (statement_cache_size=0),
+каждый запрос заново проходит Parse и планирование – так работали запросы
+с подставленными в текст значениями.
+prepared: кэш включен, запрос готовится при первом выполнении на соединении
+и дальше берется из кэша.
+
+Измеряются UserRepository.find_one и PostRepository.feed, каждый вызов
+в отдельной транзакции на одном соединении.
+
+Запуск:
+    python -m tests.load.test_prepared_statements.benchmark --iterations 1000
+
+Настройки подключения берутся из DB__* (см. LoadTestsSettings). Нужна БД
+с пользователями и друзьями, например после tests.load.test_feed_query.benchmark --seed
+"""
+
+import argparse
+import asyncio
+import logging.config
+import statistics
+import time
+import typing
+import uuid
+
+import sqlalchemy
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+
+from social_network.infrastructure.database import repository
+from tests.load import settings
+
+logger = logging.getLogger(__name__)
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+async def measure(
+    engine: AsyncEngine,
+    user_ids: list[str],
+    iterations: int,
+    call: typing.Callable[[AsyncSession, str], typing.Awaitable[typing.Any]],
+) -> list[float]:
+    timings = []
+    async with engine.connect() as connection:
+        for i in range(iterations):
+            async with AsyncSession(bind=connection) as session:
+                started = time.perf_counter()
+                await call(session, user_ids[i % len(user_ids)])
+                timings.append((time.perf_counter() - started) * 1000)
+                await session.rollback()
+    return timings
+
+
+async def main(args: argparse.Namespace) -> None:
+    load_tests_settings = settings.LoadTestsSettings()
+    logging.config.dictConfig(load_tests_settings.logging)
+    db = load_tests_settings.db
+
+    user_repository = repository.UserRepository()
+    post_repository = repository.PostRepository(
+        feed_query_variant=db.feed_query_variant
+    )
+
+    async def find_one(session: AsyncSession, user_id: str) -> typing.Any:
+        user_repository(session)
+        return await user_repository.find_one(user_id)
+
+    async def feed(session: AsyncSession, user_id: str) -> typing.Any:
+        post_repository(session)
+        return await post_repository.feed(
+            user_id=uuid.UUID(user_id), offset=0, limit=args.limit
+        )
+
+    modes = {
+        "unprepared": db.model_copy(update={"statement_cache_size": 0}),
+        "prepared": db.model_copy(
+            update={"statement_cache_size": max(db.statement_cache_size, 100)}
+        ),
+    }
+    for mode, db_settings in modes.items():
+        engine = create_async_engine(
+            url=db_settings.connection_url, **db_settings.engine_options
+        )
+        try:
+            async with engine.connect() as connection:
+                result = await connection.execute(
+                    sqlalchemy.text(
+                        "SELECT DISTINCT friend_id::text FROM friends "
+                        "WHERE deleted_at IS NULL ORDER BY 1 LIMIT :samples"
+                    ),
+                    {"samples": args.samples},
+                )
+                user_ids = list(result.scalars())
+            if not user_ids:
+                logger.error("No friends found. Seed the database first.")
+                return
+
+            for name, call in (("find_one", find_one), ("feed", feed)):
+                timings = await measure(engine, user_ids, args.iterations, call)
+                print(
+                    f"{mode} {name}: median={statistics.median(timings):.3f}ms "
+                    f"p95={percentile(timings, 0.95):.3f}ms"
+                )
+        finally:
+            await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--samples", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=10)
+    asyncio.run(main(parser.parse_args()))
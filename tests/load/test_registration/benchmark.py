@@ -0,0 +1,110 @@
+"""
+Пропускная способность регистрации без БД: проверка дубликата и подготовка пароля.
+
+legacy: каждый кандидат с той же анкетой расшифровывается Fernet,
+новый пароль шифруется Fernet – все в event loop.
+digest: дубликат ищется по HMAC анкеты и пароля (без расшифровок),
+пароль хэшируется выбранным хэшером в пуле потоков.
+
+Кроме регистраций в секунду измеряется задержка event loop: насколько позже
+срабатывает таймер с периодом --tick, пока идут регистрации.
+
+Запуск:
+    python -m tests.load.test_registration.benchmark --registrations 200 --candidates 50
+"""
+
+import argparse
+import asyncio
+import datetime
+import statistics
+import time
+import typing
+
+from cryptography import fernet
+
+from social_network.domain import models, services
+from social_network.domain.services import auth, passwords
+
+PASSWORD = "passw0rd"
+
+
+def make_user() -> models.NewUserDomain:
+    return models.NewUserDomain(
+        first_name="Ivan",
+        second_name="Ivanov",
+        birthdate=datetime.datetime(2000, 1, 1, tzinfo=datetime.timezone.utc),
+        biography="",
+        city="Moscow",
+        password=PASSWORD,
+    )
+
+
+async def measure_lag(tick: float, lags: list[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(tick)
+        lags.append(time.perf_counter() - started - tick)
+
+
+async def run(
+    register: typing.Callable[[], typing.Awaitable[None]],
+    registrations: int,
+    concurrency: int,
+    tick: float,
+) -> tuple[float, list[float]]:
+    semaphore = asyncio.Semaphore(concurrency)
+    lags: list[float] = []
+    stop = asyncio.Event()
+
+    async def one() -> None:
+        async with semaphore:
+            await register()
+
+    lag_task = asyncio.create_task(measure_lag(tick, lags, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(registrations)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await lag_task
+    return registrations / elapsed, lags or [0.0]
+
+
+async def main(args: argparse.Namespace) -> None:
+    secret = fernet.Fernet.generate_key().decode()
+    user = make_user()
+    # Кандидаты-однофамильцы с другими паролями: legacy-проверка расшифрует каждого
+    candidates = [
+        auth.encrypt_password(password=f"{PASSWORD}{i}", secret=secret)
+        for i in range(args.candidates)
+    ]
+    hasher = services.HASHERS[args.hasher]()
+
+    async def legacy() -> None:
+        for candidate in candidates:
+            if auth.decrypt_password(password=candidate, secret=secret) == PASSWORD:
+                raise RuntimeError("Duplicate")
+        auth.encrypt_password(password=PASSWORD, secret=secret)
+
+    async def digest() -> None:
+        passwords.credentials_digest(user=user, password=PASSWORD, secret=secret)
+        await asyncio.to_thread(hasher.hash, PASSWORD)
+
+    for name, register in (("legacy", legacy), ("digest", digest)):
+        throughput, lags = await run(
+            register, args.registrations, args.concurrency, args.tick
+        )
+        print(
+            f"{name}: {throughput:.1f} registrations/s, "
+            f"loop lag median={statistics.median(lags) * 1000:.2f}ms "
+            f"max={max(lags) * 1000:.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--registrations", type=int, default=200)
+    parser.add_argument("--candidates", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--tick", type=float, default=0.01)
+    parser.add_argument("--hasher", choices=sorted(services.HASHERS), default="scrypt")
+    asyncio.run(main(parser.parse_args()))
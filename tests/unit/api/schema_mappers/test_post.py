@@ -0,0 +1,38 @@
+import base64
+import datetime
+import struct
+import uuid
+
+import pytest
+
+from social_network.api import schema_mappers
+from social_network.domain import models
+
+
+def test_feed_cursor_round_trip() -> None:
+    cursor = models.FeedCursor(
+        created_at=datetime.datetime(
+            2025, 1, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc
+        ),
+        id=uuid.uuid4(),
+    )
+
+    encoded = schema_mappers.FeedCursorMapper.map_domain_to_dto(cursor)
+
+    assert schema_mappers.FeedCursorMapper.map_dto_to_domain(encoded) == cursor
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "",
+        "not a cursor",
+        "AAAA",
+        # created_at за пределами datetime
+        base64.urlsafe_b64encode(struct.pack("!q16s", 2**62, bytes(16))).decode(),
+        base64.urlsafe_b64encode(struct.pack("!q16s", -(2**62), bytes(16))).decode(),
+    ],
+)
+def test_feed_cursor_rejects_garbage(cursor: str) -> None:
+    with pytest.raises(ValueError):
+        schema_mappers.FeedCursorMapper.map_dto_to_domain(cursor)
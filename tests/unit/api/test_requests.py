@@ -0,0 +1,32 @@
+import typing
+
+import pytest
+from starlette import responses
+
+from social_network.api import requests as api_requests
+
+
+async def _app(scope: typing.Any, receive: typing.Any, send: typing.Any) -> None:
+    await responses.Response()(scope, receive, send)
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (None, 30.0),
+        ("5", 5.0),
+        ("not a number", 30.0),
+        ("nan", 30.0),
+        ("inf", 30.0),
+        ("-inf", 30.0),
+        ("-5", 0.1),
+        ("0", 0.1),
+        ("3600", 60.0),
+    ],
+)
+def test_request_deadline_timeout_is_finite_and_clamped(
+    header: typing.Optional[str], expected: float
+) -> None:
+    middleware = api_requests.RequestDeadlineMiddleware(_app)
+
+    assert middleware._timeout_of(header) == expected
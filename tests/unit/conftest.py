@@ -62,3 +62,18 @@ def post_unit_of_work(
         master_factory=mocker.AsyncMock(),
         post_repository=repository.PostRepository(),
     )
+
+
+@pytest.fixture
+def feed_unit_of_work(
+    mocker: pytest_mock.MockerFixture, database_name: str
+) -> uow.FeedUnitOfWork:
+    class FeedUnitOfWork(UnitOfWorkMockMixin, uow.FeedUnitOfWork): ...
+
+    return FeedUnitOfWork(
+        database_name=database_name,
+        master_factory=mocker.AsyncMock(),
+        post_repository=repository.PostRepository(),
+        friend_repository=repository.FriendRepository(),
+        timeline_repository=repository.TimelineRepository(),
+    )
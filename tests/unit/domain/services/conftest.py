@@ -106,15 +106,12 @@ def auth_service_with_duplicates(
     new_user: models.NewUserDomain,
     user_auth_data: dict[str, str],
 ) -> services.AuthService:
-    async def users_find_all(
-        exclude_deleted: bool = False,
-        filters: typing.Optional[dict[str, typing.Any]] = None,
-        order_by: typing.Optional[str] = None,
-        limit: typing.Optional[int] = None,
+    async def find_duplicates(
+        credentials_digest: str, profile: dict[str, typing.Any]
     ) -> list[models.UserDomain]:
         return [models.UserDomain(**(new_user.model_dump() | user_auth_data))]
 
-    mocker.patch.object(auth_service.uow.users, "find_all", new=users_find_all)
+    mocker.patch.object(auth_service.uow.users, "find_duplicates", new=find_duplicates)
 
     return auth_service
 
@@ -126,18 +123,15 @@ def auth_service_without_duplicates(
     new_user: models.NewUserDomain,
     user_auth_data: dict[str, str],
 ) -> services.AuthService:
-    async def users_find_all(
-        exclude_deleted: bool = False,
-        filters: typing.Optional[dict[str, typing.Any]] = None,
-        order_by: typing.Optional[str] = None,
-        limit: typing.Optional[int] = None,
+    async def find_duplicates(
+        credentials_digest: str, profile: dict[str, typing.Any]
     ) -> list[models.UserDomain]:
         return []
 
     async def create_user(item: models.NewUserDomain) -> models.UserDomain:
         return models.UserDomain(**(new_user.model_dump() | user_auth_data))
 
-    mocker.patch.object(auth_service.uow.users, "find_all", new=users_find_all)
+    mocker.patch.object(auth_service.uow.users, "find_duplicates", new=find_duplicates)
     mocker.patch.object(auth_service.uow.users, "create", new=create_user)
 
     return auth_service
@@ -189,7 +183,15 @@ def auth_service_user_exists(
     async def find_user(id_: str) -> models.UserDomain:
         return models.UserDomain(**(new_user.model_dump() | user_auth_data))
 
+    async def update_credentials(
+        id_: str, password: str, credentials_digest: str
+    ) -> None:
+        return None
+
     mocker.patch.object(auth_service.uow.users, "find_one", new=find_user)
+    mocker.patch.object(
+        auth_service.uow.users, "update_credentials", new=update_credentials
+    )
 
     return auth_service
 
@@ -301,7 +303,10 @@ def post_service(
         return None
 
     async def feed(
-        user_id: uuid.UUID, offset: int, limit: int
+        user_id: uuid.UUID,
+        offset: int,
+        limit: int,
+        cursor: typing.Optional[models.FeedCursor] = None,
     ) -> list[models.PostDomain]:
         return []
 
@@ -447,3 +452,46 @@ def friend_service_with_not_existing_user(
     mocker.patch.object(friend_service.uow.friends, "find_all", new=find_all)
 
     return friend_service
+
+
+@pytest.fixture
+def async_feed_service(mocker: pytest_mock.MockerFixture) -> services.AsyncFeedService:
+    return services.AsyncFeedService(exchange=mocker.AsyncMock(), channel=None)
+
+
+@pytest.fixture
+def feed_service(
+    feed_unit_of_work: uow.FeedUnitOfWork,
+    async_feed_service: services.AsyncFeedService,
+    mocker: pytest_mock.MockerFixture,
+) -> services.FeedService:
+    return services.FeedService(
+        unit_of_work=feed_unit_of_work,
+        redis=mocker.MagicMock(),
+        async_feed_service=async_feed_service,
+        fanout_worker_is_enabled=True,
+    )
+
+
+@pytest.fixture
+def timeline_feed_service(
+    feed_unit_of_work: uow.FeedUnitOfWork,
+    async_feed_service: services.AsyncFeedService,
+    mocker: pytest_mock.MockerFixture,
+) -> services.FeedService:
+    return services.FeedService(
+        unit_of_work=feed_unit_of_work,
+        redis=mocker.MagicMock(),
+        async_feed_service=async_feed_service,
+        timeline_is_enabled=True,
+    )
+
+
+@pytest.fixture
+def post_created_event(existing_post: models.PostDomain) -> models.FeedEventDomain:
+    return models.FeedEventDomain(
+        type=models.FeedEventType.created,
+        user_id=existing_post.author_id,
+        post_id=existing_post.id,
+        post=existing_post,
+    )
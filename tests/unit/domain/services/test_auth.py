@@ -2,8 +2,11 @@ import asyncio
 import datetime
 
 import pytest
+import pytest_mock
 
 from social_network.domain import exceptions, models, services
+from social_network.domain.services import auth
+from social_network.infrastructure import cache
 
 
 def test_password_encryption_with_invalid_secret(
@@ -124,6 +127,28 @@ async def test_login_user_with_wrong_password(
         )
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize("hashed", ["garbage", "md5$c2FsdA==$ZGlnZXN0", "scrypt$x$$"])
+async def test_login_user_with_malformed_password_hash(
+    mocker: pytest_mock.MockerFixture,
+    auth_service: services.AuthService,
+    new_user: models.NewUserDomain,
+    user_auth_data: dict[str, str],
+    hashed: str,
+) -> None:
+    async def find_user(id_: str) -> models.UserDomain:
+        return models.UserDomain(
+            **(new_user.model_dump() | user_auth_data | {"password": hashed})
+        )
+
+    mocker.patch.object(auth_service.uow.users, "find_one", new=find_user)
+
+    with pytest.raises(exceptions.WrongPasswordError):
+        await auth_service.login(
+            id_=user_auth_data["id"], password=user_auth_data["password"]
+        )
+
+
 @pytest.mark.asyncio
 async def test_login(
     auth_service_user_exists: services.AuthService,
@@ -187,4 +212,77 @@ async def test_auth(
 ) -> None:
     assert await auth_service_user_exists.authorize(
         auth_service_user_exists.create_access_token(user_auth_data["id"])
-    ) == models.UserDomain(**(new_user.model_dump() | user_auth_data))
+    ) == models.PrincipalDomain.of(
+        models.UserDomain(**(new_user.model_dump() | user_auth_data))
+    )
+
+
+@pytest.mark.asyncio
+async def test_authorization_uses_principal_cache(
+    mocker: pytest_mock.MockerFixture,
+    auth_service_user_exists: services.AuthService,
+    user_auth_data: dict[str, str],
+    secret: str,
+    algorithm: str,
+) -> None:
+    auth_service_user_exists._principal_cache = cache.PrincipalCache(
+        capacity=10, ttl=60
+    )
+    find_one = mocker.spy(auth_service_user_exists.uow.users, "find_one")
+    # Запись кэша не живет дольше токена, поэтому токен нужен длиннее token_ttl_seconds
+    token = auth.create_access_token(
+        id_=user_auth_data["id"],
+        token_ttl_seconds=60,
+        secret=secret,
+        algorithm=algorithm,
+    )
+
+    user = await auth_service_user_exists.authorize(token)
+    assert await auth_service_user_exists.authorize(token) == user
+    assert find_one.call_count == 1
+
+    await auth_service_user_exists.invalidate_user(user.id)
+    await auth_service_user_exists.authorize(token)
+    assert find_one.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_registration_stores_hash_and_credentials_digest(
+    mocker: pytest_mock.MockerFixture,
+    auth_service_without_duplicates: services.AuthService,
+    new_user: models.NewUserDomain,
+    password: str,
+) -> None:
+    create = mocker.spy(auth_service_without_duplicates.uow.users, "create")
+
+    await auth_service_without_duplicates.register(new_user)
+
+    created: models.NewUserDomain = create.call_args.args[0]
+    assert await auth_service_without_duplicates.verify_password(
+        password, created.password
+    )
+    assert created.credentials_digest == (
+        auth_service_without_duplicates.credentials_digest(new_user, password)
+    )
+
+
+@pytest.mark.asyncio
+async def test_legacy_password_is_rehashed_on_login(
+    mocker: pytest_mock.MockerFixture,
+    auth_service_user_exists: services.AuthService,
+    user_auth_data: dict[str, str],
+    password: str,
+) -> None:
+    update_credentials = mocker.spy(
+        auth_service_user_exists.uow.users, "update_credentials"
+    )
+
+    await auth_service_user_exists.login(id_=user_auth_data["id"], password=password)
+
+    hashed = update_credentials.call_args.kwargs["password"]
+    assert not auth_service_user_exists.password_needs_rehash(hashed)
+    assert await auth_service_user_exists.verify_password(password, hashed)
+
+
+def test_fernet_key_is_parsed_once(secret: str) -> None:
+    assert auth.get_fernet(secret) is auth.get_fernet(secret)
@@ -0,0 +1,535 @@
+import datetime
+import typing
+import unittest.mock
+import uuid
+
+import aio_pika.exceptions
+import pytest
+import pytest_mock
+import redis.exceptions
+
+from social_network.domain import models, services
+from social_network.domain.services import feed
+from social_network.infrastructure import cache
+
+
+def mock_pipeline(
+    feed_service: services.FeedService,
+    mocker: pytest_mock.MockerFixture,
+    results: list[typing.Any],
+) -> unittest.mock.MagicMock:
+    pipe = mocker.MagicMock(execute=mocker.AsyncMock(return_value=results))
+    pipeline = mocker.MagicMock()
+    pipeline.__aenter__.return_value = pipe
+    mocker.patch.object(feed_service._redis, "pipeline", return_value=pipeline)
+    mocker.patch.object(feed_service, "_posts_cache_script", mocker.AsyncMock())
+    mocker.patch.object(feed_service, "_replace_script", mocker.AsyncMock())
+    return pipe
+
+
+@pytest.mark.asyncio
+async def test_notify_enqueues_event_for_worker(
+    feed_service: services.FeedService,
+    post_created_event: models.FeedEventDomain,
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    add_post = mocker.patch.object(feed_service, "add_post")
+
+    await feed_service.notify(post_created_event)
+
+    add_post.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_notify_applies_event_if_queue_is_unavailable(
+    feed_service: services.FeedService,
+    async_feed_service: services.AsyncFeedService,
+    post_created_event: models.FeedEventDomain,
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    mocker.patch.object(async_feed_service, "publish_event", return_value=None)
+    add_post = mocker.patch.object(feed_service, "add_post")
+
+    await feed_service.notify(post_created_event)
+
+    add_post.assert_awaited_once_with(
+        user_id=post_created_event.user_id, post=post_created_event.post
+    )
+
+
+@pytest.mark.asyncio
+async def test_apply_raises_redis_errors_for_worker_and_notify_swallows_them(
+    feed_service: services.FeedService,
+    async_feed_service: services.AsyncFeedService,
+    post_created_event: models.FeedEventDomain,
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    mocker.patch.object(async_feed_service, "publish_event", return_value=False)
+    mocker.patch.object(
+        feed_service, "update_post", side_effect=redis.exceptions.ConnectionError
+    )
+    event = post_created_event.model_copy(update={"type": models.FeedEventType.updated})
+
+    with pytest.raises(redis.exceptions.ConnectionError):
+        await feed_service.apply(event)
+    await feed_service.notify(event)
+
+
+@pytest.mark.asyncio
+async def test_publish_many_serializes_once_and_aggregates_failures(
+    existing_post: models.PostDomain,
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    friend_ids = [uuid.uuid4() for _ in range(5)]
+    exchange = mocker.AsyncMock()
+    exchange.publish.side_effect = [
+        None,
+        aio_pika.exceptions.DeliveryError(None, mocker.Mock()),
+    ] * 3
+    async_feed_service = services.AsyncFeedService(exchange=exchange, channel=None)
+    serialize = mocker.spy(services.AsyncFeedService, "_serialize")
+
+    failures = await async_feed_service.publish_many(
+        data=existing_post, to=friend_ids, batch_size=2
+    )
+
+    assert failures == 2
+    serialize.assert_called_once()
+    assert [
+        call.kwargs["routing_key"] for call in exchange.publish.await_args_list
+    ] == [f"feed:{friend_id}" for friend_id in friend_ids]
+
+
+@pytest.mark.asyncio
+async def test_async_feed_service_pool_declares_exchange_once_per_channel(
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    rmq_connection = mocker.AsyncMock()
+
+    pool = await services.AsyncFeedServicePool.create(rmq_connection, size=2)
+    first, second, third = pool.get(), pool.get(), pool.get()
+
+    assert rmq_connection.channel.await_count == 2
+    assert first is not second
+    assert first is third
+
+
+def test_merge_feeds_orders_posts_by_score() -> None:
+    post_ids = [uuid.uuid4().bytes for _ in range(4)]
+    feed = [(post_ids[3], 4.0), (post_ids[1], 2.0)]
+    outbox = [(post_ids[2], 3.0), (post_ids[0], 1.0)]
+
+    assert services.merge_feeds(feed, outbox, offset=0, limit=10) == [
+        (post_ids[3], 4.0),
+        (post_ids[2], 3.0),
+        (post_ids[1], 2.0),
+        (post_ids[0], 1.0),
+    ]
+    assert services.merge_feeds(feed, outbox, offset=1, limit=2) == [
+        (post_ids[2], 3.0),
+        (post_ids[1], 2.0),
+    ]
+
+
+def test_merge_feeds_skips_duplicates(
+    existing_post: models.PostDomain,
+) -> None:
+    feed = [(existing_post.id.bytes, 1.0)]
+    outbox = [(existing_post.id.bytes, 1.0)]
+
+    assert services.merge_feeds(feed, outbox, offset=0, limit=10) == [
+        (existing_post.id.bytes, 1.0)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_feed_skips_deleted_posts(
+    feed_service: services.FeedService,
+    existing_post: models.PostDomain,
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    deleted_post_id = uuid.uuid4()
+    mocker.patch.object(
+        feed_service._redis,
+        "mget",
+        mocker.AsyncMock(return_value=[cache.encode_post(existing_post), b""]),
+    )
+
+    posts = await feed_service._load([existing_post.id.bytes, deleted_post_id.bytes])
+
+    assert [post.id for post in posts] == [existing_post.id]
+
+
+@pytest.mark.asyncio
+async def test_delete_post_patches_feeds_without_invalidation(
+    feed_service: services.FeedService,
+    user_friend: models.FriendDomain,
+    post_id: uuid.UUID,
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    mocker.patch.object(
+        feed_service.uow.friends, "find_all", return_value=[user_friend]
+    )
+    mocker.patch.object(feed_service._redis, "set", mocker.AsyncMock())
+    delete = mocker.patch.object(feed_service._redis, "delete", mocker.AsyncMock())
+    remove = mocker.patch.object(
+        feed_service, "_remove_script", mocker.AsyncMock(return_value=2)
+    )
+
+    await feed_service.delete_post(user_id=user_friend.user_id, post_id=post_id)
+
+    remove.assert_awaited_once_with(
+        keys=(
+            feed_service.outbox_key(user_friend.user_id),
+            feed_service.feed_key(user_friend.friend_id),
+        ),
+        args=[post_id.bytes],
+    )
+    delete.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_feed_serves_stale_cache_and_revalidates_in_background(
+    feed_service: services.FeedService,
+    existing_post: models.PostDomain,
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    mocker.patch.object(
+        feed_service,
+        "_read",
+        return_value=(
+            1000,
+            1,
+            {feed.CELEBRITIES_SENTINEL},
+            [(existing_post.id.bytes, existing_post.created_at.timestamp())],
+        ),
+    )
+    mocker.patch.object(feed_service, "_load", return_value=[existing_post])
+    start = mocker.patch.object(feed_service._warm_ups, "start")
+    find_feed = mocker.patch.object(feed_service.uow.posts, "feed")
+
+    posts = await feed_service.feed(user_id=existing_post.author_id, offset=0, limit=10)
+
+    assert posts == [existing_post]
+    start.assert_called_once()
+    find_feed.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_short_page_of_deleted_posts_keeps_next_cursor(
+    feed_service: services.FeedService,
+    existing_post: models.PostDomain,
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    deleted_post_id = uuid.uuid4()
+    deleted_at = datetime.datetime(
+        2025, 1, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc
+    )
+    mocker.patch.object(
+        feed_service,
+        "_read",
+        return_value=(
+            10**6,
+            feed_service._capacity,
+            {feed.CELEBRITIES_SENTINEL},
+            [
+                (existing_post.id.bytes, existing_post.created_at.timestamp()),
+                (deleted_post_id.bytes, deleted_at.timestamp()),
+            ],
+        ),
+    )
+    mocker.patch.object(feed_service, "_load", return_value=[existing_post])
+    find_feed = mocker.patch.object(feed_service.uow.posts, "feed")
+
+    page = await feed_service.feed_page(
+        user_id=existing_post.author_id, offset=0, limit=2
+    )
+
+    assert page.posts == [existing_post]
+    assert page.next_cursor == models.FeedCursor(
+        created_at=deleted_at, id=deleted_post_id
+    )
+    find_feed.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_feed_rebuilds_missing_celebrities_of_live_feed(
+    feed_service: services.FeedService,
+    existing_post: models.PostDomain,
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    celebrity = uuid.uuid4()
+    mocker.patch.object(
+        feed_service,
+        "_read",
+        return_value=(
+            10**6,
+            1,
+            set(),
+            [(existing_post.id.bytes, existing_post.created_at.timestamp())],
+        ),
+    )
+    find_celebrities = mocker.patch.object(
+        feed_service.uow.friends, "find_celebrities", return_value=[celebrity]
+    )
+    mocker.patch.object(feed_service, "_renew_outboxes")
+    pipe = mock_pipeline(feed_service, mocker, results=[[], []])
+    mocker.patch.object(feed_service, "_load", return_value=[existing_post])
+
+    await feed_service.feed(user_id=existing_post.author_id, offset=0, limit=10)
+
+    find_celebrities.assert_awaited_once()
+    pipe.sadd.assert_called_once_with(
+        feed_service.celebrities_key(existing_post.author_id),
+        feed.CELEBRITIES_SENTINEL,
+        str(celebrity),
+    )
+    pipe.pexpire.assert_called_once_with(
+        feed_service.celebrities_key(existing_post.author_id), 10**6
+    )
+
+
+@pytest.mark.asyncio
+async def test_warm_up_renews_outboxes_of_celebrities(
+    feed_service: services.FeedService,
+    existing_post: models.PostDomain,
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    celebrity = uuid.uuid4()
+    mocker.patch.object(feed_service.uow.posts, "feed", return_value=[existing_post])
+    mocker.patch.object(
+        feed_service.uow.friends, "find_celebrities", return_value=[celebrity]
+    )
+    pipe = mock_pipeline(feed_service, mocker, results=[])
+
+    await feed_service._warm_up(existing_post.author_id)
+
+    pipe.expire.assert_any_call(
+        feed_service.outbox_key(celebrity), feed_service._lifetime, gt=True
+    )
+    pipe.pexpire.assert_called_once_with(
+        feed_service.celebrities_key(existing_post.author_id),
+        feed_service._lifetime * 1000,
+    )
+
+
+@pytest.mark.asyncio
+async def test_warm_up_replaces_feed_with_temporary_key(
+    feed_service: services.FeedService,
+    existing_post: models.PostDomain,
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    mocker.patch.object(feed_service.uow.posts, "feed", return_value=[existing_post])
+    mocker.patch.object(feed_service.uow.friends, "find_celebrities", return_value=[])
+    mocker.patch.object(feed_service, "warm_up_key", return_value="warmup:key")
+    pipe = mock_pipeline(feed_service, mocker, results=[])
+    replace = typing.cast(unittest.mock.AsyncMock, feed_service._replace_script)
+
+    await feed_service._warm_up(existing_post.author_id)
+
+    pipe.zadd.assert_called_once_with(
+        name="warmup:key",
+        mapping={existing_post.id.bytes: existing_post.created_at.timestamp()},
+    )
+    pipe.expire.assert_called_once_with("warmup:key", feed_service._lifetime)
+    # Скрипт переносит во временный ключ посты, разосланные после чтения БД,
+    # и переименовывает его в ленту
+    replace.assert_awaited_once_with(
+        keys=["warmup:key", feed_service.feed_key(existing_post.author_id)],
+        args=[existing_post.created_at.timestamp(), feed_service._capacity],
+        client=pipe,
+    )
+    pipe.rename.assert_not_called()
+    pipe.delete.assert_called_once_with(
+        feed_service.celebrities_key(existing_post.author_id)
+    )
+
+
+@pytest.mark.asyncio
+async def test_warm_up_caches_empty_feed(
+    feed_service: services.FeedService,
+    existing_post: models.PostDomain,
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    mocker.patch.object(feed_service.uow.posts, "feed", return_value=[])
+    mocker.patch.object(feed_service.uow.friends, "find_celebrities", return_value=[])
+    mocker.patch.object(feed_service, "warm_up_key", return_value="warmup:key")
+    pipe = mock_pipeline(feed_service, mocker, results=[])
+    replace = typing.cast(unittest.mock.AsyncMock, feed_service._replace_script)
+
+    await feed_service._warm_up(existing_post.author_id)
+
+    pipe.zadd.assert_called_once_with(name="warmup:key", mapping={feed.EMPTY_FEED: 0})
+    pipe.expire.assert_called_once_with("warmup:key", feed_service._lifetime)
+    replace.assert_awaited_once_with(
+        keys=["warmup:key", feed_service.feed_key(existing_post.author_id)],
+        args=[mocker.ANY, feed_service._capacity],
+        client=pipe,
+    )
+    pipe.delete.assert_called_once_with(
+        feed_service.celebrities_key(existing_post.author_id)
+    )
+
+
+@pytest.mark.asyncio
+async def test_empty_feed_is_served_from_cache_without_warm_up(
+    feed_service: services.FeedService,
+    existing_post: models.PostDomain,
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    mock_pipeline(
+        feed_service,
+        mocker,
+        results=[10**6, 1, {feed.CELEBRITIES_SENTINEL}, [(feed.EMPTY_FEED, 0.0)]],
+    )
+    do = mocker.patch.object(feed_service._warm_ups, "do")
+    find_feed = mocker.patch.object(feed_service.uow.posts, "feed")
+
+    page = await feed_service.feed_page(
+        user_id=existing_post.author_id, offset=0, limit=10
+    )
+
+    assert page == models.FeedPage(posts=[])
+    do.assert_not_called()
+    find_feed.assert_not_called()
+
+
+@pytest.mark.parametrize("outbox_exists, is_added", [(0, True), (1, False)])
+@pytest.mark.asyncio
+async def test_new_celebrity_is_added_to_warm_feeds_of_friends(
+    outbox_exists: int,
+    is_added: bool,
+    feed_service: services.FeedService,
+    user_friend: models.FriendDomain,
+    existing_post: models.PostDomain,
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    mock_pipeline(feed_service, mocker, results=[outbox_exists])
+    celebrities_add = mocker.patch.object(
+        feed_service, "_celebrities_add_script", mocker.AsyncMock(return_value=1)
+    )
+
+    await feed_service._push_to_outbox(
+        user_id=user_friend.user_id, friends=[user_friend], post=existing_post
+    )
+
+    assert celebrities_add.await_count == is_added
+    if is_added:
+        celebrities_add.assert_awaited_once_with(
+            keys=[feed_service.celebrities_key(user_friend.friend_id)],
+            args=[str(user_friend.user_id)],
+        )
+
+
+@pytest.mark.asyncio
+async def test_post_created_after_deletion_does_not_overwrite_tombstone(
+    feed_service: services.FeedService,
+    user_friend: models.FriendDomain,
+    existing_post: models.PostDomain,
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    mocker.patch.object(
+        feed_service.uow.friends, "find_all", return_value=[user_friend]
+    )
+    set_ = mocker.patch.object(feed_service._redis, "set", mocker.AsyncMock())
+    mocker.patch.object(feed_service, "_remove_script", mocker.AsyncMock())
+    mocker.patch.object(feed_service, "_push_script", mocker.AsyncMock())
+    mocker.patch.object(feed_service._async_feed_service, "publish_many")
+    pipe = mock_pipeline(feed_service, mocker, results=[1])
+    posts_cache = typing.cast(unittest.mock.AsyncMock, feed_service._posts_cache_script)
+
+    await feed_service.apply(
+        models.FeedEventDomain(
+            type=models.FeedEventType.deleted,
+            user_id=user_friend.user_id,
+            post_id=existing_post.id,
+        )
+    )
+    await feed_service.apply(
+        models.FeedEventDomain(
+            type=models.FeedEventType.created,
+            user_id=user_friend.user_id,
+            post_id=existing_post.id,
+            post=existing_post,
+        )
+    )
+
+    set_.assert_awaited_once_with(
+        feed_service.post_key(existing_post.id),
+        feed.TOMBSTONE,
+        ex=feed_service._post_ttl,
+    )
+    # Тело пишет только скрипт, который пропускает tombstone
+    pipe.set.assert_not_called()
+    posts_cache.assert_awaited_once_with(
+        keys=[feed_service.post_key(existing_post.id)],
+        args=[feed_service._post_ttl, cache.encode_post(existing_post)],
+        client=pipe,
+    )
+
+
+@pytest.mark.asyncio
+async def test_push_does_not_extend_feed_lifetime(
+    feed_service: services.FeedService,
+    user_friend: models.FriendDomain,
+    existing_post: models.PostDomain,
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    pipe = mock_pipeline(feed_service, mocker, results=[1])
+    push = mocker.patch.object(feed_service, "_push_script", mocker.AsyncMock())
+
+    await feed_service._push(friends=[user_friend], post=existing_post)
+
+    push.assert_awaited_once_with(
+        keys=[feed_service.feed_key(user_friend.friend_id)],
+        args=[
+            existing_post.id.bytes,
+            existing_post.created_at.timestamp(),
+            feed_service._capacity,
+        ],
+        client=pipe,
+    )
+    pipe.expire.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_add_friend_backfills_timelines(
+    timeline_feed_service: services.FeedService,
+    user_friend: models.FriendDomain,
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    add_author = mocker.patch.object(timeline_feed_service.uow.timelines, "add_author")
+    invalidate = mocker.patch.object(timeline_feed_service, "_invalidate_friends")
+
+    await timeline_feed_service.add_friend(
+        user_id=user_friend.user_id, friend_id=user_friend.friend_id
+    )
+
+    add_author.assert_has_awaits(
+        [
+            mocker.call(user_id=user_friend.user_id, author_id=user_friend.friend_id),
+            mocker.call(user_id=user_friend.friend_id, author_id=user_friend.user_id),
+        ]
+    )
+    invalidate.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_feed_reads_timelines_on_cache_miss(
+    timeline_feed_service: services.FeedService,
+    existing_post: models.PostDomain,
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    mocker.patch.object(timeline_feed_service, "_feed_from_cache", return_value=None)
+    timeline = mocker.patch.object(
+        timeline_feed_service.uow.timelines, "feed", return_value=[existing_post]
+    )
+    posts_feed = mocker.patch.object(timeline_feed_service.uow.posts, "feed")
+
+    posts = await timeline_feed_service.feed(
+        user_id=existing_post.author_id, offset=0, limit=10
+    )
+
+    assert posts == [existing_post]
+    timeline.assert_awaited_once()
+    posts_feed.assert_not_called()
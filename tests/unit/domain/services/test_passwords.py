@@ -0,0 +1,63 @@
+import pytest
+
+from social_network.domain import models, services
+from social_network.domain.services import passwords
+
+
+@pytest.mark.parametrize(
+    "hasher",
+    [services.ScryptHasher(n=2**10), services.Pbkdf2Hasher(iterations=1000)],
+)
+def test_password_hash_is_verified(
+    hasher: services.PasswordHasher, password: str
+) -> None:
+    hashed = hasher.hash(password)
+
+    assert hashed != hasher.hash(password)
+    hasher_of = passwords.hasher_of(hashed)
+    assert hasher_of is not None
+    assert hasher_of.verify(password, hashed)
+    assert not hasher_of.verify("wrong", hashed)
+    assert not hasher.needs_rehash(hashed)
+
+
+def test_password_with_outdated_params_needs_rehash(password: str) -> None:
+    hashed = services.Pbkdf2Hasher(iterations=1000).hash(password)
+
+    assert services.Pbkdf2Hasher(iterations=2000).needs_rehash(hashed)
+    assert services.ScryptHasher().needs_rehash(hashed)
+
+
+@pytest.mark.parametrize(
+    "hashed",
+    [
+        "",
+        "garbage",
+        "scrypt",
+        "scrypt$x$8$1$c2FsdA==$ZGlnZXN0",
+        "scrypt$3$8$1$c2FsdA==$ZGlnZXN0",
+        "scrypt$16384$8$c2FsdA==$ZGlnZXN0",
+        "scrypt$16384$8$1$not base64$ZGlnZXN0",
+        "pbkdf2_sha256$$c2FsdA==$ZGlnZXN0",
+    ],
+)
+def test_malformed_hash_fails_verification(hashed: str, password: str) -> None:
+    hasher = services.ScryptHasher(n=2**10)
+
+    assert not hasher.verify(password, hashed)
+    assert not services.Pbkdf2Hasher(iterations=1000).verify(password, hashed)
+    assert hasher.needs_rehash(hashed)
+
+
+def test_hasher_of_unknown_algorithm_is_none() -> None:
+    assert passwords.hasher_of("md5$c2FsdA==$ZGlnZXN0") is None
+
+
+def test_credentials_digest_depends_on_password_and_secret(
+    new_user: models.NewUserDomain, password: str, secret: str
+) -> None:
+    digest = passwords.credentials_digest(new_user, password, secret)
+
+    assert digest == passwords.credentials_digest(new_user, password, secret)
+    assert digest != passwords.credentials_digest(new_user, "another", secret)
+    assert digest != passwords.credentials_digest(new_user, password, "another")
@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from social_network.domain import services
+
+
+@pytest.mark.asyncio
+async def test_single_flight_coalesces_concurrent_calls() -> None:
+    single_flight: services.SingleFlight[int] = services.SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def warm_up() -> int:
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return calls
+
+    tasks = [asyncio.create_task(single_flight.do("feed", warm_up)) for _ in range(3)]
+    await asyncio.sleep(0)
+    assert "feed" in single_flight
+    release.set()
+
+    results = await asyncio.gather(*tasks)
+
+    assert calls == 1
+    assert [result for result, _ in results] == [1, 1, 1]
+    assert [is_leader for _, is_leader in results] == [True, False, False]
+    assert "feed" not in single_flight
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_leader_error() -> None:
+    single_flight: services.SingleFlight[int] = services.SingleFlight()
+
+    async def warm_up() -> int:
+        await asyncio.sleep(0)
+        raise RuntimeError("db is unavailable")
+
+    results = await asyncio.gather(
+        single_flight.do("feed", warm_up),
+        single_flight.do("feed", warm_up),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert "feed" not in single_flight
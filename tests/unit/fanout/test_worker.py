@@ -0,0 +1,144 @@
+import contextlib
+import typing
+import uuid
+
+import aio_pika.abc
+import aio_pika.exceptions
+import pytest
+import pytest_mock
+
+from social_network import settings
+from social_network.domain import models
+from social_network.fanout import worker
+
+
+class Message:
+    def __init__(
+        self, event: models.FeedEventDomain, headers: dict[str, typing.Any]
+    ) -> None:
+        self.body = event.model_dump_json().encode()
+        self.headers = headers
+        self.message_id = str(event.id)
+        self.content_type = "application/json"
+        self.requeued: typing.Optional[bool] = None
+
+    @contextlib.asynccontextmanager
+    async def process(
+        self, ignore_processed: bool = False
+    ) -> typing.AsyncIterator[None]:
+        yield
+
+    async def nack(self, requeue: bool = True) -> None:
+        self.requeued = requeue
+
+
+def make_message(
+    event: models.FeedEventDomain, headers: dict[str, typing.Any]
+) -> aio_pika.abc.AbstractIncomingMessage:
+    return typing.cast(aio_pika.abc.AbstractIncomingMessage, Message(event, headers))
+
+
+@pytest.fixture
+def event() -> models.FeedEventDomain:
+    return models.FeedEventDomain(
+        type=models.FeedEventType.deleted,
+        user_id=uuid.uuid4(),
+        post_id=uuid.uuid4(),
+    )
+
+
+@pytest.fixture
+def fanout_worker() -> worker.FanoutWorker:
+    return worker.FanoutWorker(settings.SocialNetworkSettings())
+
+
+@pytest.mark.asyncio
+async def test_event_is_marked_done_after_apply(
+    fanout_worker: worker.FanoutWorker,
+    event: models.FeedEventDomain,
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    redis, channel, feed_service = mocker.AsyncMock(), mocker.AsyncMock(), mocker.Mock()
+    feed_service.apply = mocker.AsyncMock(
+        side_effect=lambda _: redis.set.assert_awaited_once()
+    )
+    key = fanout_worker.idempotency_key(str(event.id))
+
+    await fanout_worker._handle(make_message(event, {}), channel, redis, feed_service)
+
+    assert redis.set.await_args_list == [
+        mocker.call(key, worker.PROCESSING, nx=True, ex=60),
+        mocker.call(key, worker.DONE, ex=24 * 60 * 60),
+    ]
+    channel.default_exchange.publish.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_failed_event_is_released_and_sent_to_retry_queue(
+    fanout_worker: worker.FanoutWorker,
+    event: models.FeedEventDomain,
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    redis, channel, feed_service = mocker.AsyncMock(), mocker.AsyncMock(), mocker.Mock()
+    feed_service.apply = mocker.AsyncMock(side_effect=RuntimeError)
+    sleep = mocker.patch("asyncio.sleep")
+
+    await fanout_worker._handle(
+        make_message(event, {worker.RETRIES_HEADER: 1}), channel, redis, feed_service
+    )
+
+    redis.delete.assert_awaited_once_with(fanout_worker.idempotency_key(str(event.id)))
+    message = channel.default_exchange.publish.await_args.args[0]
+    assert message.headers[worker.RETRIES_HEADER] == 2
+    assert channel.default_exchange.publish.await_args.kwargs == {
+        "routing_key": "posts_fanout.retry.2000"
+    }
+    sleep.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "state, is_postponed",
+    [(worker.DONE, False), (worker.PROCESSING, True)],
+)
+@pytest.mark.asyncio
+async def test_claimed_event_is_not_applied(
+    state: bytes,
+    is_postponed: bool,
+    fanout_worker: worker.FanoutWorker,
+    event: models.FeedEventDomain,
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    redis, channel, feed_service = mocker.AsyncMock(), mocker.AsyncMock(), mocker.Mock()
+    redis.set.return_value = None
+    redis.get.return_value = state
+    feed_service.apply = mocker.AsyncMock()
+
+    await fanout_worker._handle(make_message(event, {}), channel, redis, feed_service)
+
+    feed_service.apply.assert_not_awaited()
+    redis.delete.assert_not_awaited()
+    assert channel.default_exchange.publish.await_count == is_postponed
+    if is_postponed:
+        message = channel.default_exchange.publish.await_args.args[0]
+        assert message.headers[worker.RETRIES_HEADER] == 0
+
+
+@pytest.mark.asyncio
+async def test_event_is_requeued_when_retry_publish_fails(
+    fanout_worker: worker.FanoutWorker,
+    event: models.FeedEventDomain,
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    redis, channel, feed_service = mocker.AsyncMock(), mocker.AsyncMock(), mocker.Mock()
+    feed_service.apply = mocker.AsyncMock(side_effect=RuntimeError)
+    channel.default_exchange.publish.side_effect = aio_pika.exceptions.ChannelClosed
+    message = Message(event, {})
+
+    await fanout_worker._handle(
+        typing.cast(aio_pika.abc.AbstractIncomingMessage, message),
+        channel,
+        redis,
+        feed_service,
+    )
+
+    assert message.requeued is True
@@ -0,0 +1,37 @@
+import datetime
+import uuid
+
+import pytest
+
+from social_network.domain import models
+from social_network.infrastructure import cache
+
+
+@pytest.fixture
+def post() -> models.PostDomain:
+    post = models.PostDomain(
+        id=uuid.uuid4(), author_id=uuid.uuid4(), text="Привет, мир!"
+    )
+    # Поля времени объявлены в миксине, поэтому mypy не видит их в конструкторе
+    post.created_at = datetime.datetime(
+        2025, 10, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc
+    )
+    post.updated_at = datetime.datetime.now(datetime.timezone.utc)
+    return post
+
+
+def test_encoded_post_is_decoded_back(post: models.PostDomain) -> None:
+    assert cache.decode_post(cache.encode_post(post)) == post
+
+
+def test_deleted_post_is_decoded_back(post: models.PostDomain) -> None:
+    post.deleted_at = datetime.datetime.now(datetime.timezone.utc)
+    assert cache.decode_post(cache.encode_post(post)) == post
+
+
+def test_encoded_post_is_smaller_than_json(post: models.PostDomain) -> None:
+    assert len(cache.encode_post(post)) < len(post.model_dump_json().encode())
+
+
+def test_legacy_json_post_is_decoded(post: models.PostDomain) -> None:
+    assert cache.decode_post(post.model_dump_json().encode()) == post
@@ -0,0 +1,96 @@
+import datetime
+import time
+import uuid
+
+import pytest
+import pytest_mock
+from redis import asyncio as aioredis
+
+from social_network.domain import models
+from social_network.infrastructure import cache
+
+
+def make_user() -> models.UserDomain:
+    return models.UserDomain(
+        id=uuid.uuid4(),
+        first_name="Ivan",
+        second_name="Ivanov",
+        birthdate=datetime.datetime.now(tz=datetime.timezone.utc),
+        biography="Good guy",
+        city="Moscow",
+        password="password",
+    )
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_principal_is_evicted() -> None:
+    principal_cache = cache.PrincipalCache(capacity=2, ttl=60)
+    expires_at = time.time() + 60
+    users = [make_user() for _ in range(3)]
+
+    await principal_cache.set(str(users[0].id), users[0], expires_at=expires_at)
+    await principal_cache.set(str(users[1].id), users[1], expires_at=expires_at)
+    assert await principal_cache.get(str(users[0].id), expires_at=expires_at)
+    await principal_cache.set(str(users[2].id), users[2], expires_at=expires_at)
+
+    assert await principal_cache.get(str(users[0].id), expires_at=expires_at)
+    assert await principal_cache.get(str(users[1].id), expires_at=expires_at) is None
+    assert await principal_cache.get(str(users[2].id), expires_at=expires_at)
+
+
+@pytest.mark.asyncio
+async def test_principal_does_not_outlive_token() -> None:
+    principal_cache = cache.PrincipalCache(capacity=10, ttl=60)
+    user = make_user()
+
+    await principal_cache.set(str(user.id), user, expires_at=time.time() - 1)
+
+    assert await principal_cache.get(str(user.id), expires_at=time.time() + 60) is None
+
+
+@pytest.mark.asyncio
+async def test_invalidated_principal_is_not_returned() -> None:
+    principal_cache = cache.PrincipalCache(capacity=10, ttl=60)
+    user = make_user()
+    expires_at = time.time() + 60
+
+    await principal_cache.set(str(user.id), user, expires_at=expires_at)
+    await principal_cache.invalidate(user.id)
+
+    assert await principal_cache.get(str(user.id), expires_at=expires_at) is None
+
+
+@pytest.mark.asyncio
+async def test_principal_is_cached_without_credentials(
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    redis = mocker.AsyncMock()
+    principal_cache = cache.PrincipalCache(capacity=10, ttl=60, redis=redis)
+    user = make_user()
+    user.credentials_digest = "digest"
+    expires_at = time.time() + 60
+
+    await principal_cache.set(str(user.id), user, expires_at=expires_at)
+
+    cached = await principal_cache.get(str(user.id), expires_at=expires_at)
+    assert type(cached) is models.PrincipalDomain
+    stored = redis.set.call_args.args[1]
+    assert "password" not in stored
+    assert "digest" not in stored
+
+
+@pytest.mark.asyncio
+async def test_invalidate_survives_redis_error(
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    redis = mocker.AsyncMock()
+    redis.delete.side_effect = aioredis.RedisError
+    principal_cache = cache.PrincipalCache(capacity=10, ttl=60, redis=redis)
+    user = make_user()
+    expires_at = time.time() + 60
+
+    await principal_cache.set(str(user.id), user, expires_at=expires_at)
+    await principal_cache.invalidate(user.id)
+
+    redis.get.return_value = None
+    assert await principal_cache.get(str(user.id), expires_at=expires_at) is None
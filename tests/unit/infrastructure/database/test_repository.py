@@ -0,0 +1,118 @@
+import asyncio
+import datetime
+import uuid
+
+import pytest
+import pytest_mock
+
+from social_network.domain import models as domain_models
+from social_network.infrastructure.database import exceptions, models, repository
+
+
+@pytest.mark.asyncio
+async def test_repository_session_is_bound_to_task() -> None:
+    post_repository = repository.PostRepository()
+
+    async def use(session: str) -> str:
+        post_repository(session)  # type: ignore[arg-type]
+        await asyncio.sleep(0)
+        return post_repository._get_db_session()  # type: ignore[return-value]
+
+    assert await asyncio.gather(use("first"), use("second")) == ["first", "second"]
+    assert post_repository._db_session is None
+
+
+def test_select_text_depends_only_on_query_shape() -> None:
+    first, first_params = repository.UserRepository.prepare_select(
+        model_class=models.UserORM,
+        filters={"id": str(uuid.uuid4())},
+        exclude_deleted=True,
+        limit=1,
+    )
+    second, second_params = repository.UserRepository.prepare_select(
+        model_class=models.UserORM,
+        filters={"id": str(uuid.uuid4())},
+        exclude_deleted=True,
+        limit=10,
+    )
+
+    assert first is second
+    assert first.text == (
+        "SELECT * FROM users WHERE id = :id AND deleted_at IS NULL LIMIT :limit"
+    )
+    assert first_params != second_params
+    assert second_params["limit"] == 10
+
+
+@pytest.mark.asyncio
+async def test_find_user_by_id_uses_prepared_statement(
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    session = mocker.AsyncMock()
+    session.execute.return_value = mocker.MagicMock()
+    session.execute.return_value.mappings.return_value.all.return_value = []
+    user_repository = repository.UserRepository()
+    user_repository(session)
+    user_id = str(uuid.uuid4())
+
+    with pytest.raises(exceptions.ObjectDoesNotExistError):
+        await user_repository.find_one(user_id)
+
+    session.execute.assert_awaited_once_with(
+        repository.user.FIND_BY_ID, {"id": user_id}
+    )
+
+
+@pytest.mark.asyncio
+async def test_timeline_feed_skips_deleted_posts_before_limit(
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    session = mocker.AsyncMock()
+    session.execute.return_value = mocker.MagicMock()
+    timeline_repository = repository.TimelineRepository()
+    timeline_repository(session)
+
+    await timeline_repository.feed(user_id=uuid.uuid4(), offset=0, limit=10)
+
+    statement = session.execute.await_args.args[0].text
+    assert statement.index("deleted_at IS NULL") < statement.index("LIMIT")
+    assert "FROM (" not in statement
+
+
+@pytest.mark.parametrize("with_cursor", [False, True])
+@pytest.mark.asyncio
+async def test_lateral_feed_variant_executes_lateral_statement(
+    with_cursor: bool, mocker: pytest_mock.MockerFixture
+) -> None:
+    session = mocker.AsyncMock()
+    session.execute.return_value = mocker.MagicMock()
+    session.execute.return_value.mappings.return_value.all.return_value = []
+    post_repository = repository.PostRepository(
+        feed_query_variant=repository.post.FEED_QUERY_LATERAL
+    )
+    post_repository(session)
+    cursor = (
+        domain_models.FeedCursor(
+            created_at=datetime.datetime.now(tz=datetime.timezone.utc),
+            id=uuid.uuid4(),
+        )
+        if with_cursor
+        else None
+    )
+
+    await post_repository.feed(user_id=uuid.uuid4(), offset=0, limit=10, cursor=cursor)
+
+    statement, params = session.execute.await_args.args
+    assert (
+        statement
+        is repository.post.FEED_STATEMENTS[
+            (repository.post.FEED_QUERY_LATERAL, with_cursor)
+        ]
+    )
+    assert "CROSS JOIN LATERAL" in statement.text
+    assert params["depth"] == 10
+
+
+def test_unknown_feed_query_variant_is_rejected() -> None:
+    with pytest.raises(ValueError):
+        repository.PostRepository(feed_query_variant="unknown")
@@ -0,0 +1,52 @@
+import pytest
+import pytest_mock
+
+from social_network.infrastructure.database import retry
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(mocker: pytest_mock.MockerFixture) -> None:
+    mocker.patch("social_network.infrastructure.database.retry.asyncio.sleep")
+
+
+async def fail_each_attempt(policy: retry.RetryPolicy) -> int:
+    attempts = 0
+    async for attempt in retry.aretry(
+        exceptions_handlers={ConnectionError: None}, policy=policy
+    ):
+        with attempt:
+            attempts += 1
+            raise ConnectionError("db is unavailable")
+    return attempts
+
+
+def test_backoff_is_capped_full_jitter() -> None:
+    policy = retry.RetryPolicy(delay=0.1, max_delay=1.0)
+
+    for attempt_number in range(1, 10):
+        delay = policy.backoff(attempt_number)
+        assert 0 <= delay <= min(1.0, 0.1 * 2 ** (attempt_number - 1))
+
+
+@pytest.mark.asyncio
+async def test_retry_budget_stops_retries() -> None:
+    policy = retry.RetryPolicy(
+        max_attempts=5, budget=retry.RetryBudget(capacity=2, refill_per_second=0)
+    )
+
+    with pytest.raises(ConnectionError):
+        await fail_each_attempt(policy)
+
+    assert retry.RETRIES.value(exception="ConnectionError", outcome="budget") >= 1
+
+
+@pytest.mark.asyncio
+async def test_retry_stops_at_request_deadline() -> None:
+    policy = retry.RetryPolicy(max_attempts=5, delay=10, max_delay=10, budget=None)
+    retry.set_deadline(0)
+
+    try:
+        with pytest.raises(ConnectionError):
+            await fail_each_attempt(policy)
+    finally:
+        retry.set_deadline(None)
@@ -0,0 +1,126 @@
+import pytest
+import pytest_mock
+from sqlalchemy import exc as sa_exc
+
+from social_network.infrastructure.database import exceptions, repository, retry, uow
+
+
+@pytest.mark.asyncio
+async def test_transaction_starts_without_extra_queries(
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    session = mocker.AsyncMock()
+    unit_of_work = uow.PostUnitOfWork(
+        database_name="socialnetwork",
+        master_factory=mocker.MagicMock(return_value=session),
+        post_repository=repository.PostRepository(),
+    )
+
+    async for _ in unit_of_work.transaction():
+        assert unit_of_work.posts._get_db_session() is session
+
+    session.execute.assert_not_awaited()
+    session.commit.assert_awaited_once()
+    session.close.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_read_transaction_falls_back_to_master(
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    mocker.patch("social_network.infrastructure.database.retry.asyncio.sleep")
+    master_factory = mocker.MagicMock(return_value=mocker.AsyncMock())
+    replica_session = mocker.AsyncMock()
+    replica_session.connection.side_effect = ConnectionError("replica is unavailable")
+    slave_factory = mocker.MagicMock(return_value=replica_session)
+    unit_of_work = uow.PostUnitOfWork(
+        database_name="socialnetwork",
+        master_factory=master_factory,
+        slave_factory=slave_factory,
+        post_repository=repository.PostRepository(),
+    )
+
+    async for _ in unit_of_work.transaction(read_only=True):
+        assert unit_of_work.posts._get_db_session() is master_factory.return_value
+
+    replica_session.close.assert_awaited_once()
+    slave_factory.assert_called_once()
+    master_factory.assert_called_once()
+
+
+@pytest.mark.parametrize("failures, is_connected", [(2, True), (3, False)])
+@pytest.mark.asyncio
+async def test_connection_is_retried_by_policy_and_raises_session_creation_error(
+    failures: int,
+    is_connected: bool,
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    mocker.patch("social_network.infrastructure.database.retry.asyncio.sleep")
+    mocker.patch.object(
+        retry, "DEFAULT_POLICY", retry.RetryPolicy(max_attempts=2, budget=None)
+    )
+    session = mocker.AsyncMock()
+    session.connection.side_effect = [
+        *(
+            sa_exc.OperationalError("connect", {}, Exception("db is down"))
+            for _ in range(failures)
+        ),
+        None,
+    ]
+    unit_of_work = uow.PostUnitOfWork(
+        database_name="socialnetwork",
+        master_factory=mocker.MagicMock(return_value=session),
+        post_repository=repository.PostRepository(),
+    )
+
+    if is_connected:
+        async for _ in unit_of_work.transaction():
+            assert unit_of_work.posts._get_db_session() is session
+    else:
+        with pytest.raises(exceptions.SessionCreationError):
+            async for _ in unit_of_work.transaction():
+                pass
+
+    assert session.connection.await_count == 3
+    assert session.close.await_count == 3
+
+
+@pytest.mark.parametrize(
+    "error, is_retried",
+    [
+        (sa_exc.OperationalError("connect", {}, Exception("server closed")), True),
+        (
+            sa_exc.InterfaceError(
+                "connect", {}, Exception("closed"), connection_invalidated=True
+            ),
+            True,
+        ),
+        (sa_exc.InterfaceError("connect", {}, Exception("misuse")), False),
+        (sa_exc.InternalError("connect", {}, Exception("internal")), False),
+    ],
+)
+@pytest.mark.asyncio
+async def test_transient_error_is_retried_once_and_succeeds(
+    error: sa_exc.DBAPIError,
+    is_retried: bool,
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    mocker.patch("social_network.infrastructure.database.retry.asyncio.sleep")
+    mocker.patch.object(retry, "DEFAULT_POLICY", retry.RetryPolicy(budget=None))
+    session = mocker.AsyncMock()
+    session.connection.side_effect = [error, None]
+    unit_of_work = uow.PostUnitOfWork(
+        database_name="socialnetwork",
+        master_factory=mocker.MagicMock(return_value=session),
+        post_repository=repository.PostRepository(),
+    )
+
+    if is_retried:
+        async for _ in unit_of_work.transaction():
+            assert unit_of_work.posts._get_db_session() is session
+        session.commit.assert_awaited_once()
+    else:
+        with pytest.raises(type(error)):
+            async for _ in unit_of_work.transaction():
+                pass
+    assert session.connection.await_count == (2 if is_retried else 1)
@@ -0,0 +1,40 @@
+import asyncio
+import threading
+
+import pytest
+
+from social_network.infrastructure import executor
+
+
+def current_thread_name() -> str:
+    return threading.current_thread().name
+
+
+@pytest.mark.asyncio
+async def test_inline_executor_runs_in_event_loop() -> None:
+    assert await executor.Executor(kind="inline").run(current_thread_name) == (
+        threading.current_thread().name
+    )
+
+
+@pytest.mark.asyncio
+async def test_thread_executor_runs_outside_event_loop() -> None:
+    thread_executor = executor.Executor(kind="thread", max_workers=2)
+    try:
+        names = await asyncio.gather(
+            *(thread_executor.run(current_thread_name) for _ in range(10))
+        )
+    finally:
+        thread_executor.shutdown()
+
+    assert all(name.startswith("crypto") for name in names)
+
+
+@pytest.mark.asyncio
+async def test_executor_propagates_exceptions() -> None:
+    thread_executor = executor.Executor(kind="thread", max_workers=1)
+    try:
+        with pytest.raises(ValueError):
+            await thread_executor.run(int, "not a number")
+    finally:
+        thread_executor.shutdown()
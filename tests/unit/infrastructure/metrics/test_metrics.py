@@ -0,0 +1,60 @@
+import asyncio
+import time
+
+import pytest
+
+from social_network.infrastructure import metrics
+from social_network.infrastructure.metrics import loop_lag
+
+
+def test_counter_renders_prometheus_text() -> None:
+    registry = metrics.Registry()
+    counter = metrics.Counter(
+        "feed_warm_ups_total", "Feed warm ups", labelnames=("role",), registry=registry
+    )
+
+    counter.inc(role="leader")
+    counter.inc(2, role="coalesced")
+
+    assert counter.value(role="coalesced") == 2
+    assert registry.render() == (
+        "# HELP feed_warm_ups_total Feed warm ups\n"
+        "# TYPE feed_warm_ups_total counter\n"
+        'feed_warm_ups_total{role="coalesced"} 2.0\n'
+        'feed_warm_ups_total{role="leader"} 1.0\n'
+    )
+
+
+def test_counter_rejects_unknown_labels() -> None:
+    counter = metrics.Counter(
+        "requests_total", "Requests", labelnames=("role",), registry=metrics.Registry()
+    )
+
+    with pytest.raises(ValueError):
+        counter.inc(reason="db")
+
+
+def test_gauge_keeps_last_value() -> None:
+    registry = metrics.Registry()
+    gauge = metrics.Gauge("loop_lag_seconds", "Loop lag", registry=registry)
+
+    gauge.set(0.5)
+    gauge.set(0.25)
+
+    assert registry.render() == (
+        "# HELP loop_lag_seconds Loop lag\n"
+        "# TYPE loop_lag_seconds gauge\n"
+        "loop_lag_seconds 0.25\n"
+    )
+
+
+@pytest.mark.asyncio
+async def test_loop_lag_is_measured() -> None:
+    monitor = asyncio.create_task(metrics.monitor_loop_lag(0.01))
+    await asyncio.sleep(0)
+    # Синхронная работа в event loop задерживает таймер монитора
+    time.sleep(0.05)
+    await asyncio.sleep(0.02)
+    monitor.cancel()
+
+    assert loop_lag.EVENT_LOOP_LAG_TOTAL.value() >= 0.03
@@ -0,0 +1,163 @@
+import asyncio
+import datetime
+import json
+import typing
+import unittest.mock
+import uuid
+
+import pytest
+import pytest_mock
+
+from social_network.domain import models, services
+from social_network.infrastructure import ws
+
+
+@pytest.fixture
+def user() -> models.UserDomain:
+    return models.UserDomain(
+        id=uuid.uuid4(),
+        first_name="Ivan",
+        second_name="Ivanov",
+        birthdate=datetime.datetime.now(tz=datetime.timezone.utc),
+        biography="Good guy",
+        city="Moscow",
+        password="password",
+    )
+
+
+@pytest.fixture
+def async_feed_service(mocker: pytest_mock.MockerFixture) -> services.AsyncFeedService:
+    return services.AsyncFeedService(
+        exchange=mocker.AsyncMock(), channel=mocker.AsyncMock()
+    )
+
+
+@pytest.mark.asyncio
+async def test_shared_manager_binds_user_once_and_fans_out_locally(
+    async_feed_service: services.AsyncFeedService,
+    user: models.UserDomain,
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    subscribe = mocker.patch.object(async_feed_service, "subscribe")
+    unsubscribe = mocker.patch.object(async_feed_service, "unsubscribe")
+    manager = ws.SharedWSConnectionManager(async_service=async_feed_service)
+    await manager.start()
+    sockets = [mocker.AsyncMock(), mocker.AsyncMock()]
+    for socket in sockets:
+        await manager.connect(socket, user)
+
+    message = mocker.MagicMock(
+        routing_key=services.AsyncFeedService.routing_key(user.id),
+        body=json.dumps('{"postId": "1"}').encode(),
+    )
+    await manager._dispatch(message)
+    await asyncio.sleep(0)
+
+    subscribe.assert_awaited_once()
+    for socket in sockets:
+        socket.send_json.assert_awaited_once_with('{"postId": "1"}')
+
+    await manager.disconnect(sockets[0], user)
+    unsubscribe.assert_not_awaited()
+    await manager.disconnect(sockets[1], user)
+    unsubscribe.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_connection_drops_oldest_messages_and_sends_batches(
+    user: models.UserDomain,
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    socket = mocker.AsyncMock()
+    connection = ws.WSConnection(socket=socket, user=user, buffer_size=3, batch_size=2)
+
+    for i in range(5):
+        assert await connection.send_to_ws(i)
+    connection.start()
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    await connection.close()
+
+    assert [call.args[0] for call in socket.send_json.await_args_list] == [[2, 3], [4]]
+
+
+@pytest.mark.asyncio
+async def test_connection_stops_buffering_after_send_failure(
+    user: models.UserDomain,
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    socket = mocker.AsyncMock()
+    socket.send_json.side_effect = RuntimeError("Socket is closed")
+    queue = mocker.AsyncMock()
+    queue.consume.return_value = "consumer-tag"
+    connection = ws.WSConnection(socket=socket, user=user, queue=queue, buffer_size=1)
+    await connection.subscribe(mocker.AsyncMock())
+    dropped = mocker.patch(
+        "social_network.infrastructure.ws.ws.WS_DROPPED_MESSAGES.inc"
+    )
+
+    connection.start()
+    assert await connection.send_to_ws(1)
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    assert connection.is_closed
+    assert not await connection.send_to_ws(2)
+    dropped.assert_not_called()
+    queue.cancel.assert_awaited_once_with("consumer-tag")
+    await connection.close()
+    queue.cancel.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_disconnect_cancels_consumer_and_deletes_queue(
+    user: models.UserDomain,
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    queue = mocker.AsyncMock()
+    queue.consume.return_value = "consumer-tag"
+    async_service = mocker.AsyncMock()
+    async_service.bind.return_value = queue
+    manager = ws.WSConnectionManager(async_service=async_service)
+    socket = mocker.AsyncMock()
+
+    await manager.connect(socket, user)
+    await manager.disconnect(socket, user)
+
+    queue.cancel.assert_awaited_once_with("consumer-tag")
+    queue.delete.assert_awaited_once_with(if_unused=False, if_empty=False)
+
+
+@pytest.mark.asyncio
+async def test_failed_subscription_does_not_register_connection(
+    user: models.UserDomain,
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    queue = mocker.AsyncMock()
+    queue.consume.side_effect = RuntimeError("Channel is closed")
+    async_service = mocker.AsyncMock()
+    async_service.bind.return_value = queue
+    manager = ws.WSConnectionManager(async_service=async_service)
+
+    with pytest.raises(RuntimeError):
+        await manager.connect(mocker.AsyncMock(), user)
+
+    assert not manager._connections
+    queue.delete.assert_awaited_once_with(if_unused=False, if_empty=False)
+
+
+@pytest.mark.asyncio
+async def test_each_socket_gets_own_queue(
+    async_feed_service: services.AsyncFeedService,
+    user: models.UserDomain,
+) -> None:
+    await async_feed_service.bind(user.id)
+    await async_feed_service.bind(user.id)
+
+    channel = typing.cast(unittest.mock.AsyncMock, async_feed_service._channel)
+    names = [call.kwargs["name"] for call in channel.declare_queue.await_args_list]
+    assert len(set(names)) == 2
+    assert all(
+        name.startswith(services.AsyncFeedService.routing_key(user.id))
+        for name in names
+    )